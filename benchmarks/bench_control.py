@@ -0,0 +1,111 @@
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from gotobed.control import ControlClient, ControlServer
+from gotobed.runtime import ShutdownRuntime
+from gotobed.timetable import Schedule
+
+
+class FakeSequence:
+    # Stands in for ShutdownJob.close/shutdown: records the calls, signals nothing
+    def __init__(self):
+        self.closed = threading.Event()
+        self.shut_down = threading.Event()
+
+    def close(self, inventory):
+        self.closed.set()
+
+    def shutdown(self, target):
+        self.shut_down.set()
+
+
+def start_daemon(path, sequence):
+    runtime = ShutdownRuntime(Schedule.parse(['23:59']), close=sequence.close, shutdown=sequence.shutdown,
+                              once=False)
+
+    def reload(rules=None):
+        rules = rules or ['23:59']
+        runtime.reschedule(Schedule.parse(rules))
+        return rules
+
+    server = ControlServer(runtime, path, reload=reload)
+    thread = threading.Thread(target=lambda: asyncio.run(server.run()), daemon=True)
+    thread.start()
+    for _ in range(100):
+        if os.path.exists(path):
+            break
+        time.sleep(0.01)
+    return runtime, thread
+
+
+def round_trips(client, command, count, **params):
+    start = time.perf_counter()
+    for _ in range(count):
+        client.request(command, **params)
+    return (time.perf_counter() - start) / count
+
+
+def launch_time(args, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable] + args, cwd=ROOT, stdout=subprocess.DEVNULL,
+                       stderr=subprocess.DEVNULL)
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Round trips against a resident daemon with a fake '
+                                                 'close/shutdown sequence, versus restarting the script')
+    parser.add_argument('--count', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=5, help='best of N process launches')
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix='gotobed-')
+    path = os.path.join(directory, 'control.sock')
+    sequence = FakeSequence()
+    runtime, thread = start_daemon(path, sequence)
+
+    with ControlClient(path) as client:
+        client.request('status')
+        print(f"In-process round trips (mean of {args.count}):")
+        for command, params in [('status', {}), ('postpone', {'seconds': 60}), ('cancel', {}),
+                                ('reload', {'rules': ['22:00', 'weekends 23:30']})]:
+            seconds = round_trips(client, command, args.count, **params)
+            print(f"  {command:<10} {seconds * 1e6:>8.1f} us")
+
+        start = time.perf_counter()
+        client.request('run-now')
+        sequence.shut_down.wait(5)
+        print(f"  run-now    {(time.perf_counter() - start) * 1e3:>8.1f} ms to reach the shutdown step "
+              f"(closed: {sequence.closed.is_set()}, shut down: {sequence.shut_down.is_set()})")
+        for _ in range(100):
+            if runtime.state != 'shutting down':
+                break
+            time.sleep(0.01)
+        print(f"  state after run-now: {client.request('status')['state']}")
+
+        print(f"\nProcess launches (best of {args.repeat}):")
+        client_time = launch_time(['-m', 'gotobed.ctl', '--socket', path, 'status'], args.repeat)
+        print(f"  gotobed.ctl status      {client_time * 1e3:>7.1f} ms")
+    restart_time = launch_time(['-m', 'gotobed', '--dry-run', '--no-history'], args.repeat)
+    print(f"  gotobed --dry-run       {restart_time * 1e3:>7.1f} ms (a restart before any waiting starts)")
+
+    runtime._loop.call_soon_threadsafe(runtime.stop)
+    thread.join(5)
+    os.rmdir(directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gotobed.writeback import drain_writeback, read_dirty
+
+# How long the pre-shutdown stage takes: the old fixed sleep against waiting for the
+# page cache to drain, on an idle machine and after writing some data without fsync.
+
+OLD_PAUSE = 5
+CHUNK = 1024 * 1024
+
+
+def make_dirty(directory, megabytes):
+    path = os.path.join(directory, f'bench_drain.{os.getpid()}')
+    block = os.urandom(CHUNK)
+    with open(path, 'wb') as f:
+        for _ in range(megabytes):
+            f.write(block)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Time the writeback drain before shutdown')
+    parser.add_argument('--dir', default=os.path.expanduser('~'),
+                        help='where to write the test file (must be on a real disk, not tmpfs)')
+    parser.add_argument('--sizes', type=int, nargs='*', default=[0, 64, 256, 1024], help='MB to leave dirty')
+    parser.add_argument('--runs', type=int, default=3)
+    args = parser.parse_args()
+
+    if read_dirty() is None:
+        print("No /proc/meminfo here: nothing to measure")
+        return
+
+    print(f"Old stage: a fixed {OLD_PAUSE}s sleep, with no guarantee the data reached the disk\n")
+    print(f"  {'DIRTY MB':>8} {'BEFORE':>9} {'DRAIN':>8} {'OUTCOME':<8} {'LEFT':>8}")
+    for size in args.sizes:
+        for _ in range(args.runs):
+            os.sync()
+            path = make_dirty(args.dir, size) if size else None
+            try:
+                devnull = open(os.devnull, 'w')
+                stdout, sys.stdout = sys.stdout, devnull
+                try:
+                    result = drain_writeback()
+                finally:
+                    sys.stdout = stdout
+                    devnull.close()
+            finally:
+                if path:
+                    os.unlink(path)
+            print(f"  {size:>8} {result.before / CHUNK:>7.1f}MB {result.seconds:>7.3f}s {result.outcome:<8} "
+                  f"{result.after / CHUNK:>6.1f}MB")
+            time.sleep(0.2)
+
+
+if __name__ == '__main__':
+    main()
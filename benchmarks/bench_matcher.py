@@ -0,0 +1,67 @@
+import os
+import random
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gotobed.backends import linux, macos
+
+SIZES = [10_000, 50_000, 100_000]
+
+REALISTIC_NAMES = [
+    'kworker/3:1-events', 'ksoftirqd/0', 'rcu_sched', 'systemd-journald', 'systemd-udevd',
+    'chrome', 'chrome_crashpad', 'firefox-bin', 'code', 'slack', 'discord', 'spotify',
+    'gnome-shell', 'nautilus', 'pipewire', 'wireplumber', 'bash', 'zsh', 'sshd', 'cron',
+    'python3', 'node', 'java', 'postgres', 'nginx', 'containerd-shim', 'dockerd',
+]
+
+
+def synthetic_names(count, seed=0):
+    rng = random.Random(seed)
+    alphabet = string.ascii_lowercase + string.digits + '-_/.'
+    names = []
+    for _ in range(count):
+        if rng.random() < 0.6:
+            names.append(rng.choice(REALISTIC_NAMES))
+        else:
+            names.append(''.join(rng.choice(alphabet) for _ in range(rng.randint(4, 15))))
+    return names
+
+
+def naive(patterns, exact, names):
+    return [name in exact or any(pattern in name for pattern in patterns) for name in names]
+
+
+def compiled(matcher, names):
+    return [matcher.matches(name) for name in names]
+
+
+def run(label, func, names):
+    start = time.perf_counter()
+    result = func(names)
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<28} {elapsed * 1000:8.1f} ms  {len(names) / elapsed / 1e6:6.2f} M names/s")
+    return result
+
+
+def main_bench():
+    matchers = [
+        ('linux protected', linux.POLICY.current.protected),
+        ('linux gui', linux.POLICY.current.gui),
+        ('macos gui', macos.POLICY.current.gui),
+    ]
+    cases = [(label, matcher, matcher.exact, matcher.substrings) for label, matcher in matchers]
+
+    for size in SIZES:
+        names = synthetic_names(size)
+        print(f"\n{size} names")
+        for label, matcher, exact, patterns in cases:
+            expected = run(f"{label} (any loop)", lambda n: naive(patterns, exact, n), names)
+            got = run(f"{label} (compiled)", lambda n: compiled(matcher, n), names)
+            assert expected == got, label
+
+
+if __name__ == '__main__':
+    main_bench()
@@ -0,0 +1,152 @@
+import argparse
+import json
+import os
+import random
+import select
+import statistics
+import string
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gotobed.backends import linux
+from gotobed.classcache import ClassificationCache
+from gotobed.policy import Policy, PolicyWatcher
+from gotobed.snapshot import take_snapshot
+
+# Cost of a policy reload: reading, merging and compiling a large policy file and
+# swapping it in, then the whole path from an atomic rename of the file to the new
+# rules being in force, while another thread keeps classifying processes the way
+# the inventory does. The classifying thread should never notice the swap.
+
+DEFAULTS = os.path.join(os.path.dirname(linux.__file__), 'linux.json')
+
+# How a generated policy splits its entries between the lists
+SHARES = {'critical_processes': 0.7, 'protected_patterns': 0.1, 'system_users': 0.1, 'gui_apps': 0.1}
+
+
+def random_name(rng):
+    return ''.join(rng.choice(string.ascii_lowercase + '-_.') for _ in range(rng.randint(4, 20)))
+
+
+def make_policy(entries, seed, extra=()):
+    rng = random.Random(seed)
+    document = {name: [random_name(rng) for _ in range(int(entries * share))] for name, share in SHARES.items()}
+    document['critical_processes'].extend(extra)
+    return document
+
+
+def write_atomic(path, document):
+    temporary = path + '.tmp'
+    with open(temporary, 'w') as f:
+        json.dump(document, f)
+    os.replace(temporary, path)
+
+
+def time_loads(policy, path, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        policy.load(path)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), max(samples)
+
+
+class Classifier(threading.Thread):
+    # Keeps classifying the live process table through a policy-aware cache, timing
+    # every lookup
+    def __init__(self, records):
+        super().__init__(daemon=True)
+        self.records = records
+        self.cache = ClassificationCache(linux.termination_verdict, policy=linux.POLICY)
+        self.samples = []
+        self.stopping = False
+
+    def run(self):
+        while not self.stopping:
+            for record in self.records:
+                start = time.perf_counter()
+                self.cache.lookup(record)
+                self.samples.append(time.perf_counter() - start)
+
+    def percentile(self, share, since=0):
+        samples = sorted(self.samples[since:])
+        return samples[min(len(samples) - 1, int(len(samples) * share))] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Time policy compile, swap and hot reload')
+    parser.add_argument('--entries', type=int, nargs='*', default=[100, 1000, 10000])
+    parser.add_argument('--runs', type=int, default=20)
+    parser.add_argument('--reloads', type=int, default=20)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix='gotobed-policy-')
+    path = os.path.join(directory, 'policy.json')
+    policy = Policy(DEFAULTS, linux.POLICY.schema)
+
+    print("Read + merge + compile + swap (median / max):")
+    for entries in args.entries:
+        write_atomic(path, make_policy(entries, seed=entries))
+        median, worst = time_loads(policy, path, args.runs)
+        print(f"  {entries:>6} entries  {median:>7.2f} ms {worst:>8.2f} ms")
+
+    # Live reload: the real backend policy, watched, while a thread classifies
+    records = take_snapshot()
+    # A process every built-in rule lets through, to see the verdict follow the policy
+    victim = records[0]._replace(pid=999999, name='bench-victim', username='bench', ppid=4242)
+    entries = args.entries[-1]
+    write_atomic(path, make_policy(entries, seed=0))
+    linux.POLICY.load(path)
+    watcher = PolicyWatcher(linux.POLICY, path)
+    classifier = Classifier(records)
+    classifier.start()
+    time.sleep(0.2)
+    quiet_samples = len(classifier.samples)
+    baseline = (classifier.percentile(0.99), classifier.percentile(1.0))
+    checker = ClassificationCache(linux.termination_verdict, policy=linux.POLICY)
+    method = 'inotify' if watcher.fileno() is not None else 'polling'
+
+    delays = []
+    flips = 0
+    devnull = open(os.devnull, 'w')
+    for reload in range(args.reloads):
+        # Every other policy protects the victim by name
+        extra = [victim.name] if reload % 2 == 0 else []
+        write_atomic(path, make_policy(entries, seed=reload + 1, extra=extra))
+        written = time.perf_counter()
+        if watcher.fileno() is not None:
+            select.select([watcher.fileno()], [], [], 5)
+        stdout, sys.stdout = sys.stdout, devnull
+        try:
+            while watcher.check() is None:
+                time.sleep(0.01)
+        finally:
+            sys.stdout = stdout
+        delays.append((time.perf_counter() - written) * 1000)
+        time.sleep(0.05)
+        protected = not checker.lookup(victim).allowed
+        flips += protected == (reload % 2 == 0)
+
+    classifier.stopping = True
+    classifier.join()
+    watcher.close()
+    devnull.close()
+
+    print(f"\nHot reload of a {entries}-entry policy via {method}, {args.reloads} atomic renames:")
+    print(f"  rename -> new rules in force: median {statistics.median(delays):.2f} ms, max {max(delays):.2f} ms")
+    print(f"  classifier thread, {len(classifier.samples)} lookups: p99 {classifier.percentile(0.99, quiet_samples):.3f} ms, "
+          f"max {classifier.percentile(1.0, quiet_samples):.2f} ms during reloads; "
+          f"p99 {baseline[0]:.3f} ms, max {baseline[1]:.2f} ms before")
+    print(f"  verdict followed the policy after {flips}/{args.reloads} reloads")
+
+    for name in os.listdir(directory):
+        os.unlink(os.path.join(directory, name))
+    os.rmdir(directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gotobed.procevents import NetlinkProcEvents, ProcDirPoller
+
+
+def drain(source, seen, timeout=0):
+    for event in source.read_events(timeout):
+        seen.setdefault((event.kind, event.pid), time.monotonic())
+
+
+def collect(source, seen, until):
+    while time.monotonic() < until:
+        drain(source, seen, 0.05)
+
+
+def run(source, count):
+    seen = {}
+    spawned = {}
+    killed = {}
+
+    children = []
+    for _ in range(count):
+        start = time.monotonic()
+        child = subprocess.Popen(['sleep', '30'])
+        spawned[child.pid] = start
+        children.append(child)
+        drain(source, seen)
+    collect(source, seen, time.monotonic() + 2 * getattr(source, 'interval', 0.5))
+
+    for child in children:
+        killed[child.pid] = time.monotonic()
+        child.kill()
+        child.wait()
+        drain(source, seen)
+    collect(source, seen, time.monotonic() + 2 * getattr(source, 'interval', 0.5))
+
+    fork_latency = [seen[('fork', pid)] - start for pid, start in spawned.items() if ('fork', pid) in seen]
+    exit_latency = [seen[('exit', pid)] - start for pid, start in killed.items() if ('exit', pid) in seen]
+    missed_forks = count - len(fork_latency)
+    missed_exits = count - len(exit_latency)
+
+    def summary(values):
+        if not values:
+            return 'n/a'
+        values = sorted(values)
+        return f"median {values[len(values) // 2] * 1000:.2f} ms, max {values[-1] * 1000:.2f} ms"
+
+    print(f"{source.kind}: {count} children")
+    print(f"  fork: {summary(fork_latency)}, missed {missed_forks}")
+    print(f"  exit: {summary(exit_latency)}, missed {missed_exits}")
+    return missed_forks + missed_exits
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Spawn and kill children and check every event is reported')
+    parser.add_argument('--count', type=int, default=200)
+    parser.add_argument('--interval', type=float, default=0.2, help='poll interval for the /proc poller')
+    args = parser.parse_args()
+
+    sources = []
+    if os.geteuid() == 0:
+        try:
+            sources.append(NetlinkProcEvents())
+        except OSError as e:
+            print(f"Process connector unavailable: {e}")
+    sources.append(ProcDirPoller(args.interval))
+
+    missed = 0
+    for source in sources:
+        try:
+            missed += run(source, args.count)
+        finally:
+            source.close()
+
+    sys.exit(1 if missed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import psutil
+
+from gotobed import procfs, snapshot
+
+SIZES = [1_000, 10_000, 30_000]
+BOOT_TIME = 1_700_000_000
+NAMES = ['chrome', 'code', 'slack', 'bash', 'kworker/0:1', 'systemd-journald', 'gnome-shell',
+         'firefox', 'pipewire', 'python3', 'gnome-keyring-daemon', 'node']
+
+STATUS = """Name:\t{name}
+Umask:\t0022
+State:\tS (sleeping)
+Tgid:\t{pid}
+Ngid:\t0
+Pid:\t{pid}
+PPid:\t{ppid}
+TracerPid:\t0
+Uid:\t{uid}\t{uid}\t{uid}\t{uid}
+Gid:\t{uid}\t{uid}\t{uid}\t{uid}
+Threads:\t{threads}
+"""
+
+
+def build_fixture(root, count, seed=0):
+    # A fake /proc with `count` processes: stat, status, cmdline and environ per PID
+    rng = random.Random(seed)
+    uid = os.getuid()
+    with open(os.path.join(root, 'stat'), 'w') as f:
+        f.write(f"cpu  0 0 0 0 0 0 0 0 0 0\nbtime {BOOT_TIME}\n")
+
+    for pid in range(1, count + 1):
+        name = rng.choice(NAMES)
+        ppid = 0 if pid == 1 else rng.randint(1, pid - 1)
+        threads = rng.randint(1, 40)
+        base = os.path.join(root, str(pid))
+        os.mkdir(base)
+        comm = name[:15]
+        fields = ['S', str(ppid)] + ['0'] * 15 + [str(threads), '0', str(rng.randint(100, 10_000_000))] + ['0'] * 30
+        with open(os.path.join(base, 'stat'), 'w') as f:
+            f.write(f"{pid} ({comm}) {' '.join(fields)}\n")
+        with open(os.path.join(base, 'status'), 'w') as f:
+            f.write(STATUS.format(name=comm, pid=pid, ppid=ppid, uid=uid, threads=threads))
+        with open(os.path.join(base, 'cmdline'), 'wb') as f:
+            f.write(f"/usr/bin/{name}\0--flag\0".encode())
+        with open(os.path.join(base, 'environ'), 'wb') as f:
+            env = [f"VAR{i}=value{i}" for i in range(rng.randint(5, 60))]
+            if rng.random() < 0.5:
+                env.insert(rng.randrange(len(env)), 'DISPLAY=:0')
+            f.write(('\0'.join(env) + '\0').encode())
+
+
+def psutil_scan(root):
+    # The psutil path pointed at the same fixture
+    psutil.PROCFS_PATH = root
+    try:
+        attrs = ['name', 'ppid', 'username', 'create_time', 'num_threads', 'environ']
+        return [snapshot.make_record(proc, proc.info)
+                for proc in psutil.process_iter(attrs, ad_value=None)]
+    finally:
+        psutil.PROCFS_PATH = '/proc'
+        psutil.process_iter.cache_clear()
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare the /proc scanner with the psutil path')
+    parser.add_argument('--sizes', type=int, nargs='*', default=SIZES)
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        root = tempfile.mkdtemp(prefix='fakeproc-')
+        try:
+            build_fixture(root, size)
+            fast, records = timed(procfs.scan_processes, root, True)
+            slow, reference = timed(psutil_scan, root)
+
+            mismatches = sum(1 for a, b in zip(sorted(records, key=lambda r: r.pid), sorted(reference, key=lambda r: r.pid))
+                             if (a.pid, a.name, a.ppid, a.username, a.has_display)
+                             != (b.pid, b.name, b.ppid, b.username, b.has_display))
+            print(f"{size:>6} processes: procfs {fast * 1000:8.1f} ms, psutil {slow * 1000:8.1f} ms, "
+                  f"speedup {slow / fast:4.1f}x, {len(reference)} psutil records, {mismatches} mismatches")
+        finally:
+            shutil.rmtree(root)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Launches timed end to end, against a bare interpreter as the floor
+LAUNCHES = [
+    ('python -c pass', ['-c', 'pass']),
+    ('import gotobed.cli', ['-c', 'import gotobed.cli']),
+    ('gotobed --help', ['-m', 'gotobed', '--help']),
+    ('gotobed --dry-run', ['-m', 'gotobed', '--dry-run']),
+]
+
+
+def import_times(module):
+    # -X importtime lines: "import time: self [us] | cumulative | imported package"
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f"import {module}"],
+                            cwd=ROOT, capture_output=True, text=True, check=True)
+    times = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        times.append((int(self_us), int(cumulative_us), name[1:].rstrip()))
+    return times
+
+
+def launch_time(args, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable] + args, cwd=ROOT, stdout=subprocess.DEVNULL,
+                       stderr=subprocess.DEVNULL, check=True)
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure how long the CLI takes to start')
+    parser.add_argument('--module', default='gotobed.cli', help='module to break down with -X importtime')
+    parser.add_argument('--top', type=int, default=15)
+    parser.add_argument('--repeat', type=int, default=5, help='best of N launches')
+    args = parser.parse_args()
+
+    times = import_times(args.module)
+    top_level = [item for item in times if not item[2].startswith(' ')]
+    total = sum(cumulative for _, cumulative, _ in top_level)
+    print(f"import {args.module}: {total / 1000:.1f} ms over {len(times)} modules")
+    print(f"  {'SELF ms':>8} {'CUMUL ms':>9}  MODULE")
+    for self_us, cumulative_us, name in sorted(times, key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"  {self_us / 1000:>8.1f} {cumulative_us / 1000:>9.1f}  {name}")
+
+    loaded = {name.strip() for _, _, name in times}
+    for heavy in ('psutil', 'asyncio', 'gotobed.x11windows', 'gotobed.teardown'):
+        print(f"  {heavy:<20} {'imported' if heavy in loaded else 'deferred'}")
+
+    print(f"\nLaunch (best of {args.repeat}):")
+    for label, launch_args in LAUNCHES:
+        print(f"  {label:<20} {launch_time(launch_args, args.repeat) * 1000:>7.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from gotobed import procfs
+from gotobed.backends import BACKENDS, load_backend
+from gotobed.classcache import ClassificationCache
+from gotobed.core import ShutdownJob
+from gotobed.inventory import ProcessInventory
+from gotobed.proctree import group_applications
+
+from fakeprocs import FakeTable, fake_inventory, render_proc
+
+SIZES = [100, 1_000, 10_000, 50_000]
+STAGES = ['scan', 'classify', 'group', 'close']
+
+# Grace scaled down to match the fake exit delays; the deadline is kept out of reach
+# so the close timings measure the loop rather than the cut-off
+BENCH_GRACE = 0.2
+BENCH_DEADLINE = 600
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+def best_of(repeat, func, *args):
+    best = None
+    result = None
+    for _ in range(repeat):
+        seconds, result = timed(func, *args)
+        best = seconds if best is None else min(best, seconds)
+    return best, result
+
+
+def entry(stage, variant, size, seconds, **extra):
+    result = {'stage': stage, 'variant': variant, 'size': size, 'seconds': round(seconds, 6),
+              'per_process_us': round(seconds / size * 1e6, 3)}
+    result.update(extra)
+    return result
+
+
+def bench_scan(size, table, repeat):
+    root = tempfile.mkdtemp(prefix='fakeproc-')
+    try:
+        render_proc(root, table.records)
+        seconds, records = best_of(repeat, procfs.scan_processes, root)
+        yield entry('scan', 'procfs', size, seconds, records=len(records))
+        seconds, records = best_of(repeat, procfs.scan_processes, root, True)
+        yield entry('scan', 'procfs+environ', size, seconds, records=len(records))
+    finally:
+        shutil.rmtree(root)
+
+
+def classify(cache, records):
+    return sum(1 for record in records if cache.lookup(record).allowed)
+
+
+def bench_classifier(stage, variant, size, records, verdict):
+    # Cold: every record classified from scratch. Warm: the same records again, as the
+    # inventory does between refreshes (subject to the cache's size limit).
+    cache = ClassificationCache(verdict)
+    seconds, allowed = timed(classify, cache, records)
+    yield entry(stage, f"{variant}/cold", size, seconds, allowed=allowed)
+    seconds, allowed = timed(classify, cache, records)
+    yield entry(stage, f"{variant}/warm", size, seconds, allowed=allowed, hits=cache.hits, misses=cache.misses)
+
+
+def bench_classify(size, tables, backends):
+    for flavour, table in tables.items():
+        backend = backends[flavour]
+        yield from bench_classifier('classify', f"gui_verdict[{flavour}]", size,
+                                    table.records, backend.gui_verdict)
+        yield from bench_classifier('classify', f"termination_verdict[{flavour}]", size,
+                                    table.records, backend.termination_verdict)
+
+
+def bench_group(size, table, backend, repeat):
+    targets = [record for record in table.records if backend.gui_verdict(record).allowed]
+    seconds, apps = best_of(repeat, group_applications, targets, table.records)
+    yield entry('group', 'group_applications', size, seconds, targets=len(targets), apps=len(apps))
+
+
+def run_close(close, inventory, table):
+    table.reset()
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        cpu_start = time.process_time()
+        close(inventory)
+        cpu = time.process_time() - cpu_start
+        seconds = time.perf_counter() - start
+    procs = [record.proc for record in table.records]
+    # Wall time is mostly the fake exit delays; CPU time is the loop's own overhead
+    return seconds, {
+        'cpu_seconds': round(cpu, 6),
+        'terminated': sum(1 for proc in procs if proc.terminated),
+        'killed': sum(1 for proc in procs if proc.killed),
+    }
+
+
+def bench_close(size, table, backend):
+    # Both scopes, fed through an inventory holding the fake table; nothing real is signalled
+    saved = backend.open_closer
+    try:
+        backend.open_closer = lambda: None
+        for scope in ('gui', 'user'):
+            job = ShutdownJob(backend, scope=scope, grace=BENCH_GRACE, deadline=BENCH_DEADLINE)
+            inventory = fake_inventory(ProcessInventory, job.cache, table.records)
+            seconds, counts = run_close(job.close, inventory, table)
+            yield entry('close', f"ShutdownJob.close[{scope}]", size, seconds, **counts)
+    finally:
+        backend.open_closer = saved
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Time scanning, classification, grouping and teardown '
+                                                 'against synthetic process tables; prints JSON')
+    parser.add_argument('--sizes', type=int, nargs='*', default=SIZES)
+    parser.add_argument('--stages', nargs='*', choices=STAGES, default=STAGES)
+    parser.add_argument('--repeat', type=int, default=3, help='best of N for the repeatable stages')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='write the JSON report here instead of stdout')
+    args = parser.parse_args()
+
+    backends = {flavour: load_backend(flavour) for flavour in BACKENDS}
+
+    results = []
+    for size in args.sizes:
+        tables = {flavour: FakeTable(size, flavour, seed=args.seed) for flavour in BACKENDS}
+        if 'scan' in args.stages and os.name == 'posix':
+            results.extend(bench_scan(size, tables['Linux'], args.repeat))
+        if 'classify' in args.stages:
+            results.extend(bench_classify(size, tables, backends))
+        if 'group' in args.stages:
+            results.extend(bench_group(size, tables['Linux'], backends['Linux'], args.repeat))
+        if 'close' in args.stages:
+            results.extend(bench_close(size, tables['Linux'], backends['Linux']))
+        print(f"{size} processes done", file=sys.stderr)
+
+    report = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'seed': args.seed,
+        'results': results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,158 @@
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gotobed.deadline import FALLBACK_MAX_STEP, TIMERFD_AVAILABLE, DeadlineTimer
+
+# DeadlineTimer on a scripted clock (the `clock=` hook): wall-clock jumps, steps back,
+# suspends and DST/timezone changes happen at set points of simulated monotonic
+# time, and every scenario checks that the timer fires no earlier than the moment
+# the wall clock passes the target and at most max_step after it. Naive targets
+# are resolved in the TZ the clock has set, as DeadlineTimer does on a real host.
+
+ZONE = 'Europe/Berlin'
+
+
+def set_zone(name):
+    os.environ['TZ'] = name
+    time.tzset()
+
+
+class ScriptedClock:
+    # `real` is monotonic time since the start; `events` are (real, kind, value) with
+    # kind 'jump' (the wall clock is set by value seconds), 'suspend' (asleep for value
+    # seconds: the wall clock moves on, monotonic time does not) or 'zone'
+
+    def __init__(self, start, zone, events=()):
+        set_zone(zone)
+        self.real = 0.0
+        self.wall = start.replace(tzinfo=ZoneInfo(zone)).timestamp()
+        self.zone = zone
+        self.events = sorted(events)
+        self.sleeps = 0
+        self.log = [(0.0, self.wall, zone)]
+
+    def time(self):
+        return self.wall
+
+    def sleep(self, seconds):
+        self.sleeps += 1
+        end = self.real + seconds
+        while self.events and self.events[0][0] <= end:
+            at, kind, value = self.events.pop(0)
+            self._advance(at)
+            if kind == 'zone':
+                self.zone = value
+                set_zone(value)
+            else:
+                self.wall += value
+            self.log.append((self.real, self.wall, self.zone))
+        self._advance(end)
+
+    def _advance(self, real):
+        self.wall += real - self.real
+        self.real = real
+
+    def passed_at(self, target):
+        # The first monotonic moment the wall clock reads `target` or later
+        for index, (real, wall, zone) in enumerate(self.log):
+            deadline = target.replace(tzinfo=ZoneInfo(zone)).timestamp()
+            if wall >= deadline:
+                return real
+            following = self.log[index + 1][0] if index + 1 < len(self.log) else None
+            if following is None or wall + (following - real) >= deadline:
+                return real + deadline - wall
+        return None
+
+
+HOUR = 3600
+
+SCENARIOS = [
+    ('steady', datetime(2026, 6, 1, 22, 0), datetime(2026, 6, 1, 23, 0), ZONE, []),
+    ('jump forward past the target', datetime(2026, 6, 1, 22, 0), datetime(2026, 6, 1, 23, 0), ZONE,
+     [(630, 'jump', 2 * HOUR)]),
+    ('jump forward short of it', datetime(2026, 6, 1, 22, 0), datetime(2026, 6, 1, 23, 0), ZONE,
+     [(650, 'jump', 45 * 60)]),
+    ('step back before the target', datetime(2026, 6, 1, 22, 0), datetime(2026, 6, 1, 23, 0), ZONE,
+     [(3030, 'jump', -HOUR)]),
+    ('step back just after it', datetime(2026, 6, 1, 22, 0), datetime(2026, 6, 1, 23, 0), ZONE,
+     [(HOUR + 0.5, 'jump', -600)]),
+    ('suspend across the deadline', datetime(2026, 6, 1, 22, 0), datetime(2026, 6, 1, 23, 0), ZONE,
+     [(3000.3, 'suspend', 8 * HOUR)]),
+    ('suspend, resume before it', datetime(2026, 6, 1, 22, 0), datetime(2026, 6, 1, 23, 0), ZONE,
+     [(610, 'suspend', 1800)]),
+    ('DST starts (02:00 -> 03:00)', datetime(2026, 3, 29, 1, 0), datetime(2026, 3, 29, 3, 30), ZONE, []),
+    ('DST ends, target after', datetime(2026, 10, 25, 1, 0), datetime(2026, 10, 25, 3, 30), ZONE, []),
+    ('DST ends, repeated hour', datetime(2026, 10, 25, 1, 0), datetime(2026, 10, 25, 2, 30), ZONE, []),
+    ('timezone changed mid-wait', datetime(2026, 6, 1, 22, 0), datetime(2026, 6, 1, 23, 0), ZONE,
+     [(630, 'zone', 'Europe/London')]),
+    ('timezone changed, target passed', datetime(2026, 6, 1, 22, 0), datetime(2026, 6, 1, 23, 0), ZONE,
+     [(640, 'zone', 'Asia/Tokyo')]),
+]
+
+
+def run_scenario(start, target, zone, events, max_step):
+    # (monotonic seconds the wall clock passed the target, seconds it fired, wakeups)
+    clock = ScriptedClock(start, zone, events)
+    timer = DeadlineTimer(target, clock=clock, max_step=max_step)
+    for _ in range(1000000):
+        if timer.wait():
+            break
+    else:
+        return clock.passed_at(target), None, clock.sleeps
+    return clock.passed_at(target), clock.real, clock.sleeps
+
+
+def real_timerfd(delay):
+    # The kernel path, which the scripted clock cannot drive: how late a timerfd fires
+    target = datetime.fromtimestamp(time.time() + delay)
+    with DeadlineTimer(target) as timer:
+        while not timer.wait():
+            pass
+    return time.time() - target.timestamp()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='DeadlineTimer against a scripted wall clock')
+    parser.add_argument('--max-step', type=float, default=FALLBACK_MAX_STEP,
+                        help='re-check interval without timerfd, seconds')
+    args = parser.parse_args()
+    saved_zone = os.environ.get('TZ')
+
+    passed = True
+    print(f"{'scenario':<34} {'passed at':>10} {'fired at':>10} {'late':>8} {'wakeups':>8}")
+    try:
+        for name, start, target, zone, events in SCENARIOS:
+            due, fired, sleeps = run_scenario(start, target, zone, events, args.max_step)
+            if fired is None:
+                print(f"{name:<34} {due:>9.1f}s {'never':>10}")
+                passed = False
+                continue
+            late = fired - due
+            ok = -1e-6 <= late <= args.max_step + 1e-6
+            passed &= ok
+            print(f"{name:<34} {due:>9.1f}s {fired:>9.1f}s {late:>7.2f}s {sleeps:>8}{'' if ok else '  FAILED'}")
+    finally:
+        if saved_zone is None:
+            os.environ.pop('TZ', None)
+        else:
+            os.environ['TZ'] = saved_zone
+        time.tzset()
+
+    if TIMERFD_AVAILABLE:
+        lateness = [real_timerfd(0.2) * 1000 for _ in range(5)]
+        print(f"\ntimerfd on the real clock: fired {min(lateness):.2f} to {max(lateness):.2f} ms late")
+        passed &= min(lateness) >= 0
+
+    print(f"\n{'All checks passed' if passed else 'Some checks FAILED'} "
+          f"(fired no earlier than the wall clock passed the target, at most {args.max_step:g}s after)")
+    return 0 if passed else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
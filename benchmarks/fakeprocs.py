@@ -0,0 +1,296 @@
+import os
+import random
+import time
+
+import psutil
+
+from gotobed.snapshot import ProcessRecord
+
+BOOT_TIME = 1_700_000_000
+FOLLOW_DELAY = 0.002
+USER = os.environ.get('USERNAME') or 'alice'
+
+# name, helper name, helpers (min, max), has a display, macOS bundle
+LINUX_APPS = [
+    ('chrome', 'chrome', (4, 25), True, None),
+    ('firefox', 'Isolated Web Co', (3, 12), True, None),
+    ('code', 'code', (5, 15), True, None),
+    ('slack', 'slack', (3, 6), True, None),
+    ('discord', 'discord', (3, 6), True, None),
+    ('spotify', 'spotify', (2, 5), True, None),
+    ('libreoffice', 'soffice.bin', (1, 1), True, None),
+    ('thunderbird', 'thunderbird', (0, 2), True, None),
+    ('nautilus', 'nautilus', (0, 0), True, None),
+    ('vlc', 'vlc', (0, 0), True, None),
+]
+LINUX_SESSION = [('gnome-shell', True), ('gnome-terminal-server', True), ('pipewire', False),
+                 ('wireplumber', False), ('gnome-keyring-daemon', False), ('ibus-daemon', True)]
+LINUX_TOOLS = ['bash', 'zsh', 'python3', 'node', 'git', 'vim', 'make', 'ssh', 'less', 'top']
+LINUX_SERVICES = [('systemd-journald', 'root'), ('systemd-udevd', 'root'), ('systemd-logind', 'root'),
+                  ('dbus-daemon', 'messagebus'), ('NetworkManager', 'root'), ('polkitd', 'polkitd'),
+                  ('cupsd', 'root'), ('avahi-daemon', 'avahi'), ('rtkit-daemon', 'rtkit'),
+                  ('cron', 'root'), ('sshd', 'root'), ('colord', 'colord'), ('dockerd', 'root'),
+                  ('containerd-shim', 'root'), ('postgres', 'postgres'), ('nginx', 'www-data')]
+LINUX_KERNEL = ['kworker/{}:{}', 'ksoftirqd/{}', 'migration/{}', 'rcu_gp', 'cpuhp/{}', 'kblockd',
+                'scsi_eh_{}', 'irq/{}-nvme0q{}', 'jbd2/nvme0n1p{}-8', 'kcompactd{}']
+
+DARWIN_APPS = [
+    ('Google Chrome', 'Google Chrome Helper (Renderer)', (4, 25), True, 'Google Chrome'),
+    ('firefox', 'plugin-container', (3, 12), True, 'Firefox'),
+    ('Electron', 'Code Helper (Renderer)', (5, 15), True, 'Visual Studio Code'),
+    ('Slack', 'Slack Helper', (3, 6), True, 'Slack'),
+    ('Spotify', 'Spotify Helper', (2, 5), True, 'Spotify'),
+    ('Safari', 'com.apple.WebKit.WebContent', (2, 8), True, 'Safari'),
+    ('Notes', 'Notes', (0, 0), True, 'Notes'),
+    ('Preview', 'Preview', (0, 0), True, 'Preview'),
+]
+DARWIN_SESSION = [('Finder', True), ('Dock', True), ('SystemUIServer', True), ('loginwindow', True),
+                  ('Terminal', True), ('cfprefsd', False), ('distnoted', False)]
+DARWIN_TOOLS = ['zsh', 'bash', 'python3', 'node', 'git', 'vim', 'ssh', 'less', 'top']
+DARWIN_SERVICES = [('WindowServer', '_windowserver'), ('mds', 'root'), ('mds_stores', 'root'),
+                   ('coreaudiod', '_coreaudiod'), ('syslogd', 'root'), ('configd', 'root'),
+                   ('logd', 'root'), ('powerd', 'root'), ('bluetoothd', 'root'), ('trustd', 'root'),
+                   ('locationd', '_locationd'), ('mDNSResponder', '_mdnsresponder')]
+
+WINDOWS_APPS = [
+    ('chrome.exe', 'chrome.exe', (4, 25), True, None),
+    ('firefox.exe', 'firefox.exe', (3, 12), True, None),
+    ('Code.exe', 'Code.exe', (5, 15), True, None),
+    ('slack.exe', 'slack.exe', (3, 6), True, None),
+    ('Teams.exe', 'msedgewebview2.exe', (3, 8), True, None),
+    ('Spotify.exe', 'Spotify.exe', (2, 5), True, None),
+    ('WINWORD.EXE', 'WINWORD.EXE', (0, 0), True, None),
+    ('notepad.exe', 'notepad.exe', (0, 0), True, None),
+]
+WINDOWS_SESSION = [('explorer.exe', True), ('sihost.exe', False), ('ctfmon.exe', False),
+                   ('RuntimeBroker.exe', False), ('SearchHost.exe', True), ('taskhostw.exe', False)]
+WINDOWS_TOOLS = ['cmd.exe', 'powershell.exe', 'conhost.exe', 'python.exe', 'node.exe', 'git.exe']
+WINDOWS_SERVICES = [('svchost.exe', 'NT AUTHORITY\\SYSTEM'), ('svchost.exe', 'NT AUTHORITY\\LOCAL SERVICE'),
+                    ('svchost.exe', 'NT AUTHORITY\\NETWORK SERVICE'), ('lsass.exe', 'NT AUTHORITY\\SYSTEM'),
+                    ('services.exe', 'NT AUTHORITY\\SYSTEM'), ('spoolsv.exe', 'NT AUTHORITY\\SYSTEM'),
+                    ('MsMpEng.exe', 'NT AUTHORITY\\SYSTEM'), ('dllhost.exe', 'NT AUTHORITY\\SYSTEM'),
+                    ('WmiPrvSE.exe', 'NT AUTHORITY\\NETWORK SERVICE'), ('audiodg.exe', 'NT AUTHORITY\\LOCAL SERVICE')]
+
+CATALOGS = {
+    'Linux': (LINUX_APPS, LINUX_SESSION, LINUX_TOOLS, LINUX_SERVICES),
+    'Darwin': (DARWIN_APPS, DARWIN_SESSION, DARWIN_TOOLS, DARWIN_SERVICES),
+    'Windows': (WINDOWS_APPS, WINDOWS_SESSION, WINDOWS_TOOLS, WINDOWS_SERVICES),
+}
+
+
+class FakeProcess:
+    # Just enough of psutil.Process for the close loops and psutil.wait_procs().
+    # `close_delay` is how long it takes to exit after SIGTERM (None: ignores it);
+    # helpers follow their `leader` out shortly after it exits.
+
+    def __init__(self, pid, name, close_delay=0.01, leader=None):
+        self.pid = pid
+        self._name = name
+        self.close_delay = close_delay
+        self.leader = leader
+        self.exit_at = None
+        self.returncode = None
+        self.terminated = 0
+        self.killed = 0
+
+    def __repr__(self):
+        return f"FakeProcess(pid={self.pid}, name={self._name!r})"
+
+    def _exit_time(self):
+        times = []
+        if self.exit_at is not None:
+            times.append(self.exit_at)
+        if self.leader is not None:
+            leader_exit = self.leader._exit_time()
+            if leader_exit is not None:
+                times.append(leader_exit + FOLLOW_DELAY)
+        return min(times) if times else None
+
+    def is_running(self):
+        exit_time = self._exit_time()
+        return exit_time is None or time.monotonic() < exit_time
+
+    def name(self):
+        if not self.is_running():
+            raise psutil.NoSuchProcess(self.pid)
+        return self._name
+
+    def status(self):
+        if not self.is_running():
+            raise psutil.NoSuchProcess(self.pid)
+        return psutil.STATUS_SLEEPING
+
+    def terminate(self):
+        if not self.is_running():
+            raise psutil.NoSuchProcess(self.pid)
+        self.terminated += 1
+        if self.exit_at is None and self.close_delay is not None:
+            self.exit_at = time.monotonic() + self.close_delay
+
+    def kill(self):
+        if not self.is_running():
+            raise psutil.NoSuchProcess(self.pid)
+        self.killed += 1
+        self.exit_at = time.monotonic()
+
+    def wait(self, timeout=None):
+        exit_time = self._exit_time()
+        now = time.monotonic()
+        if exit_time is not None and exit_time <= now:
+            return 0
+        if timeout is not None and (exit_time is None or exit_time - now > timeout):
+            time.sleep(timeout)
+            raise psutil.TimeoutExpired(timeout, self.pid)
+        time.sleep(exit_time - now)
+        return 0
+
+
+class FakeTable:
+    # A synthetic process table for one OS flavour: kernel threads, services owned by
+    # system accounts, a desktop session, shells running tools, and GUI applications
+    # with helper trees. Deterministic for a given seed.
+
+    def __init__(self, count, flavour='Linux', seed=0, hung_ratio=0.02, close_delay=(0.001, 0.03)):
+        self.flavour = flavour
+        self.rng = random.Random(seed)
+        self.hung_ratio = hung_ratio
+        self.close_delay = close_delay
+        self.records = []
+        self._next_pid = 1
+        self._build(count)
+
+    def _delay(self):
+        if self.rng.random() < self.hung_ratio:
+            return None
+        return self.rng.uniform(*self.close_delay)
+
+    def _add(self, name, ppid, username, has_display=False, exe=None, leader=None, threads=None):
+        pid = self._next_pid
+        self._next_pid += self.rng.randint(1, 3)
+        proc = FakeProcess(pid, name, self._delay(), leader)
+        record = ProcessRecord(
+            pid=pid,
+            name=name,
+            ppid=ppid,
+            username=username,
+            create_time=BOOT_TIME + pid / 100,
+            exe=exe,
+            num_threads=threads if threads is not None else self.rng.randint(1, 60),
+            has_display=has_display,
+            proc=proc,
+        )
+        self.records.append(record)
+        return record
+
+    def _user(self):
+        if self.flavour == 'Windows':
+            return f"DESKTOP-01\\{USER}"
+        return USER
+
+    def _build(self, count):
+        apps, session, tools, services = CATALOGS[self.flavour]
+        rng = self.rng
+        user = self._user()
+
+        if self.flavour == 'Linux':
+            init = self._add('systemd', 0, 'root', threads=1)
+            kthreadd = self._add('kthreadd', 0, 'root', threads=1)
+        elif self.flavour == 'Darwin':
+            self._add('kernel_task', 0, 'root', threads=200)
+            init = self._add('launchd', 0, 'root', threads=3)
+            kthreadd = None
+        else:
+            self._add('System', 0, 'NT AUTHORITY\\SYSTEM', threads=200)
+            init = self._add('wininit.exe', 0, 'NT AUTHORITY\\SYSTEM', threads=1)
+            kthreadd = None
+
+        session_root = self._add('systemd' if self.flavour == 'Linux' else session[0][0], init.pid, user,
+                                 has_display=self.flavour != 'Linux', threads=4)
+        shell_parents = [session_root]
+
+        while len(self.records) < count:
+            roll = rng.random()
+            if kthreadd is not None and roll < 0.2:
+                name = rng.choice(LINUX_KERNEL).format(rng.randint(0, 63), rng.randint(0, 3))
+                self._add(name, kthreadd.pid, 'root', threads=1)
+            elif roll < 0.4:
+                name, owner = rng.choice(services)
+                self._add(name, init.pid, owner)
+            elif roll < 0.5:
+                name, display = rng.choice(session)
+                record = self._add(name, session_root.pid, user, has_display=display)
+                if 'terminal' in name.lower() or name in ('Terminal', 'explorer.exe'):
+                    shell_parents.append(record)
+            elif roll < 0.7:
+                parent = rng.choice(shell_parents)
+                shell = self._add(tools[0], parent.pid, user, has_display=True, threads=1)
+                for _ in range(rng.randint(0, 3)):
+                    self._add(rng.choice(tools), shell.pid, user, has_display=True)
+            else:
+                name, helper, (low, high), display, bundle = rng.choice(apps)
+                exe = None
+                if bundle:
+                    exe = f"/Applications/{bundle}.app/Contents/MacOS/{name}"
+                root = self._add(name, session_root.pid, user, has_display=display, exe=exe,
+                                 threads=rng.randint(20, 80))
+                for _ in range(rng.randint(low, high)):
+                    helper_exe = exe and f"/Applications/{bundle}.app/Contents/Frameworks/{helper}.app/Contents/MacOS/{helper}"
+                    self._add(helper, root.pid, user, has_display=display, exe=helper_exe, leader=root.proc)
+
+        del self.records[count:]
+
+    def reset(self):
+        # Bring every process back to life so the same table can be torn down again
+        for record in self.records:
+            proc = record.proc
+            proc.exit_at = None
+            proc.returncode = None
+            proc.terminated = proc.killed = 0
+
+
+class NullEvents:
+    # An event source that never reports anything, so ProcessInventory.update()
+    # trusts its records instead of rescanning the real process table
+    overrun = False
+    interval = 1
+
+    def fileno(self):
+        return None
+
+    def track(self, pids):
+        pass
+
+    def read_events(self, timeout=None):
+        return []
+
+
+def fake_inventory(inventory_class, cache, records):
+    inventory = inventory_class(cache, events=NullEvents())
+    for record in records:
+        inventory.records[record.pid] = record
+        inventory.verdicts[record.pid] = cache.lookup(record)
+    return inventory
+
+
+def render_proc(root, records, clock_ticks=100):
+    # Write records out as a /proc tree (stat, status, cmdline, environ) for the scanners
+    uid = os.getuid()
+    with open(os.path.join(root, 'stat'), 'w') as f:
+        f.write(f"cpu  0 0 0 0 0 0 0 0 0 0\nbtime {BOOT_TIME}\n")
+
+    for record in records:
+        base = os.path.join(root, str(record.pid))
+        os.mkdir(base)
+        starttime = int((record.create_time - BOOT_TIME) * clock_ticks)
+        fields = ['S', str(record.ppid)] + ['0'] * 15 + [str(record.num_threads), '0', str(starttime)] + ['0'] * 30
+        with open(os.path.join(base, 'stat'), 'w') as f:
+            f.write(f"{record.pid} ({record.name[:15]}) {' '.join(fields)}\n")
+        with open(os.path.join(base, 'status'), 'w') as f:
+            f.write(f"Name:\t{record.name[:15]}\nPPid:\t{record.ppid}\nUid:\t{uid}\t{uid}\t{uid}\t{uid}\n")
+        with open(os.path.join(base, 'cmdline'), 'wb') as f:
+            f.write(f"/usr/bin/{record.name}\0".encode())
+        with open(os.path.join(base, 'environ'), 'wb') as f:
+            env = [f"VAR{i}=value{i}" for i in range(40)]
+            if record.has_display:
+                env.insert(20, 'DISPLAY=:0')
+            f.write(('\0'.join(env) + '\0').encode())
@@ -0,0 +1,279 @@
+import argparse
+import asyncio
+import os
+import random
+import secrets
+import signal
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from gotobed.fleet import FleetAgent, FleetController
+from gotobed.poweroff import PowerOffResult
+from gotobed.runtime import ShutdownRuntime
+from gotobed.teardown import TeardownResult
+from gotobed.timetable import Schedule
+
+# A whole fleet on loopback: a controller in this process and hundreds of simulated
+# hosts spread over worker processes, each host a real FleetAgent driving a real
+# ShutdownRuntime whose close/shutdown only sleep and report. Every host's clock is
+# off by a known amount, so the controller's clock correction can be checked against
+# the truth: scheduled firings land together with it and spread by the skew without.
+# Partway through, every clock steps, as NTP would, and the controller has to notice.
+
+FAR_AWAY = ['2099-01-01 00:00']
+
+
+def host_name(index):
+    return f"sim-{index:04d}"
+
+
+def host_skew(index, args, at):
+    # The simulated host's clock minus the real one at real time `at`: a fixed offset,
+    # and a step (NTP correcting it, say) at args.step_time
+    rng = random.Random(f"{args.seed}-{index}")
+    skew = rng.uniform(-args.skew, args.skew)
+    step = rng.uniform(-args.step, args.step)
+    return skew + step if at >= args.step_time else skew
+
+
+# Worker process: `count` simulated hosts on one event loop
+
+def simulated_host(index, args):
+    def clock():
+        now = time.time()
+        return now + host_skew(index, args, now)
+
+    rng = random.Random(index)
+    agent = FleetAgent(f"127.0.0.1:{args.port}", host=host_name(index), token=os.environ.get('GOTOBED_FLEET_TOKEN'),
+                       clock=clock)
+    agent.quiet = True
+
+    def close(inventory):
+        seconds = rng.uniform(0, args.teardown)
+        time.sleep(seconds)
+        return [TeardownResult('sim-app', 0, 'closed', seconds, 1)]
+
+    def shutdown(target):
+        return PowerOffResult('simulated', True, 0.0, 0, '')
+
+    close, shutdown = agent.reporting(close, shutdown)
+    runtime = ShutdownRuntime(Schedule.parse(FAR_AWAY), close=close, shutdown=shutdown, once=False)
+    agent.attach(runtime)
+    return agent.serve(runtime.run())
+
+
+def run_worker(args):
+    sys.stdout = open(os.devnull, 'w')
+
+    async def main():
+        # Every host's teardown sleeps in the executor; they must not queue behind each other
+        asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=args.count + 4))
+        await asyncio.gather(*(simulated_host(index, args) for index in range(args.first, args.first + args.count)))
+
+    asyncio.run(main())
+
+
+# Controller side
+
+def spawn_worker(args, port, first, count):
+    command = [sys.executable, os.path.abspath(__file__), '--worker', '--port', str(port), '--first', str(first),
+               '--count', str(count), '--skew', str(args.skew), '--seed', str(args.seed),
+               '--teardown', str(args.teardown), '--step', str(args.step), '--step-time', repr(args.step_time)]
+    return subprocess.Popen(command, stdin=subprocess.DEVNULL)
+
+
+async def wait_for(condition, timeout):
+    deadline = time.perf_counter() + timeout
+    while not condition():
+        if time.perf_counter() > deadline:
+            return False
+        await asyncio.sleep(0.02)
+    return True
+
+
+def reports(controller, phase):
+    return {host: report for host, link in controller.agents.items()
+            for report in link.reports if report.get('phase') == phase}
+
+
+def clear_reports(controller):
+    for link in controller.agents.values():
+        link.reports.clear()
+
+
+def errors(replies):
+    return sum(1 for reply in replies.values() if 'error' in reply)
+
+
+async def timed_firing(controller, args, correct):
+    # Push a one-off rule for the next whole minute at least 10s (plus the skew) away
+    # and wait for every host to run it; returns each host's real start time minus
+    # the target
+    controller.correct_clocks = correct
+    target = (datetime.now() + timedelta(seconds=10 + args.skew + 60)).replace(second=0, microsecond=0)
+    clear_reports(controller)
+    replies = await controller.push(rules=[target.strftime('%Y-%m-%d %H:%M')])
+    hosts = len(controller.agents)
+    print(f"  {'with' if correct else 'without'} correction: firing at {target:%H:%M:%S} "
+          f"({errors(replies)} push errors)...", flush=True)
+    wait = (target - datetime.now()).total_seconds() + args.skew + args.teardown + 10
+    await wait_for(lambda: len(reports(controller, 'closed')) >= hosts, wait)
+    closed = reports(controller, 'closed')
+    index = {host_name(i): i for i in range(args.hosts)}
+    return [closed[host]['started'] - host_skew(index[host], args, closed[host]['started']) - target.timestamp()
+            for host in closed], hosts
+
+
+def estimate_errors(controller, args):
+    # |measured - true offset| per host, in ms
+    now = time.time()
+    return [abs(link.skew - host_skew(int(host[4:]), args, now)) * 1000 for host, link in controller.agents.items()]
+
+
+async def run_controller(args):
+    token = secrets.token_hex(16)
+    os.environ['GOTOBED_FLEET_TOKEN'] = token
+    controller = FleetController(FAR_AWAY, listen='127.0.0.1:0', token=token)
+    controller.quiet = True
+    controller.clock_recheck = args.recheck
+    await controller.start()
+
+    per_worker = -(-args.hosts // args.workers)
+    workers = []
+    args.step_time = time.time() + args.step_after
+    start = time.perf_counter()
+    for first in range(0, args.hosts, per_worker):
+        workers.append(spawn_worker(args, controller.port, first, min(per_worker, args.hosts - first)))
+    passed = True
+
+    try:
+        joined = await wait_for(lambda: len(controller.agents) == args.hosts, 60)
+        print(f"{len(controller.agents)}/{args.hosts} hosts joined over {len(workers)} worker processes "
+              f"in {time.perf_counter() - start:.2f}s (handshake, clock measurement and first push each)")
+        passed &= joined
+
+        errors_ms = estimate_errors(controller, args)
+        rtts = [link.rtt * 1000 for link in controller.agents.values()]
+        print(f"Clock offsets up to +-{args.skew}s, estimated to within median {statistics.median(errors_ms):.2f} ms, "
+              f"max {max(errors_ms):.2f} ms (best round trip median {statistics.median(rtts):.2f} ms)")
+
+        print(f"\nFan-out over the open connections ({args.rounds} rounds):")
+        samples = []
+        for _ in range(args.rounds):
+            begin = time.perf_counter()
+            replies = await controller.fan_out('status')
+            samples.append((time.perf_counter() - begin) * 1000)
+            passed &= errors(replies) == 0 and len(replies) == args.hosts
+        print(f"  status to {args.hosts} hosts at once: median {statistics.median(samples):.1f} ms, "
+              f"max {max(samples):.1f} ms")
+        begin = time.perf_counter()
+        for link in list(controller.agents.values()):
+            await link.request('status')
+        print(f"  status one host after another:   {(time.perf_counter() - begin) * 1000:.1f} ms")
+
+        clear_reports(controller)
+        begin = time.perf_counter()
+        replies = await controller.fan_out('run-now')
+        acknowledged = time.perf_counter() - begin
+        done = await wait_for(lambda: len(reports(controller, 'shutdown')) == args.hosts, args.teardown + 30)
+        finished = time.perf_counter() - begin
+        closed = reports(controller, 'closed').values()
+        print(f"  run-now: acknowledged by {len(replies) - errors(replies)}/{args.hosts} in {acknowledged * 1000:.1f} ms, "
+              f"shutdown reports from {len(reports(controller, 'shutdown'))} after {finished:.2f}s "
+              f"(simulated teardowns up to {max(report['seconds'] for report in closed):.2f}s)")
+        passed &= done
+        await controller.push(rules=FAR_AWAY)
+
+        # A worker dies with its hosts; restarted, they come back on their own
+        victim = workers[0]
+        victims = [host_name(i) for i in range(per_worker)]
+        victim.send_signal(signal.SIGKILL)
+        victim.wait()
+        left = await wait_for(lambda: not any(host in controller.agents for host in victims), 10)
+        begin = time.perf_counter()
+        workers[0] = spawn_worker(args, controller.port, 0, per_worker)
+        rejoined = await wait_for(lambda: len(controller.agents) == args.hosts, 30)
+        print(f"\nKilled a worker: its {len(victims)} hosts dropped ({left}), rejoined after restart in "
+              f"{time.perf_counter() - begin:.2f}s")
+        passed &= left and rejoined
+
+        await controller.push(rules=['23:59'])
+        begin = time.perf_counter()
+        replies = await controller.fan_out('cancel')
+        seconds = time.perf_counter() - begin
+        skipped = {host: reply.get('skipped') for host, reply in replies.items()}
+        offsets = {host: link.offset for host, link in controller.agents.items()}
+        print(f"\nCancel: {len(replies) - errors(replies)}/{args.hosts} replied in {seconds * 1000:.1f} ms")
+        passed &= time.time() < args.step_time and None not in skipped.values()
+
+        # Every clock steps; the controller notices on its next check and retimes each
+        # host's schedule, which must not bring the cancelled firing back
+        await asyncio.sleep(max(0, args.step_time - time.time()) + 2 * args.recheck + 1)
+        errors_ms = estimate_errors(controller, args)
+        retimed = sum(1 for host, link in controller.agents.items() if link.offset != offsets.get(host))
+        after = await controller.fan_out('status')
+        held = sum(1 for host, reply in after.items() if reply.get('target') and
+                   abs((datetime.fromisoformat(reply['target']) -
+                        datetime.fromisoformat(skipped[host])).total_seconds()) > 60)
+        print(f"Clocks stepped by up to +-{args.step}s: re-measured within median "
+              f"{statistics.median(errors_ms):.2f} ms, max {max(errors_ms):.2f} ms; {retimed} hosts retimed, "
+              f"today's 23:59 still skipped on {held}/{args.hosts}")
+        passed &= held == args.hosts and max(errors_ms) < 100
+
+        if args.firing:
+            print(f"\nScheduled firing across {args.hosts} hosts (real start time minus the target):")
+            for correct in (True, False):
+                offsets, hosts = await timed_firing(controller, args, correct)
+                if not offsets:
+                    print("    no host fired")
+                    passed = False
+                    continue
+                print(f"    {len(offsets)}/{hosts} fired, spread {(max(offsets) - min(offsets)) * 1000:.1f} ms, "
+                      f"from {min(offsets) * 1000:+.1f} to {max(offsets) * 1000:+.1f} ms")
+                passed &= len(offsets) == hosts
+    finally:
+        for worker in workers:
+            worker.kill()
+            worker.wait()
+        await controller.close()
+
+    print(f"\n{'All checks passed' if passed else 'Some checks FAILED'}")
+    return 0 if passed else 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description='A controller and simulated agents on loopback')
+    parser.add_argument('--hosts', type=int, default=300)
+    parser.add_argument('--workers', type=int, default=10, help='processes to spread the hosts over')
+    parser.add_argument('--skew', type=float, default=3.0, help='largest simulated clock offset, seconds')
+    parser.add_argument('--teardown', type=float, default=2.0, help='longest simulated teardown, seconds')
+    parser.add_argument('--step', type=float, default=1.0, help='largest simulated clock step, seconds')
+    parser.add_argument('--step-after', type=float, default=20.0,
+                        help='when the clocks step, seconds into the run')
+    parser.add_argument('--recheck', type=float, default=3.0, help="the controller's clock check interval")
+    parser.add_argument('--rounds', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--no-firing', dest='firing', action='store_false',
+                        help='skip the two scheduled firings (each waits for the next whole minute)')
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--port', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--first', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--count', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--step-time', type=float, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args)
+        return 0
+    return asyncio.run(run_controller(args))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,162 @@
+import argparse
+import json
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gotobed.waves import WaveGate, order_by_footprint
+
+# Discrete-time model of closing N apps that each flush some data on exit.
+# The disk has a fixed bandwidth that degrades as more writers compete for it
+# (seeks, journal contention, writeback throttling); an app alone can only flush
+# so fast. Synthetic PSI: the share of time some writer wanted more than it got.
+
+TICK = 0.01
+DISK_MB_S = 400           # bandwidth with one writer
+THRASH = 0.15             # each extra concurrent writer costs this share of it
+APP_MB_S = 120            # fastest a single app flushes
+EXIT_OVERHEAD = (0.05, 0.4)
+CONCURRENCY = 16
+
+WORKLOADS = {
+    # name: list of (count, (min MB, max MB))
+    'desktop': [(3, (150, 600)), (10, (10, 60)), (27, (0, 5))],
+    'uniform': [(40, (20, 40))],
+    'heavy': [(12, (200, 800))],
+    'light': [(60, (0, 3))],
+}
+
+ORDERS = {
+    'listed': lambda apps: list(apps),
+    'heaviest-first': lambda apps: sorted(apps, key=lambda app: app['flush'], reverse=True),
+    'lightest-first': lambda apps: sorted(apps, key=lambda app: app['flush']),
+    'footprint': lambda apps: order_by_footprint(apps, weight=lambda app: app['flush']),
+}
+
+
+def make_apps(workload, seed):
+    rng = random.Random(seed)
+    apps = []
+    for count, (low, high) in WORKLOADS[workload]:
+        for _ in range(count):
+            apps.append({'flush': rng.uniform(low, high), 'overhead': rng.uniform(*EXIT_OVERHEAD)})
+    rng.shuffle(apps)
+    return apps
+
+
+class SimClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class SimPressure:
+    # Duck-types waves.PressureMonitor: stall share since the previous read
+    def __init__(self, clock):
+        self.clock = clock
+        self.stalled = 0.0
+        self._last = (0.0, 0.0)
+
+    def add(self, share, seconds):
+        self.stalled += share * seconds
+
+    def read(self):
+        now, stalled = self.clock(), self.stalled
+        last_now, last_stalled = self._last
+        self._last = (now, stalled)
+        if now <= last_now:
+            return {}
+        return {'io': min(1.0, (stalled - last_stalled) / (now - last_now))}
+
+
+def simulate(apps, strategy, order, grace):
+    clock = SimClock()
+    pressure = SimPressure(clock)
+    gate = WaveGate(pressure, maximum=CONCURRENCY, clock=clock) if strategy == 'psi' else None
+    limit = {'all': CONCURRENCY, 'serial': 1, 'fixed-4': 4, 'psi': CONCURRENCY}[strategy]
+
+    pending = [dict(app) for app in ORDERS[order](apps)]
+    pending.reverse()
+    closing = []
+    exits = []
+    killed = 0
+    lost_mb = 0.0
+    peak = 0
+
+    while pending or closing:
+        wave = min(limit, gate.limit(len(closing))) if gate else limit
+        while pending and len(closing) < wave:
+            app = pending.pop()
+            app['started'] = clock.now
+            app['left'] = app['flush']
+            closing.append(app)
+        peak = max(peak, len(closing))
+
+        writers = [app for app in closing if clock.now - app['started'] >= app['overhead'] and app['left'] > 0]
+        if writers:
+            capacity = DISK_MB_S / (1 + THRASH * (len(writers) - 1))
+            share = min(APP_MB_S, capacity / len(writers))
+            pressure.add(max(0.0, 1 - capacity / (APP_MB_S * len(writers))), TICK)
+            for app in writers:
+                app['left'] -= share * TICK
+
+        clock.now += TICK
+        for app in list(closing):
+            if clock.now - app['started'] >= app['overhead'] and app['left'] <= 0:
+                closing.remove(app)
+                exits.append(clock.now)
+            elif clock.now - app['started'] >= grace:
+                closing.remove(app)
+                exits.append(clock.now)
+                killed += 1
+                lost_mb += max(0.0, app['left'])
+
+    return {
+        'strategy': strategy, 'order': order,
+        'makespan': round(clock.now, 2),
+        'mean_exit': round(sum(exits) / len(exits), 2) if exits else 0.0,
+        'killed': killed, 'lost_mb': round(lost_mb, 1), 'peak_closing': peak,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Simulate teardown strategies against apps with different '
+                                                 'flush sizes on a contended disk')
+    parser.add_argument('--workloads', nargs='*', choices=sorted(WORKLOADS), default=sorted(WORKLOADS))
+    parser.add_argument('--grace', type=float, default=15, help='per-app grace before the kill')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--seeds', type=int, default=1, help='average over this many workloads from --seed on')
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args()
+
+    results = []
+    for workload in args.workloads:
+        samples = [make_apps(workload, seed) for seed in range(args.seed, args.seed + args.seeds)]
+        total_mb = sum(app['flush'] for apps in samples for app in apps) / len(samples)
+        if not args.json:
+            print(f"\n{workload}: {len(samples[0])} apps, {total_mb:.0f} MB to flush "
+                  f"(ideal {total_mb / DISK_MB_S:.1f}s at full disk bandwidth)"
+                  + (f", mean of {len(samples)} runs" if len(samples) > 1 else ''))
+            print(f"  {'STRATEGY':<9} {'ORDER':<15} {'MAKESPAN':>9} {'MEAN EXIT':>10} {'KILLED':>7} "
+                  f"{'LOST MB':>8} {'PEAK':>5}")
+        for strategy in ('all', 'serial', 'fixed-4', 'psi'):
+            for order in ORDERS:
+                runs = [simulate(apps, strategy, order, args.grace) for apps in samples]
+                result = {'workload': workload, 'strategy': strategy, 'order': order}
+                for metric in ('makespan', 'mean_exit', 'killed', 'lost_mb', 'peak_closing'):
+                    result[metric] = round(sum(run[metric] for run in runs) / len(runs), 2)
+                results.append(result)
+                if not args.json:
+                    print(f"  {strategy:<9} {order:<15} {result['makespan']:>8.2f}s {result['mean_exit']:>9.2f}s "
+                          f"{result['killed']:>7g} {result['lost_mb']:>8.1f} {result['peak_closing']:>5g}")
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
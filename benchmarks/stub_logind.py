@@ -0,0 +1,205 @@
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gotobed import dbus
+from gotobed.backends import linux
+
+# Exercises backends/linux.shutdown_system() against a private dbus-daemon with a
+# stub org.freedesktop.login1 that records calls instead of powering anything off,
+# and stub systemctl/shutdown commands on an otherwise empty PATH. Then times the
+# logind path against the subprocess fallback and the old os.system() shell call.
+
+BUS_CONFIG = '''<!DOCTYPE busconfig PUBLIC "-//freedesktop//DTD D-Bus Bus Configuration 1.0//EN"
+ "http://www.freedesktop.org/standards/dbus/1.0/busconfig.dtd">
+<busconfig>
+  <type>custom</type>
+  <listen>unix:path={socket}</listen>
+  <auth>EXTERNAL</auth>
+  <policy context="default">
+    <allow send_destination="*"/>
+    <allow receive_sender="*"/>
+    <allow own="*"/>
+  </policy>
+</busconfig>
+'''
+
+STUB_COMMAND = '''#!/bin/sh
+echo "$0 $*" >> {log}
+exit {status}
+'''
+
+
+class StubLogind:
+    # Answers the logind Manager calls shutdown_system() makes; `fail` is a D-Bus
+    # error name to reply with instead
+    def __init__(self, address):
+        self.bus = dbus.Connection(address)
+        self.bus.request_name(linux.LOGIND[0])
+        self.calls = []
+        self.fail = None
+        self.thread = threading.Thread(target=self.serve, daemon=True)
+        self.thread.start()
+
+    def serve(self):
+        while True:
+            try:
+                message = self.bus.receive()
+            except (OSError, ConnectionError):
+                return
+            if message.kind != dbus.METHOD_CALL:
+                continue
+            if message.interface != linux.LOGIND[2]:
+                self.bus.reply_error(message, 'org.freedesktop.DBus.Error.UnknownMethod', message.member)
+                continue
+            self.calls.append((message.member, message.body))
+            if self.fail and message.member != 'SetWallMessage':
+                self.bus.reply_error(message, self.fail, 'refused by the stub')
+            else:
+                self.bus.reply(message)
+
+    def close(self):
+        self.bus.close()
+
+
+def start_bus(directory):
+    socket_path = os.path.join(directory, 'system_bus')
+    config = os.path.join(directory, 'bus.conf')
+    with open(config, 'w') as f:
+        f.write(BUS_CONFIG.format(socket=socket_path))
+    daemon = subprocess.Popen(['dbus-daemon', f'--config-file={config}', '--nofork', '--print-address'],
+                              stdout=subprocess.PIPE, text=True)
+    address = daemon.stdout.readline().strip()
+    return daemon, address
+
+
+def install_stubs(directory, status):
+    log = os.path.join(directory, 'commands.log')
+    for name in ('systemctl', 'shutdown'):
+        path = os.path.join(directory, 'bin', name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            f.write(STUB_COMMAND.format(log=log, status=status))
+        os.chmod(path, 0o755)
+    return log
+
+
+def read_log(log):
+    if not os.path.exists(log):
+        return []
+    with open(log) as f:
+        lines = [os.path.basename(line.strip()) for line in f]
+    os.unlink(log)
+    return lines
+
+
+def quiet(function, *args, **kwargs):
+    devnull = open(os.devnull, 'w')
+    stdout, sys.stdout = sys.stdout, devnull
+    try:
+        return function(*args, **kwargs)
+    finally:
+        sys.stdout = stdout
+        devnull.close()
+
+
+def check(label, result, expected_method, ok=True):
+    passed = result.method == expected_method and result.ok == ok
+    print(f"  {'ok  ' if passed else 'FAIL'} {label}: {result.method}, status {result.status}, "
+          f"{result.seconds * 1000:.1f} ms")
+    return passed
+
+
+def time_calls(function, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        function()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), max(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check and time the shutdown backend against a stub logind')
+    parser.add_argument('--runs', type=int, default=50)
+    args = parser.parse_args()
+
+    if shutil.which('dbus-daemon') is None:
+        print("dbus-daemon not found: needed for the private bus")
+        return 1
+
+    directory = tempfile.mkdtemp(prefix='gotobed-logind-')
+    daemon, address = start_bus(directory)
+    log = install_stubs(directory, status=0)
+    # Nothing but the stubs can be found from here on, whatever shutdown_system() tries
+    os.environ['PATH'] = os.path.join(directory, 'bin')
+    os.environ['DBUS_SYSTEM_BUS_ADDRESS'] = address
+    stub = StubLogind(address)
+    passed = True
+
+    try:
+        print(f"Private bus at {address}\n")
+        print("Behaviour:")
+        result = quiet(linux.shutdown_system, delay=0)
+        passed &= check("PowerOff", result, 'logind PowerOff')
+        passed &= stub.calls[-1] == ('PowerOff', (False,)) and not read_log(log)
+
+        before = time.time()
+        result = quiet(linux.shutdown_system, delay=90)
+        passed &= check("delayed", result, 'logind ScheduleShutdown')
+        (wall, wall_args), (member, (kind, usec)) = stub.calls[-2:]
+        passed &= wall == 'SetWallMessage' and member == 'ScheduleShutdown' and kind == 'poweroff'
+        passed &= abs(usec / 1e6 - (before + 90)) < 1
+
+        stub.fail = 'org.freedesktop.DBus.Error.AccessDenied'
+        result = quiet(linux.shutdown_system, delay=0)
+        passed &= check("logind refuses", result, 'systemctl poweroff')
+        passed &= read_log(log) == ['systemctl poweroff']
+        result = quiet(linux.shutdown_system, delay=90)
+        passed &= check("logind refuses, delayed", result, 'shutdown -h')
+        passed &= read_log(log)[0].startswith('shutdown -h +2 Scheduled shutdown at')
+        stub.fail = None
+
+        os.environ['DBUS_SYSTEM_BUS_ADDRESS'] = f"unix:path={directory}/no_bus"
+        result = quiet(linux.shutdown_system, delay=0)
+        passed &= check("no bus", result, 'systemctl poweroff')
+        read_log(log)
+
+        install_stubs(directory, status=1)
+        result = quiet(linux.shutdown_system, delay=0)
+        passed &= check("nothing works", result, 'shutdown -h', ok=False)
+        passed &= read_log(log) == ['systemctl poweroff', 'shutdown -h now Scheduled shutdown at ' +
+                                    time.strftime('%H:%M')]
+        install_stubs(directory, status=0)
+        os.environ['DBUS_SYSTEM_BUS_ADDRESS'] = address
+
+        print(f"\nLatency of one shutdown request, {args.runs} runs (median / max):")
+        rows = [
+            ('logind PowerOff (D-Bus)', lambda: quiet(linux.shutdown_system, delay=0)),
+            ('systemctl poweroff (subprocess)', lambda: quiet(linux.command_method(['systemctl', 'poweroff'])[1])),
+            ("os.system('shutdown -h +1 ...')", lambda: os.system("shutdown -h +1 'Scheduled shutdown at 22:00'")),
+        ]
+        for label, function in rows:
+            median, worst = time_calls(function, args.runs)
+            print(f"  {label:<34} {median:>7.2f} ms {worst:>8.2f} ms")
+        read_log(log)
+    finally:
+        stub.close()
+        daemon.terminate()
+        daemon.wait()
+        shutil.rmtree(directory, ignore_errors=True)
+
+    print(f"\n{'All checks passed' if passed else 'Some checks FAILED'}")
+    return 0 if passed else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
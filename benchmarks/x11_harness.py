@@ -0,0 +1,471 @@
+import argparse
+import os
+import selectors
+import socket
+import statistics
+import struct
+import subprocess
+import sys
+import threading
+import time
+
+import psutil
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gotobed.teardown import teardown_applications
+from gotobed.x11windows import POLL_INTERVAL, XCB_AVAILABLE, WindowCloser
+
+# Exercises x11windows against a fake X server on a UNIX socket: just enough of the
+# core protocol for libxcb (setup, InternAtom, GetProperty, ChangeWindowAttributes,
+# SendEvent) with a built-in window manager whose "applications" are real sleep
+# processes. Checks which windows list_client_windows() reports (remote, dock,
+# desktop and skip-taskbar ones must be left out), that WindowCloser closes through
+# _NET_CLOSE_WINDOW with an EWMH window manager and WM_DELETE_WINDOW without one,
+# and that teardown notices a closed app from its DestroyNotify rather than a poll.
+
+SOCKET_DIR = '/tmp/.X11-unix'
+ROOT_WINDOW = 0x100
+FIRST_WINDOW = 0x400000
+PREDEFINED = {'ATOM': 4, 'CARDINAL': 6, 'STRING': 31, 'WINDOW': 33, 'WM_CLIENT_MACHINE': 36, 'WM_NAME': 39}
+FIRST_ATOM = 69
+
+DESTROY_NOTIFY = 17
+CLIENT_MESSAGE = 33
+STRUCTURE_NOTIFY = 1 << 17
+BAD_REQUEST = 1
+BAD_WINDOW = 3
+EVENT_MASK_BIT = 11
+
+
+def pad(length):
+    return -length % 4
+
+
+def setup_reply():
+    vendor = b'gotobed fake X'
+    body = struct.pack('<IIIIHHBBBBBBBBI', 1, 0x200000, 0x1fffff, 0, len(vendor), 0xffff,
+                       1, 1, 0, 0, 32, 32, 8, 255, 0)
+    body += vendor + b'\0' * pad(len(vendor))
+    body += struct.pack('<BBB5x', 24, 32, 32)
+    body += struct.pack('<IIIIIHHHHHHIBBBB', ROOT_WINDOW, 0x20, 0xffffff, 0, 0, 1920, 1080, 508, 286,
+                        1, 1, 0x21, 0, 0, 24, 1)
+    body += struct.pack('<BxH4x', 24, 1)
+    body += struct.pack('<IBBHIII4x', 0x21, 4, 8, 256, 0xff0000, 0xff00, 0xff)
+    return struct.pack('<BxHHH', 1, 11, 0, len(body) // 4) + body
+
+
+class Client:
+    def __init__(self, sock):
+        self.sock = sock
+        self.buffer = b''
+        self.ready = False
+        self.sequence = 0
+
+    def send(self, data):
+        self.sock.sendall(data)
+
+
+class FakeXServer:
+    # One thread serving every connection. Windows are dicts of properties
+    # {atom: (type, format, bytes)} plus the app behind them; the window manager
+    # part closes an app `delay` seconds after a close request it understands by
+    # killing its process and destroying its windows, as a real exit would.
+
+    def __init__(self, path, ewmh=True):
+        self.path = path
+        self.ewmh = ewmh
+        self.lock = threading.Lock()
+        self.atoms = dict(PREDEFINED)
+        self.windows = {ROOT_WINDOW: {'props': {}, 'app': None}}
+        self.selections = {}
+        self.clients = []
+        self.timers = []
+        self.closes = []
+        self.destroyed = {}
+        self.next_window = FIRST_WINDOW
+
+        self.listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.listener.bind(path)
+        self.listener.listen(8)
+        self.selector = selectors.DefaultSelector()
+        self.selector.register(self.listener, selectors.EVENT_READ)
+        self.stopping = False
+        self.thread = threading.Thread(target=self.serve, daemon=True)
+
+    def atom(self, name):
+        if name not in self.atoms:
+            self.atoms[name] = FIRST_ATOM + len(self.atoms) - len(PREDEFINED)
+        return self.atoms[name]
+
+    def set_property(self, window, name, kind, value):
+        # value: bytes (format 8) or a list of 32-bit integers
+        if isinstance(value, bytes):
+            self.windows[window]['props'][self.atom(name)] = (self.atom(kind), 8, value)
+        else:
+            self.windows[window]['props'][self.atom(name)] = (self.atom(kind), 32, struct.pack(f'<{len(value)}I', *value))
+
+    def add_window(self, app, title, machine=None, window_type=None, state=()):
+        window = self.next_window
+        self.next_window += 1
+        self.windows[window] = {'props': {}, 'app': app}
+        self.set_property(window, '_NET_WM_PID', 'CARDINAL', [app['proc'].pid])
+        self.set_property(window, '_NET_WM_NAME', 'UTF8_STRING', title.encode())
+        self.set_property(window, 'WM_PROTOCOLS', 'ATOM', [self.atom('WM_DELETE_WINDOW')])
+        if machine is not None:
+            self.set_property(window, 'WM_CLIENT_MACHINE', 'STRING', machine.encode())
+        if window_type is not None:
+            self.set_property(window, '_NET_WM_WINDOW_TYPE', 'ATOM', [self.atom(window_type)])
+        if state:
+            self.set_property(window, '_NET_WM_STATE', 'ATOM', [self.atom(name) for name in state])
+        app.setdefault('windows', []).append(window)
+        self._update_client_list()
+        return window
+
+    def _update_client_list(self):
+        if not self.ewmh:
+            return
+        managed = [window for window in self.windows if window != ROOT_WINDOW]
+        self.set_property(ROOT_WINDOW, '_NET_CLIENT_LIST', 'WINDOW', managed)
+        self.set_property(ROOT_WINDOW, '_NET_SUPPORTED', 'ATOM',
+                          [self.atom(name) for name in ('_NET_CLIENT_LIST', '_NET_WM_PID', '_NET_CLOSE_WINDOW')])
+
+    def start(self):
+        self.thread.start()
+
+    def close(self):
+        self.stopping = True
+        self.thread.join()
+        for client in self.clients:
+            client.sock.close()
+        self.listener.close()
+        os.unlink(self.path)
+
+    # Applications
+
+    def quit_app(self, app):
+        # The app exits: its process first, then the server drops its windows
+        if app.get('gone'):
+            return
+        app['gone'] = True
+        proc = app['proc']
+        proc.kill()
+        try:
+            while psutil.Process(proc.pid).status() != psutil.STATUS_ZOMBIE:
+                time.sleep(0.001)
+        except psutil.NoSuchProcess:
+            pass
+        for window in app.get('windows', []):
+            self.destroy_window(window)
+
+    def destroy_window(self, window):
+        if window not in self.windows:
+            return
+        del self.windows[window]
+        self.destroyed[window] = time.monotonic()
+        for client, mask in self.selections.pop(window, {}).items():
+            if mask & STRUCTURE_NOTIFY and client in self.clients:
+                client.send(struct.pack('<BxHII20x', DESTROY_NOTIFY, client.sequence & 0xffff, window, window))
+        self._update_client_list()
+
+    def _close_requested(self, window, path):
+        entry = self.windows.get(window)
+        if entry is None or entry['app'] is None:
+            return
+        app = entry['app']
+        self.closes.append((app['name'], path))
+        if app.get('delay') is not None and not app.get('closing'):
+            app['closing'] = True
+            self.timers.append((time.monotonic() + app['delay'], app))
+
+    def _reap_dead(self):
+        # A process killed from outside (teardown's kill) loses its windows too
+        for entry in list(self.windows.values()):
+            app = entry['app']
+            if app is not None and not app.get('gone'):
+                try:
+                    dead = psutil.Process(app['proc'].pid).status() == psutil.STATUS_ZOMBIE
+                except psutil.NoSuchProcess:
+                    dead = True
+                if dead:
+                    self.quit_app(app)
+
+    # Protocol
+
+    def serve(self):
+        while not self.stopping:
+            now = time.monotonic()
+            timeout = 0.02
+            if self.timers:
+                timeout = max(0, min(timeout, min(at for at, _ in self.timers) - now))
+            for key, _ in self.selector.select(timeout):
+                with self.lock:
+                    if key.fileobj is self.listener:
+                        sock, _ = self.listener.accept()
+                        client = Client(sock)
+                        self.clients.append(client)
+                        self.selector.register(sock, selectors.EVENT_READ, client)
+                    else:
+                        self._read(key.data)
+            with self.lock:
+                now = time.monotonic()
+                due = [app for at, app in self.timers if at <= now]
+                self.timers = [(at, app) for at, app in self.timers if at > now]
+                for app in due:
+                    self.quit_app(app)
+                self._reap_dead()
+
+    def _read(self, client):
+        try:
+            data = client.sock.recv(65536)
+        except OSError:
+            data = b''
+        if not data:
+            self.selector.unregister(client.sock)
+            client.sock.close()
+            self.clients.remove(client)
+            return
+        client.buffer += data
+
+        if not client.ready:
+            if len(client.buffer) < 12:
+                return
+            order, _, _, name_length, data_length = struct.unpack('<BxHHHH2x', client.buffer[:12])
+            size = 12 + name_length + pad(name_length) + data_length + pad(data_length)
+            if len(client.buffer) < size:
+                return
+            if order != ord('l'):
+                raise ValueError('only little-endian clients are supported')
+            client.buffer = client.buffer[size:]
+            client.ready = True
+            client.send(setup_reply())
+
+        while len(client.buffer) >= 4:
+            opcode, detail, length = struct.unpack('<BBH', client.buffer[:4])
+            if len(client.buffer) < length * 4:
+                return
+            request, client.buffer = client.buffer[4:length * 4], client.buffer[length * 4:]
+            client.sequence += 1
+            self._handle(client, opcode, detail, request)
+
+    def _error(self, client, code, value, opcode):
+        client.send(struct.pack('<BBHIHB21x', 0, code, client.sequence & 0xffff, value, 0, opcode))
+
+    def _handle(self, client, opcode, detail, request):
+        sequence = client.sequence & 0xffff
+        if opcode == 16:
+            # InternAtom
+            (length,) = struct.unpack('<H2x', request[:4])
+            name = request[4:4 + length].decode()
+            atom = self.atoms.get(name, 0) if detail else self.atom(name)
+            client.send(struct.pack('<BxHII20x', 1, sequence, 0, atom))
+        elif opcode == 20:
+            # GetProperty
+            window, prop, kind, offset, length = struct.unpack('<IIIII', request[:20])
+            if window not in self.windows:
+                return self._error(client, BAD_WINDOW, window, opcode)
+            value = self.windows[window]['props'].get(prop)
+            if value is None:
+                return client.send(struct.pack('<BBHIIII12x', 1, 0, sequence, 0, 0, 0, 0))
+            actual, fmt, data = value
+            if kind not in (0, actual):
+                return client.send(struct.pack('<BBHIIII12x', 1, fmt, sequence, 0, actual, len(data), 0))
+            chunk = data[offset * 4:offset * 4 + length * 4]
+            after = max(0, len(data) - offset * 4 - len(chunk))
+            chunk += b'\0' * pad(len(chunk))
+            reply = struct.pack('<BBHIIII12x', 1, fmt, sequence, len(chunk) // 4, actual, after,
+                                len(data[offset * 4:offset * 4 + length * 4]) // (fmt // 8))
+            client.send(reply + chunk)
+        elif opcode == 2:
+            # ChangeWindowAttributes: only the event mask matters here
+            window, mask = struct.unpack('<II', request[:8])
+            if window not in self.windows:
+                return self._error(client, BAD_WINDOW, window, opcode)
+            if mask & (1 << EVENT_MASK_BIT):
+                index = bin(mask & ((1 << EVENT_MASK_BIT) - 1)).count('1')
+                (events,) = struct.unpack('<I', request[8 + 4 * index:12 + 4 * index])
+                self.selections.setdefault(window, {})[client] = events
+        elif opcode == 25:
+            # SendEvent: the window manager and the apps act on close requests
+            destination, _ = struct.unpack('<II', request[:8])
+            event = request[8:40]
+            if destination not in self.windows:
+                return self._error(client, BAD_WINDOW, destination, opcode)
+            if event[0] & 0x7f != CLIENT_MESSAGE:
+                return
+            window, message_type = struct.unpack('<II', event[4:12])
+            data = struct.unpack('<5I', event[12:32])
+            if (self.ewmh and destination == ROOT_WINDOW and message_type == self.atoms.get('_NET_CLOSE_WINDOW')):
+                self._close_requested(window, '_NET_CLOSE_WINDOW')
+            elif (destination == window and message_type == self.atoms.get('WM_PROTOCOLS')
+                  and data[0] == self.atoms.get('WM_DELETE_WINDOW')):
+                self._close_requested(window, 'WM_DELETE_WINDOW')
+        elif opcode == 43:
+            # GetInputFocus, which xcb may use to sync
+            client.send(struct.pack('<BBHII20x', 1, 0, sequence, 0, ROOT_WINDOW))
+        elif opcode == 98:
+            # QueryExtension: none here
+            client.send(struct.pack('<BxHIBBBB20x', 1, sequence, 0, 0, 0, 0, 0))
+        else:
+            self._error(client, BAD_REQUEST, 0, opcode)
+
+
+def free_display():
+    os.makedirs(SOCKET_DIR, exist_ok=True)
+    for number in range(90, 200):
+        path = os.path.join(SOCKET_DIR, f"X{number}")
+        if os.path.exists(path):
+            continue
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            # libxcb tries the abstract socket first
+            probe.connect(f"\0{path}")
+        except OSError:
+            return number, path
+        finally:
+            probe.close()
+    raise RuntimeError('no free display number')
+
+
+# name, close delay (None: ignores close requests), windows as (title, machine, type, state),
+# whether WindowCloser should list it, expected outcome
+def app_table(hostname):
+    return [
+        ('editor', 0.3, [('notes.txt - editor', hostname, None, ())], True, 'closed'),
+        ('browser', 0.6, [('Inbox - browser', None, None, ()), ('News - browser', None, None, ())], True, 'closed'),
+        ('viewer', 0.1, [('photo.png', hostname.split('.')[0].upper(), None, ())], True, 'closed'),
+        ('hung', None, [('Not responding', None, None, ())], True, 'killed'),
+        ('quitting', 0.1, [('Goodbye', None, None, ())], True, 'closed'),
+        ('remote', 0.1, [('ssh -X client', 'elsewhere.example.org', None, ())], False, None),
+        ('panel', 0.1, [('panel', None, '_NET_WM_WINDOW_TYPE_DOCK', ())], False, None),
+        ('desktop', 0.1, [('desktop', None, '_NET_WM_WINDOW_TYPE_DESKTOP', ())], False, None),
+        ('tray', 0.1, [('tray', None, None, ('_NET_WM_STATE_SKIP_TASKBAR',))], False, None),
+        ('dialog', 0.2, [('Save?', None, '_NET_WM_WINDOW_TYPE_DIALOG', ('_NET_WM_STATE_MODAL',))], True, 'closed'),
+    ]
+
+
+def run_scenario(args, ewmh):
+    number, path = free_display()
+    server = FakeXServer(path, ewmh=ewmh)
+    hostname = socket.gethostname()
+    apps = {}
+    for name, delay, windows, listed, outcome in app_table(hostname):
+        app = {'name': name, 'delay': delay, 'listed': listed, 'outcome': outcome,
+               'proc': subprocess.Popen(['sleep', '600'])}
+        for title, machine, window_type, state in windows:
+            server.add_window(app, title, machine, window_type, state)
+        apps[name] = app
+    # An app without any window: WindowCloser falls back to SIGTERM
+    bare = {'name': 'no-window', 'delay': None, 'listed': False, 'outcome': 'closed',
+            'proc': subprocess.Popen(['sleep', '600'])}
+    server.start()
+    passed = True
+    expected_path = '_NET_CLOSE_WINDOW' if ewmh else 'WM_DELETE_WINDOW'
+    label = 'EWMH window manager' if ewmh else 'no window manager (ICCCM only)'
+    print(f"\n{label} on :{number}")
+
+    try:
+        display = f":{number}"
+        closer = WindowCloser(display)
+        if ewmh:
+            listed = {pid for pid in closer.windows}
+            wanted = {app['proc'].pid for app in apps.values() if app['listed']}
+            names = {app['proc'].pid: name for name, app in apps.items()}
+            ok = listed == wanted
+            print(f"  {'ok  ' if ok else 'FAIL'} listed: {', '.join(sorted(names[pid] for pid in listed))}")
+            passed &= ok
+            ok = closer.use_net_close
+            print(f"  {'ok  ' if ok else 'FAIL'} _NET_CLOSE_WINDOW advertised in _NET_SUPPORTED")
+            passed &= ok
+        else:
+            # Without _NET_CLIENT_LIST there is nothing to list: hand the windows over as
+            # a caller with another source of them would
+            passed &= not closer.use_net_close
+            for app in apps.values():
+                if app['listed']:
+                    for window in app['windows']:
+                        closer.windows.setdefault(app['proc'].pid, set()).add(window)
+                        closer.owners[window] = app['proc'].pid
+
+        # 'quitting' exits on its own between the listing and the close request: its
+        # window is gone (BadWindow) and so is its process
+        with server.lock:
+            server.quit_app(apps['quitting'])
+
+        targets = [app for app in apps.values() if app['listed']] + [bare]
+        by_pid = {app['proc'].pid: app for app in targets}
+        results = {}
+
+        def on_result(result):
+            results[result.pid] = (result, time.monotonic())
+
+        begin = time.monotonic()
+        teardown_applications([[psutil.Process(app['proc'].pid)] for app in targets],
+                              close=closer.request_close, wait=closer.wait, grace=args.grace,
+                              deadline=args.grace + 5, on_result=on_result)
+        seconds = time.monotonic() - begin
+        closer.close()
+
+        latencies = []
+        for pid, app in by_pid.items():
+            result, seen = results.get(pid, (None, None))
+            outcome = result.outcome if result else 'missing'
+            ok = outcome == app['outcome']
+            detail = ''
+            if app['delay'] is not None and app['name'] != 'quitting' and app['windows']:
+                destroyed = max(server.destroyed.get(window, seen) for window in app['windows'])
+                latency = (seen - destroyed) * 1000
+                latencies.append(latency)
+                detail = f", noticed {latency:.1f} ms after DestroyNotify"
+            passed &= ok
+            print(f"  {'ok  ' if ok else 'FAIL'} {app['name']:<10} {outcome:<8} after {result.seconds if result else 0:.2f}s"
+                  f"{detail}")
+
+        paths = {name: path for name, path in server.closes}
+        ok = all(paths.get(app['name']) == expected_path for app in targets
+                 if app['delay'] is not None and app['name'] != 'quitting' and app['windows'])
+        print(f"  {'ok  ' if ok else 'FAIL'} close requests went through {expected_path}: "
+              f"{', '.join(sorted(paths))}")
+        passed &= ok
+
+        untouched = [app for app in apps.values() if not app['listed']]
+        ok = all(app['proc'].poll() is None and app['name'] not in paths for app in untouched)
+        print(f"  {'ok  ' if ok else 'FAIL'} left alone: {', '.join(app['name'] for app in untouched)}")
+        passed &= ok
+
+        if latencies:
+            ok = max(latencies) < POLL_INTERVAL * 1000 / 2
+            print(f"  {'ok  ' if ok else 'FAIL'} exits noticed from events: median {statistics.median(latencies):.1f} ms, "
+                  f"max {max(latencies):.1f} ms (WindowCloser polls windowless apps every "
+                  f"{POLL_INTERVAL * 1000:.0f} ms)")
+            passed &= ok
+        print(f"  teardown took {seconds:.2f}s (grace {args.grace}s)")
+    finally:
+        for app in list(apps.values()) + [bare]:
+            if app['proc'].poll() is None:
+                app['proc'].kill()
+            try:
+                app['proc'].wait()
+            except ChildProcessError:
+                pass
+        server.close()
+    return passed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='x11windows against a fake X server')
+    parser.add_argument('--grace', type=float, default=1.5, help='teardown grace before the hung app is killed')
+    args = parser.parse_args()
+
+    if not XCB_AVAILABLE:
+        print("libxcb not available")
+        return 1
+
+    passed = run_scenario(args, ewmh=True)
+    passed &= run_scenario(args, ewmh=False)
+    print(f"\n{'All checks passed' if passed else 'Some checks FAILED'}")
+    return 0 if passed else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
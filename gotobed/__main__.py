@@ -0,0 +1,3 @@
+from gotobed.cli import run
+
+run()
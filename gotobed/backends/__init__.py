@@ -0,0 +1,18 @@
+import importlib
+import platform
+
+# platform.system() -> module under gotobed.backends. Only the running OS's backend is
+# ever imported, together with whatever it needs (pywin32, ctypes/libxcb, netlink).
+BACKENDS = {
+    'Linux': 'linux',
+    'Darwin': 'macos',
+    'Windows': 'windows',
+}
+
+
+def load_backend(system=None):
+    system = system or platform.system()
+    name = BACKENDS.get(system)
+    if name is None:
+        raise RuntimeError(f"Unsupported operating system '{system}'")
+    return importlib.import_module(f"gotobed.backends.{name}")
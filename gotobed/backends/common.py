@@ -0,0 +1,29 @@
+import os
+
+from gotobed.classcache import Verdict
+from gotobed.matcher import NameMatcher
+
+SYSTEM_EXCLUDED = NameMatcher(exact=[
+    'system', 'registry', 'csrss.exe', 'smss.exe', 'services.exe',
+    'lsass.exe', 'winlogon.exe', 'svchost.exe', 'explorer.exe',
+    'dwm.exe', 'systemd', 'init', 'launchd', 'kernel_task',
+    'windowserver', 'loginwindow', 'finder', 'dock'
+])
+
+
+def excluded_verdict(record):
+    proc_name = record.name.lower()
+
+    if proc_name in SYSTEM_EXCLUDED:
+        return Verdict(False, f"system process '{proc_name}'")
+
+    if 'python' in proc_name and record.pid == os.getpid():
+        return Verdict(False, 'this script')
+
+    return None
+
+
+def window_targets(records, windows, skip=()):
+    # Records owning a window in `windows` (PID -> anything), minus the excluded ones
+    return [record for record in records
+            if record.pid in windows and excluded_verdict(record) is None and record.name.lower() not in skip]
@@ -0,0 +1,159 @@
+import os
+import time
+from datetime import datetime
+
+from gotobed.backends.common import excluded_verdict, window_targets
+from gotobed.classcache import Verdict
+from gotobed.displaydetect import DisplayDetector
+from gotobed.policy import Policy
+from gotobed.poweroff import PowerOffError, command_method, request_poweroff, shutdown_minutes
+
+NAME = 'Linux'
+
+# What a GUI target has when the window closer found it
+WINDOW_REASON = 'window on the X server'
+
+# Seconds from the shutdown request to the poweroff, time to save work or cancel it
+SHUTDOWN_DELAY = 60
+
+LOGIND = ('org.freedesktop.login1', '/org/freedesktop/login1', 'org.freedesktop.login1.Manager')
+
+# What counts as a GUI application (gui scope) and what is part of the system (user
+# scope) comes from backends/linux.json, under an optional user policy (policy.py)
+POLICY = Policy(os.path.join(os.path.dirname(__file__), 'linux.json'), {
+    'gui': ((), ('gui_apps',)),
+    'protected': (('critical_processes',), ('protected_patterns',)),
+    'critical': (('critical_processes',), ()),
+    'system_users': (('system_users',), ()),
+    'shells': (('terminals_and_shells',), ()),
+})
+
+DISPLAY_DETECTOR = DisplayDetector()
+
+
+def has_display(record):
+    if record.has_display is not None:
+        return record.has_display
+    return DISPLAY_DETECTOR.has_display(record)
+
+
+def gui_verdict(record):
+    verdict = excluded_verdict(record)
+    if verdict is not None:
+        return verdict
+
+    if not POLICY.current.gui.matches(record.name.lower()):
+        return Verdict(False, 'name matches no GUI pattern')
+    if not has_display(record):
+        return Verdict(False, 'no display access')
+    return Verdict(True, 'visible window')
+
+
+def termination_verdict(record):
+    rules = POLICY.current
+    proc_name = record.name.lower()
+
+    match = rules.protected.match(proc_name)
+    if match:
+        return Verdict(False, f"protected {match.kind} '{match.rule}'")
+
+    username = record.username
+    if username is None:
+        return Verdict(False, 'owner unknown')
+
+    if username.lower() in rules.system_users:
+        return Verdict(False, f"system user '{username}'")
+
+    if record.ppid is None:
+        return Verdict(False, 'parent unknown')
+
+    if record.ppid in [0, 1, 2]:
+        if record.ppid != 1 or proc_name in rules.critical:
+            return Verdict(False, f"kernel or init child (PPID: {record.ppid})")
+
+    if 'python' in proc_name and record.pid == os.getpid():
+        return Verdict(False, 'this script')
+
+    if proc_name in rules.shells:
+        return Verdict(False, f"terminal or shell '{proc_name}'")
+
+    return Verdict(True, 'user application')
+
+
+VERDICTS = {'gui': gui_verdict, 'user': termination_verdict}
+
+
+def startup_notes():
+    return []
+
+
+def retain(records):
+    DISPLAY_DETECTOR.retain(records)
+
+
+def forget(record):
+    DISPLAY_DETECTOR.discard(record)
+
+
+def open_events():
+    from gotobed.procevents import open_process_events
+    return open_process_events()
+
+
+def open_closer():
+    # An X connection that both lists client windows and closes them (x11windows.py)
+    from gotobed.x11windows import open_window_closer
+    return open_window_closer()
+
+
+def gui_targets(records, classified, windows):
+    # Exact set from the window manager's client list (PID -> windows). The policy's
+    # gui_apps names are not consulted for these: the window says it is a GUI app.
+    # Native Wayland clients are not in it (only XWayland ones), so on a Wayland
+    # session the name/display heuristic (gui_verdict, gui_apps) still contributes.
+    targets = window_targets(records, windows)
+    if os.environ.get('WAYLAND_DISPLAY'):
+        listed = {record.pid for record in targets}
+        targets.extend(record for record in classified() if record.pid not in listed)
+        targets.sort(key=lambda record: record.pid)
+    return targets
+
+
+def spare_reason(record, windows, cache):
+    verdict = excluded_verdict(record)
+    if verdict is not None:
+        return verdict.reason
+    if not os.environ.get('WAYLAND_DISPLAY'):
+        return 'no window on the X server'
+    return f"no X window, {cache.lookup(record).reason}"
+
+
+def logind_method(delay, message):
+    # PowerOff, or ScheduleShutdown for a delayed one, on the logind Manager
+    def request():
+        from gotobed.dbus import Connection, DBusError
+
+        try:
+            with Connection() as bus:
+                if delay <= 0:
+                    bus.call(*LOGIND, 'PowerOff', 'b', (False,))
+                    return ''
+                try:
+                    bus.call(*LOGIND, 'SetWallMessage', 'sb', (message, True))
+                except DBusError:
+                    pass
+                bus.call(*LOGIND, 'ScheduleShutdown', 'st', ('poweroff', int((time.time() + delay) * 1000000)))
+                return ''
+        except DBusError as e:
+            raise PowerOffError(e.name, e.text or e.name)
+
+    return ('logind ScheduleShutdown' if delay > 0 else 'logind PowerOff'), request
+
+
+def shutdown_system(target_time=None, delay=SHUTDOWN_DELAY):
+    message = f"Scheduled shutdown at {(target_time or datetime.now()).strftime('%H:%M')}"
+    if delay > 0:
+        commands = [['shutdown', '-h', f"+{shutdown_minutes(delay)}", message]]
+    else:
+        commands = [['systemctl', 'poweroff'], ['shutdown', '-h', 'now', message]]
+    return request_poweroff([logind_method(delay, message)] + [command_method(argv) for argv in commands], delay)
@@ -0,0 +1,109 @@
+import os
+from datetime import datetime
+
+from gotobed.backends.common import excluded_verdict
+from gotobed.classcache import Verdict
+from gotobed.policy import Policy
+from gotobed.poweroff import command_method, request_poweroff, shutdown_minutes
+
+NAME = 'Darwin'
+
+# Seconds from the shutdown request to the poweroff, time to save work or cancel it
+SHUTDOWN_DELAY = 60
+
+# What counts as a GUI application (gui scope) and what is part of the system (user
+# scope) comes from backends/macos.json, under an optional user policy (policy.py)
+POLICY = Policy(os.path.join(os.path.dirname(__file__), 'macos.json'), {
+    'gui': ((), ('gui_apps',)),
+    'protected': (('critical_processes',), ('protected_patterns',)),
+    'user_apps': ((), ('user_apps',)),
+    'system_users': (('system_users',), ()),
+    'shells': (('terminals_and_shells',), ()),
+})
+
+
+def has_visible_window(record):
+    if POLICY.current.gui.matches(record.name.lower()):
+        return True
+
+    exe = record.exe
+    if exe and '/Applications/' in exe and '.app/' in exe:
+        return True
+
+    return False
+
+
+def gui_verdict(record):
+    verdict = excluded_verdict(record)
+    if verdict is not None:
+        return verdict
+
+    if has_visible_window(record):
+        return Verdict(True, 'visible window')
+    return Verdict(False, 'no visible window')
+
+
+def termination_verdict(record):
+    rules = POLICY.current
+    proc_name = record.name.lower()
+
+    match = rules.protected.match(proc_name)
+    if match:
+        return Verdict(False, f"protected {match.kind} '{match.rule}'")
+
+    username = record.username
+    if username is None:
+        return Verdict(False, 'owner unknown')
+
+    if username and (username.startswith('_') or username.lower() in rules.system_users):
+        return Verdict(False, f"system user '{username}'")
+
+    if record.ppid is None:
+        return Verdict(False, 'parent unknown')
+
+    if record.ppid in [0, 1]:
+        if record.ppid == 1:
+            if not rules.user_apps.matches(proc_name):
+                return Verdict(False, 'launchd agent')
+
+    if 'python' in proc_name and record.pid == os.getpid():
+        return Verdict(False, 'this script')
+
+    if proc_name in rules.shells:
+        return Verdict(False, f"terminal or shell '{proc_name}'")
+
+    if proc_name in ['finder', 'dock']:
+        return Verdict(False, f"system process '{proc_name}'")
+
+    return Verdict(True, 'user application')
+
+
+VERDICTS = {'gui': gui_verdict, 'user': termination_verdict}
+
+
+def startup_notes():
+    return []
+
+
+def retain(records):
+    pass
+
+
+def forget(record):
+    pass
+
+
+def open_events():
+    return None
+
+
+def open_closer():
+    return None
+
+
+def shutdown_system(target_time=None, delay=SHUTDOWN_DELAY):
+    message = f"Scheduled shutdown at {(target_time or datetime.now()).strftime('%H:%M')}"
+    argv = ['shutdown', '-h', f"+{shutdown_minutes(delay)}" if delay > 0 else 'now', message]
+    if os.geteuid() != 0:
+        argv.insert(0, 'sudo')
+    return request_poweroff([command_method(argv, name='shutdown -h')], delay)
@@ -0,0 +1,187 @@
+import os
+from datetime import datetime
+
+from gotobed.backends.common import excluded_verdict, window_targets
+from gotobed.classcache import Verdict
+from gotobed.policy import Policy
+from gotobed.poweroff import command_method, request_poweroff
+
+try:
+    import win32gui
+    import win32process
+    import win32con
+    PYWIN32_AVAILABLE = True
+except ImportError:
+    PYWIN32_AVAILABLE = False
+
+NAME = 'Windows'
+
+# What a GUI target has when the window closer found it
+WINDOW_REASON = 'visible window'
+
+# Seconds from the shutdown request to the poweroff, time to save work or cancel it
+SHUTDOWN_DELAY = 30
+
+# Shell processes that own visible windows but are never closed (shell_windows), and
+# what is part of the system (user scope): backends/windows.json, under an optional
+# user policy (policy.py)
+POLICY = Policy(os.path.join(os.path.dirname(__file__), 'windows.json'), {
+    'shell_windows': (('shell_windows',), ()),
+    'protected': (('critical_processes', 'protected_services'), ()),
+    'system_accounts': ((), ('system_accounts',)),
+})
+
+
+def get_gui_windows_pywin32():
+    gui_apps = {}
+
+    def enum_window_callback(hwnd, results):
+        if win32gui.IsWindowVisible(hwnd):
+            title = win32gui.GetWindowText(hwnd)
+
+            if not title:
+                return
+
+            style = win32gui.GetWindowLong(hwnd, win32con.GWL_STYLE)
+            ex_style = win32gui.GetWindowLong(hwnd, win32con.GWL_EXSTYLE)
+
+            if style & win32con.WS_VISIBLE and not (ex_style & win32con.WS_EX_TOOLWINDOW):
+
+                _, pid = win32process.GetWindowThreadProcessId(hwnd)
+
+                if pid not in results:
+                    results[pid] = title
+
+    try:
+        win32gui.EnumWindows(enum_window_callback, gui_apps)
+    except Exception as e:
+        print(f"Error enumerating windows: {e}")
+
+    return gui_apps
+
+
+def close_application_gracefully_windows(proc, window_title):
+    if not PYWIN32_AVAILABLE:
+        proc.terminate()
+        return False
+
+    try:
+        def find_window_callback(hwnd, target_pid):
+            _, pid = win32process.GetWindowThreadProcessId(hwnd)
+            if pid == target_pid:
+                if win32gui.IsWindowVisible(hwnd):
+                    win32gui.PostMessage(hwnd, win32con.WM_CLOSE, 0, 0)
+                    return False
+
+            return True
+
+        win32gui.EnumWindows(lambda hwnd, pid: find_window_callback(hwnd, pid), proc.pid)
+        return True
+    except Exception:
+        proc.terminate()
+        return False
+
+
+class WindowMessageCloser:
+    # pywin32 counterpart of x11windows.WindowCloser: the visible-window map for
+    # target selection, WM_CLOSE for closing, SIGTERM-equivalent for windowless processes
+
+    wait = None
+
+    def __init__(self):
+        self.windows = get_gui_windows_pywin32()
+
+    def request_close(self, proc):
+        if proc.pid in self.windows:
+            close_application_gracefully_windows(proc, self.windows[proc.pid])
+        else:
+            proc.terminate()
+
+    def close(self):
+        pass
+
+
+def has_visible_window(record):
+    # Heuristic for when pywin32 is missing
+    username = record.username
+    current_user = os.environ.get("USERNAME", '')
+    if not username or record.num_threads is None:
+        return False
+    return record.num_threads > 1 and current_user.lower() in username.lower()
+
+
+def gui_verdict(record):
+    verdict = excluded_verdict(record)
+    if verdict is not None:
+        return verdict
+
+    if has_visible_window(record):
+        return Verdict(True, 'visible window')
+    return Verdict(False, 'no visible window')
+
+
+def termination_verdict(record):
+    rules = POLICY.current
+    proc_name = record.name.lower()
+
+    match = rules.protected.match(proc_name)
+    if match:
+        return Verdict(False, f"protected {match.kind} '{match.rule}'")
+
+    username = record.username
+    if username is None:
+        return Verdict(False, 'owner unknown')
+
+    if username and rules.system_accounts.matches(username.lower()):
+        return Verdict(False, f"system account '{username}'")
+
+    if 'python' in proc_name and record.pid == os.getpid():
+        return Verdict(False, 'this script')
+
+    return Verdict(True, 'user application')
+
+
+VERDICTS = {'gui': gui_verdict, 'user': termination_verdict}
+
+
+def startup_notes():
+    if PYWIN32_AVAILABLE:
+        return ["pywin32 detected - Using accurate Windows GUI detection"]
+    return ["pywin32 not installed", "Install for better accuracy: pip install pywin32"]
+
+
+def retain(records):
+    pass
+
+
+def forget(record):
+    pass
+
+
+def open_events():
+    return None
+
+
+def open_closer():
+    if not PYWIN32_AVAILABLE:
+        return None
+    return WindowMessageCloser()
+
+
+def gui_targets(records, classified, windows):
+    return window_targets(records, windows, skip=POLICY.current.shell_windows)
+
+
+def spare_reason(record, windows, cache):
+    verdict = excluded_verdict(record)
+    if verdict is not None:
+        return verdict.reason
+    if record.name.lower() in POLICY.current.shell_windows:
+        return f"shell window '{record.name.lower()}'"
+    return 'no visible window'
+
+
+def shutdown_system(target_time=None, delay=SHUTDOWN_DELAY):
+    message = f"Scheduled shutdown at {(target_time or datetime.now()).strftime('%H:%M')}"
+    argv = ['shutdown', '/s', '/t', str(max(0, int(delay))), '/c', message]
+    return request_poweroff([command_method(argv)], delay)
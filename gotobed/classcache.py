@@ -0,0 +1,61 @@
+from collections import OrderedDict, namedtuple
+
+Verdict = namedtuple('Verdict', ['allowed', 'reason'])
+
+DEFAULT_CACHE_SIZE = 8192
+
+
+class ClassificationCache:
+    # Keyed on (pid, create_time) so a reused PID never inherits a stale verdict.
+    # The name is stored alongside because exec() keeps both pid and create_time.
+    # With a policy (policy.py), every verdict is dropped once its rules are swapped out.
+
+    def __init__(self, classify, maxsize=DEFAULT_CACHE_SIZE, policy=None):
+        self.classify = classify
+        self.maxsize = maxsize
+        self.policy = policy
+        self.hits = 0
+        self.misses = 0
+        self.generation = 0
+        self._rules = policy.current if policy is not None else None
+        self._entries = OrderedDict()
+
+    def sync(self):
+        # Forget every verdict if the policy changed since the last lookup
+        if self.policy is not None and self.policy.current is not self._rules:
+            self._rules = self.policy.current
+            self._entries.clear()
+            self.generation += 1
+
+    def lookup(self, record):
+        self.sync()
+        if record.create_time is None:
+            self.misses += 1
+            return self.classify(record)
+
+        key = (record.pid, record.create_time)
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == record.name:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+        self.misses += 1
+        verdict = self.classify(record)
+        self._entries[key] = (record.name, verdict)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        return verdict
+
+    def discard(self, record):
+        self._entries.pop((record.pid, record.create_time), None)
+
+    def retain(self, records):
+        # Drop every entry whose process is not in the latest scan
+        live = {(record.pid, record.create_time) for record in records}
+        for key in [key for key in self._entries if key not in live]:
+            del self._entries[key]
+
+    def __len__(self):
+        return len(self._entries)
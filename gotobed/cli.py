@@ -0,0 +1,230 @@
+import argparse
+import os
+import sys
+from datetime import datetime
+
+from gotobed import tracing
+from gotobed.writeback import DRAIN_TIMEOUT
+
+# One rule per line: "22:00", "mon-fri 22:00", "weekends 23:30",
+# "skip 2026-12-24" (no shutdown that day), "2026-12-31 01:30" (one-off override for that day)
+SCHEDULE_RULES = [
+    "22:00",
+]
+
+SCOPE_TARGETS = {
+    'gui': 'Close GUI applications only (Apps tab equivalent)',
+    'user': 'Close all user applications',
+}
+
+
+def check_privileges(backend, interactive=True):
+    if backend.NAME in ['Linux', 'Darwin']:
+        if os.geteuid() != 0:
+            print(f"\nWarning: Running on {backend.NAME} without root privileges")
+            print("The scripts can close applications but may not shutdown the system")
+            print(f"To enable shutdown, run: sudo python3 {os.path.basename(sys.argv[0])}\n")
+            if not interactive:
+                return
+            response = input("Continue anyway? (y/n): ")
+            if response.lower() != 'y':
+                print("Exiting...")
+                exit(0)
+
+
+def schedule_rule(text):
+    # --rule is checked while the arguments are parsed, so a typo is a usage error
+    from gotobed.timetable import parse_rule
+    try:
+        parse_rule(text)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+    return text
+
+
+def parse_args(argv=None, **defaults):
+    parser = argparse.ArgumentParser(prog='gotobed',
+                                     description='Close applications and shut down at a scheduled time')
+    parser.add_argument('--scope', choices=sorted(SCOPE_TARGETS), default='gui',
+                        help="what to close: 'gui' for applications with a window, "
+                             "'user' for every non-system process (default: gui)")
+    parser.add_argument('--rule', dest='rules', action='append', metavar='RULE', type=schedule_rule,
+                        help='schedule rule, e.g. "22:00", "mon-fri 22:00", "skip 2026-12-24"; '
+                             'repeat for several (default: 22:00)')
+    parser.add_argument('--rules-file', metavar='PATH',
+                        help='read the schedule rules from this file, one per line (re-read on reload)')
+    parser.add_argument('--drain-timeout', type=float, default=DRAIN_TIMEOUT, metavar='SECONDS',
+                        help='after closing applications, wait up to this long for dirty data to reach the disk '
+                             f"before shutting down; 0 skips the wait (default: {DRAIN_TIMEOUT})")
+    parser.add_argument('--shutdown-delay', type=float, metavar='SECONDS',
+                        help='time between the shutdown request and the poweroff, to save work or cancel it '
+                             '(default: 60, 30 on Windows; 0 powers off at once)')
+    parser.add_argument('--policy', metavar='PATH',
+                        help='policy file of protected processes and GUI names over the built-in lists, '
+                             'reloaded whenever it changes (default: ~/.config/gotobed/policy.json if it exists)')
+    parser.add_argument('--history', metavar='PATH',
+                        help='where per-application exit times are kept to tune each grace period '
+                             '(default: exit-stats.json under the user state directory)')
+    parser.add_argument('--no-history', dest='use_history', action='store_false',
+                        help='give every application the same grace period and record nothing')
+    parser.add_argument('--no-waves', dest='waves', action='store_false',
+                        help='close up to the concurrency limit at once instead of in waves '
+                             'ordered by footprint and throttled by I/O and memory pressure')
+    parser.add_argument('--dry-run', '--plan', dest='dry_run', action='store_true',
+                        help='scan and classify now, print what would be closed and how long it would take, '
+                             'then exit without closing anything')
+    parser.add_argument('--daemon', action='store_true',
+                        help='stay resident and take status/postpone/cancel/run-now/reload commands '
+                             'on a control socket (see python -m gotobed.ctl)')
+    parser.add_argument('--socket', metavar='PATH', help='control socket for --daemon')
+    parser.add_argument('--fleet', metavar='HOST:PORT',
+                        help='join a fleet controller (python -m gotobed.fleet) and take the schedule, policy and '
+                             'commands from it; stays resident. Set GOTOBED_FLEET_TOKEN to the fleet\'s token')
+    parser.add_argument('--insecure', action='store_true',
+                        help='with --fleet: join without GOTOBED_FLEET_TOKEN and obey any controller at that '
+                             'address, run-now and policy pushes included (only on a network you trust)')
+    tracing.add_arguments(parser)
+    parser.set_defaults(**defaults)
+    args = parser.parse_args(argv)
+
+    if args.fleet is not None and not args.insecure and not os.environ.get('GOTOBED_FLEET_TOKEN'):
+        parser.error("--fleet needs GOTOBED_FLEET_TOKEN set to the fleet's shared token "
+                     "(or --insecure to join without one)")
+    if args.rules_file:
+        from gotobed.timetable import Schedule, read_rules
+        try:
+            Schedule.parse(read_rules(args.rules_file))
+        except OSError as e:
+            parser.error(f"cannot read --rules-file: {e}")
+        except ValueError as e:
+            parser.error(f"{args.rules_file}: {e}")
+    return args
+
+
+def schedule_rules(args):
+    if args.rules_file:
+        from gotobed.timetable import read_rules
+        return read_rules(args.rules_file)
+    return args.rules or SCHEDULE_RULES
+
+
+def load_policy(backend, args):
+    # The user policy over the backend's built-in lists; None when there is none
+    from gotobed.policy import PolicyError, default_policy_path
+
+    path = args.policy
+    if path is None:
+        path = default_policy_path()
+        if not os.path.exists(path):
+            return None
+    try:
+        backend.POLICY.load(path)
+    except PolicyError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    return path
+
+
+def main(argv=None, **defaults):
+    args = parse_args(argv, **defaults)
+    if args.daemon:
+        from gotobed.control import CONTROL_SUPPORTED
+        if not CONTROL_SUPPORTED:
+            print("Error: daemon mode is not supported on Windows (no UNIX domain sockets); "
+                  "run without --daemon", file=sys.stderr)
+            sys.exit(1)
+    tracing.configure(args)
+
+    # Only the running OS's backend is imported, and the event loop, schedule and
+    # teardown machinery only once they are needed
+    from gotobed.backends import load_backend
+    from gotobed.core import ShutdownJob
+    from gotobed.exitstats import ExitStats
+
+    backend = load_backend()
+    stats = ExitStats.load(args.history) if args.use_history else None
+    job = ShutdownJob(backend, scope=args.scope, drain_timeout=args.drain_timeout,
+                      shutdown_delay=args.shutdown_delay, stats=stats, waves=args.waves)
+
+    print(f"\nDetected Operating System: {backend.NAME}")
+    print(f"Target: {SCOPE_TARGETS[args.scope]}\n")
+
+    policy_path = load_policy(backend, args)
+    notes = backend.startup_notes()
+    if policy_path is not None:
+        notes.insert(0, f"Policy: {policy_path} ({backend.POLICY.current.entries} entries)")
+    for note in notes:
+        print(note)
+    if notes:
+        print()
+
+    if args.dry_run:
+        try:
+            job.plan()
+        finally:
+            tracing.disable()
+        return
+
+    resident = args.daemon or args.fleet is not None
+    check_privileges(backend, interactive=not resident)
+
+    import asyncio
+    from gotobed.runtime import ShutdownRuntime
+    from gotobed.timetable import Schedule
+
+    inventory = job.make_inventory()
+    schedule = Schedule.parse(schedule_rules(args))
+    watcher = None
+    if policy_path is not None:
+        from gotobed.policy import PolicyWatcher
+        watcher = PolicyWatcher(backend.POLICY, policy_path)
+    close, shutdown = job.close, job.shutdown
+    agent = None
+    if args.fleet is not None:
+        from gotobed.fleet import FleetAgent, fleet_token
+        agent = FleetAgent(args.fleet, policy=backend.POLICY, system=backend.NAME, token=fleet_token(),
+                           insecure=args.insecure)
+        close, shutdown = agent.reporting(close, shutdown)
+    runtime = ShutdownRuntime(schedule, close=close, shutdown=shutdown, inventory=inventory,
+                              announce=job.announce, once=not resident, policy=watcher)
+    if agent is not None:
+        agent.attach(runtime)
+    try:
+        if args.daemon:
+            from gotobed.control import ControlServer
+
+            def reload(rules=None):
+                rules = rules or schedule_rules(args)
+                runtime.reschedule(Schedule.parse(rules))
+                print(f"[{datetime.now().strftime('%H:%M:%S')}] Schedule reloaded: {', '.join(rules)}")
+                return rules
+
+            serve = ControlServer(runtime, args.socket, reload=reload).run()
+        else:
+            serve = runtime.run()
+        if agent is not None:
+            serve = agent.serve(serve)
+        asyncio.run(serve)
+    finally:
+        if watcher is not None:
+            watcher.close()
+        tracing.disable()
+
+    if runtime.state == 'done':
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] Shutdown initiated successfully.")
+        print("\nYou can now close this window or wait for shutdown to complete.")
+    elif runtime.state == 'failed':
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] Could not shut down the system, see above.")
+
+
+def run(argv=None, **defaults):
+    try:
+        main(argv, **defaults)
+    except KeyboardInterrupt:
+        print("\n\nScript terminated by user")
+    except Exception as e:
+        print(f"\nError occurred: {e}")
+        import traceback
+        traceback.print_exc()
+        if sys.stdin.isatty():
+            input("Press Enter to exit...")
@@ -0,0 +1,206 @@
+import json
+import os
+import socket
+
+# Control socket for the resident daemon (`gotobed --daemon`): one JSON object per
+# line each way, any number of requests per connection.
+#
+#   {"command": "status"}                      -> {"ok": true, "state": ..., "target": ...}
+#   {"command": "postpone", "seconds": 1800}   -> {"ok": true, "target": ...}
+#   {"command": "cancel"} / {"command": "run-now"}
+#   {"command": "reload", "rules": [...]}      -> rules from the request, else re-read
+#
+# Errors come back as {"ok": false, "error": "..."}. The client side only needs
+# socket and json, so `python -m gotobed.ctl` never pays for asyncio or psutil.
+
+MAX_REQUEST = 64 * 1024
+MAX_POSTPONE = 30 * 24 * 3600
+
+# asyncio has no UNIX domain socket server on Windows
+CONTROL_SUPPORTED = hasattr(socket, 'AF_UNIX') and os.name != 'nt'
+
+
+class ControlError(Exception):
+    pass
+
+
+def default_socket_path(name='gotobed'):
+    # name: 'gotobed', or 'gotobed-fleet' for the fleet controller (fleet.py)
+    variable = name.upper().replace('-', '_') + '_SOCKET'
+    if os.environ.get(variable):
+        return os.environ[variable]
+    if not hasattr(os, 'geteuid'):
+        import tempfile
+        return os.path.join(tempfile.gettempdir(), f"{name}.sock")
+    if os.geteuid() == 0:
+        return f"/run/{name}.sock"
+    runtime_dir = os.environ.get('XDG_RUNTIME_DIR')
+    if runtime_dir:
+        return os.path.join(runtime_dir, f"{name}.sock")
+    return f"/tmp/{name}-{os.getuid()}.sock"
+
+
+def positive_seconds(request):
+    seconds = request.get('seconds')
+    if not isinstance(seconds, (int, float)) or not 0 < seconds <= MAX_POSTPONE:
+        raise ValueError(f"'postpone' needs a positive number of seconds, at most {MAX_POSTPONE // 86400} days")
+    return seconds
+
+
+def rule_list(rules):
+    if not (isinstance(rules, list) and all(isinstance(rule, str) for rule in rules)):
+        raise ValueError("'rules' must be a list of strings")
+    return rules
+
+
+class ControlClient:
+    def __init__(self, path=None, timeout=5, name='gotobed'):
+        self.path = path or default_socket_path(name)
+        if not os.path.exists(self.path) and path is None and os.path.exists(f"/run/{name}.sock"):
+            # A daemon started with sudo listens on the system socket
+            self.path = f"/run/{name}.sock"
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        try:
+            self.sock.connect(self.path)
+        except OSError as e:
+            self.sock.close()
+            raise ControlError(f"No daemon listening on {self.path}: {e.strerror or e}")
+        self.reader = self.sock.makefile('rb')
+
+    def request(self, command, **params):
+        params['command'] = command
+        self.sock.sendall(json.dumps(params).encode() + b'\n')
+        line = self.reader.readline()
+        if not line:
+            raise ControlError('Daemon closed the connection')
+        reply = json.loads(line)
+        if not reply.get('ok'):
+            raise ControlError(reply.get('error', 'request failed'))
+        return reply
+
+    def close(self):
+        self.reader.close()
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class ControlServer:
+    # Maps requests onto the ShutdownRuntime controls; everything runs on the runtime's loop
+
+    def __init__(self, runtime, path=None, reload=None):
+        self.runtime = runtime
+        # Resolved in start(): the fleet agent (fleet.py) only uses handle()
+        self.path = path
+        self.reload = reload
+        self.server = None
+
+    async def handle(self, request):
+        command = request.get('command')
+        runtime = self.runtime
+
+        if command == 'status':
+            return await runtime.query_status()
+
+        if command == 'postpone':
+            target = runtime.postpone(positive_seconds(request))
+            return {'target': target.isoformat(timespec='seconds')}
+
+        if command == 'cancel':
+            skipped = runtime.cancel()
+            upcoming = runtime.upcoming()
+            return {'skipped': skipped.isoformat(timespec='seconds') if skipped else None,
+                    'target': upcoming.isoformat(timespec='seconds') if upcoming else None}
+
+        if command == 'run-now':
+            runtime.run_now()
+            return {}
+
+        if command == 'reload':
+            if self.reload is None:
+                raise ValueError('this daemon has nothing to reload')
+            rules = request.get('rules')
+            if rules is not None:
+                rule_list(rules)
+            return {'rules': self.reload(rules)}
+
+        raise ValueError(f"Unknown command '{command}'")
+
+    async def _serve_client(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError('request must be a JSON object')
+                    reply = {'ok': True}
+                    reply.update(await self.handle(request))
+                except (ValueError, OSError, OverflowError) as e:
+                    reply = {'ok': False, 'error': str(e)}
+                writer.write(json.dumps(reply).encode() + b'\n')
+                await writer.drain()
+        except (ConnectionError, ValueError):
+            # ValueError: a line over MAX_REQUEST
+            pass
+        finally:
+            writer.close()
+
+    def _clear_stale_socket(self):
+        if not os.path.exists(self.path):
+            return
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(self.path)
+        except OSError:
+            os.unlink(self.path)
+            return
+        finally:
+            probe.close()
+        raise ControlError(f"Another daemon is already listening on {self.path}")
+
+    async def start(self):
+        import asyncio
+
+        if not CONTROL_SUPPORTED:
+            raise ControlError('Daemon mode is not supported on Windows (no UNIX domain sockets)')
+        if self.path is None:
+            self.path = default_socket_path()
+        self._clear_stale_socket()
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Owner only: anyone who can connect can postpone or trigger the shutdown
+        old_umask = os.umask(0o177)
+        try:
+            self.server = await asyncio.start_unix_server(self._serve_client, self.path, limit=MAX_REQUEST)
+        finally:
+            os.umask(old_umask)
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+            self.server = None
+        if self.path is None:
+            return
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+    async def run(self):
+        # Serve for as long as the runtime runs
+        await self.start()
+        print(f"Listening for control commands on {self.path}")
+        try:
+            await self.runtime.run()
+        finally:
+            await self.close()
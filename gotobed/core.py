@@ -0,0 +1,221 @@
+from datetime import datetime
+
+from gotobed import tracing
+from gotobed.classcache import ClassificationCache
+from gotobed.exitstats import stats_key
+from gotobed.inventory import ProcessInventory
+from gotobed.proctree import group_applications
+from gotobed.snapshot import take_snapshot
+from gotobed.writeback import DRAIN_TIMEOUT, drain_writeback, read_dirty
+
+CLOSE_GRACE = 3
+CLOSE_DEADLINE = 30
+CLOSE_CONCURRENCY = 16
+
+# What gets closed: 'gui' is the Apps-tab equivalent (main.py), 'user' is every
+# non-system process the user runs (the jinjerous_files scripts)
+SCOPES = {
+    'gui': 'GUI applications',
+    'user': 'user applications',
+}
+
+
+def report_close_result(result):
+    processes = f" ({result.processes} processes)" if result.processes > 1 else ''
+    if result.outcome == 'closed':
+        print(f"Closed gracefully: {result.name}{processes}")
+    elif result.outcome == 'killed':
+        print(f"Force closed: {result.name}{processes}")
+    elif result.outcome == 'expired':
+        print(f"Force closed, out of time: {result.name}{processes}")
+    else:
+        print(f"Could not close: {result.name} (PID: {result.pid})")
+
+
+class ShutdownJob:
+    # One OS backend and one scope: what to close, how to close it and how to shut down.
+    # The backend supplies the rules; the scan, teardown and reporting are shared.
+
+    def __init__(self, backend, scope='gui', grace=CLOSE_GRACE, deadline=CLOSE_DEADLINE,
+                 concurrency=CLOSE_CONCURRENCY, drain_timeout=DRAIN_TIMEOUT, shutdown_delay=None, stats=None, waves=True):
+        self.backend = backend
+        self.scope = scope
+        self.grace = grace
+        self.deadline = deadline
+        self.concurrency = concurrency
+        self.drain_timeout = drain_timeout
+        self.shutdown_delay = shutdown_delay
+        self.stats = stats
+        self.waves = waves
+        self.cache = ClassificationCache(backend.VERDICTS[scope], policy=backend.POLICY)
+
+    @property
+    def label(self):
+        return SCOPES[self.scope]
+
+    def make_inventory(self):
+        inventory = ProcessInventory(self.cache, events=self.backend.open_events(), forget=self.backend.forget)
+        with tracing.profiled('inventory'):
+            inventory.refresh()
+        return inventory
+
+    def select(self, inventory=None):
+        # Scan and classify. Returns (records, targets, closer); the closer is the
+        # backend's window connection when it has one, else None.
+        with tracing.profiled('scan'):
+            if inventory is not None:
+                inventory.update()
+                records = list(inventory.records.values())
+                classified = inventory.targets
+            else:
+                records = take_snapshot()
+                self.cache.retain(records)
+                self.backend.retain(records)
+
+                def classified():
+                    return [record for record in records if self.cache.lookup(record).allowed]
+
+        with tracing.profiled('classify'):
+            closer = self.backend.open_closer()
+            if closer is not None and self.scope == 'gui':
+                targets = self.backend.gui_targets(records, classified, closer.windows)
+            else:
+                targets = classified()
+
+        return records, targets, closer
+
+    def spare_reason(self, record, closer=None):
+        if closer is not None and self.scope == 'gui':
+            return self.backend.spare_reason(record, closer.windows, self.cache)
+        return self.cache.lookup(record).reason
+
+    def grace_for(self, record):
+        # Per-app grace from the exit history (exitstats.py), the flat grace without one
+        if self.stats is None:
+            return self.grace
+        return self.stats.grace_for(stats_key(record), self.grace)
+
+    def close(self, inventory=None):
+        from gotobed.snapshot import processes_for
+        from gotobed.teardown import teardown_applications
+
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] Starting to close {self.label}...")
+        if self.scope == 'gui':
+            print(f"    (Only closing apps from 'Apps' tab, not background processes)\n")
+
+        records, targets, closer = self.select(inventory)
+        if closer is not None and self.scope == 'gui':
+            print(f"Found {len(targets)} processes with a {self.backend.WINDOW_REASON}\n")
+
+        apps = []
+        roots = {}
+        graces = {}
+        for app in group_applications(targets, records):
+            helpers = len(app.members) - 1
+            suffix = f" with {helpers} helper processes" if helpers else ''
+            print(f"Closing: {app.root.name} (PID: {app.root.pid}){suffix}")
+            apps.append(processes_for(app.members))
+            roots[app.root.pid] = app.root
+            graces[app.root.pid] = self.grace_for(app.root)
+
+        gate = None
+        if self.waves:
+            # Release apps in pressure-gated waves, the heaviest flushers leading (waves.py)
+            from gotobed.waves import open_wave_gate, order_by_footprint
+            apps = order_by_footprint(apps)
+            gate = open_wave_gate(maximum=self.concurrency)
+
+        def on_result(result):
+            report_close_result(result)
+            if self.stats is not None and result.pid in roots:
+                self.stats.record(stats_key(roots[result.pid]), result.seconds, result.outcome, graces[result.pid])
+
+        try:
+            with tracing.span('teardown', apps=len(apps)):
+                results = teardown_applications(
+                    apps, close=closer.request_close if closer is not None else None,
+                    grace=self.grace, deadline=self.deadline, concurrency=self.concurrency,
+                    on_result=on_result, wait=closer.wait if closer is not None else None,
+                    grace_for=lambda group: graces.get(group[0].pid, self.grace),
+                    admit=gate.limit if gate is not None else None)
+        finally:
+            if closer is not None:
+                closer.close()
+            if self.stats is not None:
+                try:
+                    self.stats.save()
+                except OSError as e:
+                    print(f"Could not save exit history: {e}")
+        closed = [result.name for result in results if result.outcome != 'failed']
+
+        print(f"\n[{datetime.now().strftime('%H:%M:%S')}] Application closing complete.")
+        print(f"  Closed {len(closed)} {self.label}")
+        if self.scope == 'user':
+            print(f"  Protected: {len(records) - len(targets)} system processes")
+
+        if closed:
+            print(f"\n Apps closed: {', '.join(set(closed))}")
+        return results
+
+    def plan(self, inventory=None):
+        # --dry-run: the real scan and classification, then report instead of closing
+        from gotobed.plan import print_plan
+
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] Dry run: scanning and classifying, nothing will be closed\n")
+
+        records, targets, closer = self.select(inventory)
+        try:
+            target_pids = {record.pid for record in targets}
+            spared = [(record, self.spare_reason(record, closer))
+                      for record in records if record.pid not in target_pids]
+        finally:
+            if closer is not None:
+                closer.close()
+
+        apps = group_applications(targets, records)
+        target_reason = 'visible window' if self.scope == 'gui' else 'user application'
+        if closer is not None and self.scope == 'gui':
+            target_reason = self.backend.WINDOW_REASON
+
+        graces = {}
+        history = {}
+        if self.stats is not None:
+            for app in apps:
+                graces[app.root.pid] = self.grace_for(app.root)
+                history[app.root.pid] = self.stats.describe(stats_key(app.root))
+
+        print_plan(apps, spared, target_reason,
+                   grace=self.grace, deadline=self.deadline, concurrency=self.concurrency,
+                   graces=graces, history=history)
+        if self.drain_timeout:
+            dirty = read_dirty()
+            if dirty is not None:
+                print(f"Then flush {dirty / (1024 * 1024):.1f} MB of dirty data (currently), "
+                      f"waiting up to {self.drain_timeout:g}s")
+        return apps, spared
+
+    def shutdown(self, target_time=None):
+        if self.drain_timeout:
+            print(f"\n[{datetime.now().strftime('%H:%M:%S')}] Preparing for system shutdown...")
+            drain_writeback(timeout=self.drain_timeout)
+
+        # None keeps the backend's own delay (SHUTDOWN_DELAY)
+        delay = self.shutdown_delay if self.shutdown_delay is not None else self.backend.SHUTDOWN_DELAY
+        with tracing.span('shutdown', os=self.backend.NAME):
+            return self.backend.shutdown_system(target_time, delay=delay)
+
+    def announce(self, target_time):
+        now = datetime.now()
+        time_difference = max(0, (target_time - now).total_seconds())
+
+        print(f"\n{'=' * 70}")
+        print(f"Scheduled Shutdown System - {self.backend.NAME}")
+        print(f"\n{'=' * 70}")
+        print(f"Current time: {now.strftime('%Y-%m-%d %H:%M:%S')}")
+        print(f"Shutdown scheduled for: {target_time.strftime('%Y-%m-%d %H:%M:%S')}")
+        print(f"Time until shutdown: {int(time_difference // 3600)}h {int((time_difference % 3600) // 60)}m {int(time_difference % 60)}s")
+        print(f"\n{'=' * 70}")
+
+        print("Script is now running in the foreground")
+        print(f"It will wait until {target_time.strftime('%H:%M')} to close {self.label} and shutdown")
+        print("Press Ctrl+C to cancel\n")
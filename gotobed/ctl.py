@@ -0,0 +1,143 @@
+import argparse
+import json
+import re
+import sys
+
+from gotobed.control import ControlClient, ControlError
+
+DURATION_RE = re.compile(r'^(\d+(?:\.\d+)?)([smh]?)$')
+DURATION_UNITS = {'s': 1, 'm': 60, 'h': 3600, '': 60}
+
+
+def parse_duration(text):
+    # "90s", "30m", "1.5h"; a bare number is minutes
+    match = DURATION_RE.match(text.strip().lower())
+    if not match:
+        raise argparse.ArgumentTypeError(f"Invalid duration '{text}', expected e.g. 30m, 90s or 1h")
+    return float(match.group(1)) * DURATION_UNITS[match.group(2)]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog='gotobed.ctl', description='Control a running `gotobed --daemon`')
+    parser.add_argument('--socket', help='control socket of the daemon')
+    parser.add_argument('--fleet', action='store_true',
+                        help='talk to the fleet controller (python -m gotobed.fleet) instead: every command '
+                             'goes to all of its hosts')
+    parser.add_argument('--json', action='store_true', help='print the raw reply')
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('status', help='state, next shutdown and time remaining')
+    postpone = commands.add_parser('postpone', help='move the next shutdown later')
+    postpone.add_argument('duration', type=parse_duration, help='e.g. 30m, 90s, 1h (bare numbers are minutes)')
+    commands.add_parser('cancel', help='skip the next shutdown; the schedule carries on after it')
+    commands.add_parser('run-now', help='close applications and shut down right away')
+    reload = commands.add_parser('reload', help='replace the schedule, or re-read the rules file')
+    reload.add_argument('--rule', dest='rules', action='append', metavar='RULE',
+                        help='new schedule rule; repeat for several')
+    commands.add_parser('hosts', help='with --fleet: the connected hosts and their clock offsets')
+    commands.add_parser('reports', help='with --fleet: the latest teardown and shutdown report from each host')
+    return parser.parse_args(argv)
+
+
+def print_reply(command, reply):
+    if command == 'status':
+        print(f"State: {reply['state']}")
+        print(f"Next shutdown: {reply['target'] or 'none'}")
+        if reply.get('remaining') is not None:
+            remaining = reply['remaining']
+            print(f"Time until shutdown: {remaining // 3600}h {(remaining % 3600) // 60}m {remaining % 60}s")
+        if reply.get('last_run'):
+            print(f"Last run: {reply['last_run']}")
+        if 'processes' in reply:
+            print(f"Watching {reply['processes']} processes, {reply['targets']} would be closed")
+    elif command == 'postpone':
+        print(f"Shutdown postponed to {reply['target']}")
+    elif command == 'cancel':
+        print(f"Skipped the shutdown at {reply['skipped']}" if reply['skipped'] else "Dropped the postponed shutdown")
+        print(f"Next shutdown: {reply['target'] or 'none'}")
+    elif command == 'run-now':
+        print("Closing applications and shutting down now")
+    elif command == 'reload':
+        print(f"Schedule reloaded: {', '.join(reply['rules'])}")
+
+
+def describe_host_reply(command, reply):
+    if 'error' in reply:
+        return f"error: {reply['error']}"
+    if command == 'status':
+        return f"{reply['state']}, next shutdown {reply['target'] or 'none'}"
+    if command == 'postpone':
+        return f"postponed to {reply['target']}"
+    if command == 'cancel':
+        return f"next shutdown {reply['target'] or 'none'}"
+    if command == 'run-now':
+        return "closing applications and shutting down"
+    return f"next shutdown {reply.get('target') or 'none'}"
+
+
+def describe_report(report):
+    if report.get('phase') == 'closed':
+        results = report.get('results') or []
+        killed = sum(1 for result in results if result.get('outcome') in ('killed', 'expired'))
+        return (f"closed {len(results)} applications in {report.get('seconds', 0):.1f}s"
+                + (f", {killed} force closed" if killed else ''))
+    poweroff = report.get('poweroff') or {}
+    if poweroff.get('ok'):
+        return f"shutdown requested via {poweroff['method']} for {report.get('target')}"
+    return f"shutdown failed: {poweroff.get('detail', 'not requested')}"
+
+
+def print_fleet_reply(command, reply):
+    if command == 'hosts':
+        for agent in reply['agents']:
+            skew = f"{agent['skew']:+.3f}s" if agent['skew'] is not None else '?'
+            print(f"{agent['host']:<24} {agent['address']:<22} clock {skew:>9}  "
+                  f"since {agent['connected']}  last report: {agent['last_report'] or 'none'}")
+        print(f"{len(reply['agents'])} hosts connected")
+    elif command == 'reports':
+        for host, reports in reply['reports'].items():
+            print(f"{host:<24} {describe_report(reports[-1]) if reports else 'no reports yet'}")
+    else:
+        if command == 'reload':
+            print(f"Schedule pushed: {', '.join(reply['rules'])}")
+        hosts = reply['hosts']
+        for host, host_reply in hosts.items():
+            print(f"{host:<24} {describe_host_reply(command, host_reply)}")
+        failed = sum(1 for host_reply in hosts.values() if 'error' in host_reply)
+        print(f"{len(hosts) - failed}/{len(hosts)} hosts ok")
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    params = {}
+    if args.command == 'postpone':
+        params['seconds'] = args.duration
+    elif args.command == 'reload' and args.rules:
+        params['rules'] = args.rules
+
+    if args.command in ('hosts', 'reports') and not args.fleet:
+        print(f"Error: '{args.command}' needs --fleet", file=sys.stderr)
+        return 1
+
+    try:
+        if args.fleet:
+            # Fanned out to every host, each with its own timeout
+            client = ControlClient(args.socket, timeout=30, name='gotobed-fleet')
+        else:
+            client = ControlClient(args.socket)
+        with client:
+            reply = client.request(args.command, **params)
+    except ControlError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+    if args.json:
+        print(json.dumps(reply, indent=2))
+    elif args.fleet:
+        print_fleet_reply(args.command, reply)
+    else:
+        print_reply(args.command, reply)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,363 @@
+import os
+import socket
+import struct
+
+# Just enough of the D-Bus wire protocol to call logind: EXTERNAL auth over a UNIX
+# socket, method calls and their replies, and (for benchmarks/stub_logind.py) owning
+# a name and answering calls. Only little-endian messages are written; both byte
+# orders are read. No file descriptors, no introspection.
+
+SYSTEM_BUS = 'unix:path=/var/run/dbus/system_bus_socket'
+CALL_TIMEOUT = 10
+
+METHOD_CALL = 1
+METHOD_RETURN = 2
+ERROR = 3
+SIGNAL = 4
+
+NO_REPLY_EXPECTED = 0x1
+
+FIELD_PATH = 1
+FIELD_INTERFACE = 2
+FIELD_MEMBER = 3
+FIELD_ERROR_NAME = 4
+FIELD_REPLY_SERIAL = 5
+FIELD_DESTINATION = 6
+FIELD_SENDER = 7
+FIELD_SIGNATURE = 8
+
+FIELD_TYPES = {
+    FIELD_PATH: 'o', FIELD_INTERFACE: 's', FIELD_MEMBER: 's', FIELD_ERROR_NAME: 's',
+    FIELD_REPLY_SERIAL: 'u', FIELD_DESTINATION: 's', FIELD_SENDER: 's', FIELD_SIGNATURE: 'g',
+}
+
+# type code -> (struct format, size = alignment)
+FIXED = {
+    'y': ('B', 1), 'b': ('I', 4), 'n': ('h', 2), 'q': ('H', 2), 'i': ('i', 4),
+    'u': ('I', 4), 'x': ('q', 8), 't': ('Q', 8), 'd': ('d', 8), 'h': ('I', 4),
+}
+ALIGNMENT = {'s': 4, 'o': 4, 'g': 1, 'v': 1, 'a': 4, '(': 8, '{': 8}
+
+MAX_MESSAGE = 128 * 1024 * 1024
+
+
+class DBusError(Exception):
+    def __init__(self, name, text=''):
+        super().__init__(f"{name}: {text}" if text else name)
+        self.name = name
+        self.text = text
+
+
+def split_signature(signature):
+    # 'sa{sv}(ii)' -> ['s', 'a{sv}', '(ii)']
+    types = []
+    i = 0
+    while i < len(signature):
+        end = _complete_type_end(signature, i)
+        types.append(signature[i:end])
+        i = end
+    return types
+
+
+def _complete_type_end(signature, i):
+    code = signature[i]
+    if code == 'a':
+        return _complete_type_end(signature, i + 1)
+    if code in '({':
+        close = ')' if code == '(' else '}'
+        i += 1
+        while signature[i] != close:
+            i = _complete_type_end(signature, i)
+        return i + 1
+    if code not in FIXED and code not in ALIGNMENT:
+        raise ValueError(f"Unsupported D-Bus type '{code}' in '{signature}'")
+    return i + 1
+
+
+def _alignment(code):
+    return FIXED[code][1] if code in FIXED else ALIGNMENT[code]
+
+
+class _Writer:
+    def __init__(self):
+        self.buf = bytearray()
+
+    def align(self, n):
+        self.buf.extend(b'\0' * (-len(self.buf) % n))
+
+    def write(self, signature, values):
+        for code, value in zip(split_signature(signature), values):
+            self.write_one(code, value)
+
+    def write_one(self, code, value):
+        head = code[0]
+        if head in FIXED:
+            fmt, size = FIXED[head]
+            self.align(size)
+            self.buf.extend(struct.pack('<' + fmt, int(value) if head == 'b' else value))
+        elif head in 'so':
+            data = value.encode()
+            self.align(4)
+            self.buf.extend(struct.pack('<I', len(data)) + data + b'\0')
+        elif head == 'g':
+            data = value.encode()
+            self.buf.extend(struct.pack('<B', len(data)) + data + b'\0')
+        elif head == 'v':
+            signature, inner = value
+            self.write_one('g', signature)
+            self.write_one(signature, inner)
+        elif head == 'a':
+            element = code[1:]
+            self.align(4)
+            at = len(self.buf)
+            self.buf.extend(b'\0\0\0\0')
+            self.align(_alignment(element[0]))
+            start = len(self.buf)
+            items = value.items() if element[0] == '{' else value
+            for item in items:
+                self.write_one(element, item)
+            self.buf[at:at + 4] = struct.pack('<I', len(self.buf) - start)
+        else:
+            self.align(8)
+            self.write(code[1:-1], value)
+
+
+class _Reader:
+    def __init__(self, data, little, offset=0):
+        self.data = data
+        self.order = '<' if little else '>'
+        self.offset = offset
+
+    def align(self, n):
+        self.offset += -self.offset % n
+
+    def read(self, signature):
+        return tuple(self.read_one(code) for code in split_signature(signature))
+
+    def _unpack(self, fmt, size):
+        value, = struct.unpack_from(self.order + fmt, self.data, self.offset)
+        self.offset += size
+        return value
+
+    def read_one(self, code):
+        head = code[0]
+        if head in FIXED:
+            fmt, size = FIXED[head]
+            self.align(size)
+            value = self._unpack(fmt, size)
+            return bool(value) if head == 'b' else value
+        if head in 'so':
+            self.align(4)
+            length = self._unpack('I', 4)
+            value = bytes(self.data[self.offset:self.offset + length]).decode()
+            self.offset += length + 1
+            return value
+        if head == 'g':
+            length = self._unpack('B', 1)
+            value = bytes(self.data[self.offset:self.offset + length]).decode()
+            self.offset += length + 1
+            return value
+        if head == 'v':
+            signature = self.read_one('g')
+            return signature, self.read_one(signature)
+        if head == 'a':
+            element = code[1:]
+            self.align(4)
+            length = self._unpack('I', 4)
+            self.align(_alignment(element[0]))
+            end = self.offset + length
+            items = []
+            while self.offset < end:
+                items.append(self.read_one(element))
+            return dict(items) if element[0] == '{' else items
+        self.align(8)
+        return self.read(code[1:-1])
+
+
+class Message:
+    def __init__(self, kind, fields, body=(), serial=0, flags=0):
+        self.kind = kind
+        self.fields = fields
+        self.body = tuple(body)
+        self.serial = serial
+        self.flags = flags
+
+    @property
+    def member(self):
+        return self.fields.get(FIELD_MEMBER)
+
+    @property
+    def interface(self):
+        return self.fields.get(FIELD_INTERFACE)
+
+    @property
+    def path(self):
+        return self.fields.get(FIELD_PATH)
+
+    @property
+    def sender(self):
+        return self.fields.get(FIELD_SENDER)
+
+    @property
+    def signature(self):
+        return self.fields.get(FIELD_SIGNATURE, '')
+
+    def encode(self):
+        body = _Writer()
+        body.write(self.signature, self.body)
+        fields = [(code, (FIELD_TYPES[code], value)) for code, value in sorted(self.fields.items())]
+        message = _Writer()
+        message.buf.extend(struct.pack('<cBBBII', b'l', self.kind, self.flags, 1, len(body.buf), self.serial))
+        message.write_one('a(yv)', fields)
+        message.align(8)
+        return bytes(message.buf + body.buf)
+
+    @classmethod
+    def decode(cls, data):
+        little = data[:1] == b'l'
+        order = '<' if little else '>'
+        kind, flags, _, body_length, serial, fields_length = struct.unpack_from(order + 'BBBIII', data, 1)
+        reader = _Reader(data, little, 12)
+        fields = {code: value for code, (_, value) in reader.read_one('a(yv)')}
+        reader.align(8)
+        message = cls(kind, fields, serial=serial, flags=flags)
+        message.body = _Reader(data[reader.offset:], little).read(message.signature)
+        return message
+
+
+def parse_address(address):
+    # First unix: entry of a bus address ('unix:path=/run/bus;unix:abstract=x')
+    for entry in address.split(';'):
+        transport, _, params = entry.partition(':')
+        if transport != 'unix':
+            continue
+        options = dict(part.split('=', 1) for part in params.split(',') if '=' in part)
+        if 'path' in options:
+            return _unescape(options['path'])
+        if 'abstract' in options:
+            return '\0' + _unescape(options['abstract'])
+    raise DBusError('org.freedesktop.DBus.Error.BadAddress', f"no usable unix address in '{address}'")
+
+
+def _unescape(value):
+    parts = value.split('%')
+    out = parts[0]
+    for part in parts[1:]:
+        out += chr(int(part[:2], 16)) + part[2:]
+    return out
+
+
+def system_bus_address():
+    return os.environ.get('DBUS_SYSTEM_BUS_ADDRESS') or SYSTEM_BUS
+
+
+class Connection:
+    def __init__(self, address=None, timeout=CALL_TIMEOUT):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        self.serial = 0
+        self.pending = []
+        self._buffer = bytearray()
+        try:
+            self.sock.connect(parse_address(address or system_bus_address()))
+            self._authenticate()
+            self.name, = self.call('org.freedesktop.DBus', '/org/freedesktop/DBus',
+                                   'org.freedesktop.DBus', 'Hello')
+        except (OSError, DBusError):
+            self.sock.close()
+            raise
+
+    def _authenticate(self):
+        uid = str(os.geteuid()).encode().hex().encode()
+        self.sock.sendall(b'\0AUTH EXTERNAL ' + uid + b'\r\n')
+        line = self._read_line()
+        if not line.startswith(b'OK '):
+            raise DBusError('org.freedesktop.DBus.Error.AuthFailed', line.decode(errors='replace'))
+        self.sock.sendall(b'BEGIN\r\n')
+
+    def _read_line(self):
+        while b'\r\n' not in self._buffer:
+            self._fill()
+        line, _, rest = bytes(self._buffer).partition(b'\r\n')
+        self._buffer = bytearray(rest)
+        return line
+
+    def _fill(self):
+        chunk = self.sock.recv(65536)
+        if not chunk:
+            raise ConnectionError('D-Bus connection closed')
+        self._buffer.extend(chunk)
+
+    def _read_message(self):
+        while len(self._buffer) < 16:
+            self._fill()
+        order = '<' if self._buffer[:1] == b'l' else '>'
+        body_length, = struct.unpack_from(order + 'I', self._buffer, 4)
+        fields_length, = struct.unpack_from(order + 'I', self._buffer, 12)
+        total = 16 + fields_length + (-fields_length % 8) + body_length
+        if total > MAX_MESSAGE:
+            raise DBusError('org.freedesktop.DBus.Error.LimitsExceeded', f"{total} byte message")
+        while len(self._buffer) < total:
+            self._fill()
+        data = bytes(self._buffer[:total])
+        del self._buffer[:total]
+        return Message.decode(data)
+
+    def send(self, message):
+        self.serial += 1
+        message.serial = self.serial
+        self.sock.sendall(message.encode())
+        return message.serial
+
+    def call(self, destination, path, interface, member, signature='', args=()):
+        fields = {FIELD_PATH: path, FIELD_INTERFACE: interface, FIELD_MEMBER: member,
+                  FIELD_DESTINATION: destination}
+        if signature:
+            fields[FIELD_SIGNATURE] = signature
+        serial = self.send(Message(METHOD_CALL, fields, args))
+        while True:
+            message = self._read_message()
+            if message.fields.get(FIELD_REPLY_SERIAL) != serial:
+                # Calls and signals for a service connection, see receive()
+                self.pending.append(message)
+                continue
+            if message.kind == ERROR:
+                raise DBusError(message.fields.get(FIELD_ERROR_NAME, 'org.freedesktop.DBus.Error.Failed'),
+                                message.body[0] if message.body and isinstance(message.body[0], str) else '')
+            return message.body
+
+    def request_name(self, name):
+        # 1 = primary owner; anything else means someone else has it
+        result, = self.call('org.freedesktop.DBus', '/org/freedesktop/DBus', 'org.freedesktop.DBus',
+                            'RequestName', 'su', (name, 4))
+        if result != 1:
+            raise DBusError('org.freedesktop.DBus.Error.NameHasNoOwner', f"could not own {name} ({result})")
+
+    def receive(self):
+        if self.pending:
+            return self.pending.pop(0)
+        return self._read_message()
+
+    def reply(self, call, signature='', args=()):
+        if call.flags & NO_REPLY_EXPECTED:
+            return
+        fields = {FIELD_REPLY_SERIAL: call.serial, FIELD_DESTINATION: call.sender}
+        if signature:
+            fields[FIELD_SIGNATURE] = signature
+        self.send(Message(METHOD_RETURN, fields, args))
+
+    def reply_error(self, call, name, text=''):
+        if call.flags & NO_REPLY_EXPECTED:
+            return
+        fields = {FIELD_REPLY_SERIAL: call.serial, FIELD_DESTINATION: call.sender,
+                  FIELD_ERROR_NAME: name, FIELD_SIGNATURE: 's'}
+        self.send(Message(ERROR, fields, (text,)))
+
+    def close(self):
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,125 @@
+import ctypes
+import errno
+import os
+import platform
+import select
+import time
+
+CURRENT_OS = platform.system()
+
+# Without timerfd we re-read the wall clock at least this often, which bounds how
+# late a suspend or a clock step can make us
+FALLBACK_MAX_STEP = 60
+
+CLOCK_REALTIME = 0
+TFD_NONBLOCK = os.O_NONBLOCK
+TFD_CLOEXEC = getattr(os, 'O_CLOEXEC', 0)
+TFD_TIMER_ABSTIME = 1 << 0
+TFD_TIMER_CANCEL_ON_SET = 1 << 1
+
+
+class _Timespec(ctypes.Structure):
+    _fields_ = [('tv_sec', ctypes.c_long), ('tv_nsec', ctypes.c_long)]
+
+
+class _Itimerspec(ctypes.Structure):
+    _fields_ = [('it_interval', _Timespec), ('it_value', _Timespec)]
+
+
+_libc = None
+if CURRENT_OS == 'Linux':
+    try:
+        _libc = ctypes.CDLL(None, use_errno=True)
+        _libc.timerfd_create.argtypes = [ctypes.c_int, ctypes.c_int]
+        _libc.timerfd_settime.argtypes = [ctypes.c_int, ctypes.c_int,
+                                          ctypes.POINTER(_Itimerspec), ctypes.POINTER(_Itimerspec)]
+    except (OSError, AttributeError):
+        _libc = None
+
+TIMERFD_AVAILABLE = _libc is not None
+
+
+class WallClock:
+    def time(self):
+        return time.time()
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+
+class DeadlineTimer:
+    # Fires at an absolute local wall-clock time. On Linux this is a CLOCK_REALTIME
+    # timerfd armed with TFD_TIMER_CANCEL_ON_SET: it fires correctly after suspend,
+    # and any clock step wakes us so we can re-arm against the new time.
+    # `target` is a naive local datetime; its timestamp is recomputed on every check,
+    # so DST and timezone changes move the deadline with the wall clock.
+
+    def __init__(self, target, clock=None, max_step=FALLBACK_MAX_STEP):
+        self.target = target
+        self.clock = clock or WallClock()
+        self.max_step = max_step
+        self.rearms = 0
+        self._fd = None
+
+        if clock is None and TIMERFD_AVAILABLE:
+            fd = _libc.timerfd_create(CLOCK_REALTIME, TFD_NONBLOCK | TFD_CLOEXEC)
+            if fd >= 0:
+                self._fd = fd
+                self._arm()
+
+    def _arm(self):
+        deadline = self.target.timestamp()
+        spec = _Itimerspec()
+        spec.it_value.tv_sec = int(deadline)
+        spec.it_value.tv_nsec = int((deadline - int(deadline)) * 1e9)
+        if spec.it_value.tv_sec <= 0 and spec.it_value.tv_nsec <= 0:
+            spec.it_value.tv_nsec = 1
+        if _libc.timerfd_settime(self._fd, TFD_TIMER_ABSTIME | TFD_TIMER_CANCEL_ON_SET,
+                                 ctypes.byref(spec), None) != 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+
+    def fileno(self):
+        return self._fd
+
+    def remaining(self):
+        return self.target.timestamp() - self.clock.time()
+
+    def expired(self):
+        if self._fd is not None:
+            try:
+                os.read(self._fd, 8)
+                return True
+            except BlockingIOError:
+                pass
+            except OSError as e:
+                if e.errno != errno.ECANCELED:
+                    raise
+                # The wall clock was set; the old expiry is meaningless now
+                self.rearms += 1
+                self._arm()
+
+        return self.remaining() <= 0
+
+    def wait(self, timeout=None):
+        # Block until the deadline or `timeout` seconds, whichever comes first
+        if self._fd is not None:
+            select.select([self._fd], [], [], timeout)
+            return self.expired()
+
+        step = min(max(self.remaining(), 0), self.max_step)
+        if timeout is not None:
+            step = min(step, timeout)
+        self.clock.sleep(step)
+        return self.expired()
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
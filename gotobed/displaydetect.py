@@ -0,0 +1,114 @@
+import os
+
+PROC_ROOT = '/proc'
+CHUNK_SIZE = 4096
+DEFAULT_CACHE_SIZE = 8192
+
+NEEDLES = (b'\0DISPLAY=', b'\0WAYLAND_DISPLAY=')
+OVERLAP = max(len(needle) for needle in NEEDLES) - 1
+
+# cgroups that never own a graphical client
+SYSTEM_CGROUPS = ('/system.slice/', '/init.scope', '/machine.slice/')
+
+
+def environ_has_display(path, chunk_size=CHUNK_SIZE):
+    # Stream the environment block and stop at the first DISPLAY/WAYLAND_DISPLAY,
+    # instead of reading and parsing all of it (Electron apps carry hundreds of KB)
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return None
+    try:
+        tail = b'\0'
+        while True:
+            chunk = os.read(fd, chunk_size)
+            if not chunk:
+                return False
+            window = tail + chunk
+            if NEEDLES[0] in window or NEEDLES[1] in window:
+                return True
+            tail = window[-OVERLAP:]
+    except OSError:
+        return None
+    finally:
+        os.close(fd)
+
+
+class DisplayDetector:
+    # Decide whether a process talks to a display, cheapest evidence first:
+    #   kernel threads never do;
+    #   a child of a process already known to have a display inherited it;
+    #   system services (by cgroup) do not;
+    #   otherwise stream /proc/<pid>/environ with early exit.
+    # logind sessions of TYPE=tty are no evidence either way: startx/xinit run X
+    # inside one, and every client there has DISPLAY.
+    # Verdicts are keyed on (pid, create_time), and _parents maps each PID to the
+    # process last judged under it; discard() and retain() keep that to live
+    # processes, so a reused parent PID never passes an old verdict on.
+
+    def __init__(self, proc_root=PROC_ROOT, chunk_size=CHUNK_SIZE, maxsize=DEFAULT_CACHE_SIZE):
+        self.proc_root = proc_root
+        self.chunk_size = chunk_size
+        self.maxsize = maxsize
+        self.stats = {'kernel': 0, 'parent': 0, 'cgroup': 0, 'environ': 0}
+        self._known = {}
+        self._parents = {}
+
+    def _remember(self, record, result):
+        if len(self._known) >= self.maxsize:
+            self._known.clear()
+            self._parents.clear()
+        self._known[(record.pid, record.create_time)] = result
+        self._parents[record.pid] = record.create_time
+        return result
+
+    def _from_parent(self, record):
+        # Only positive answers are inherited: a session leader may have set DISPLAY
+        # after it started, so its own environ can lack what its children have
+        if record.ppid not in self._parents:
+            return False
+        parent_created = self._parents[record.ppid]
+        if not self._known.get((record.ppid, parent_created)):
+            return False
+        return parent_created is None or record.create_time is None or parent_created <= record.create_time
+
+    def _cgroup_verdict(self, pid):
+        try:
+            with open(f"{self.proc_root}/{pid}/cgroup") as f:
+                cgroup = f.read()
+        except OSError:
+            return None, None
+
+        if any(marker in cgroup for marker in SYSTEM_CGROUPS):
+            return 'cgroup', False
+        return None, None
+
+    def has_display(self, record):
+        if record.pid == 2 or record.ppid == 2 or record.pid == 0:
+            self.stats['kernel'] += 1
+            return self._remember(record, False)
+
+        if self._from_parent(record):
+            self.stats['parent'] += 1
+            return self._remember(record, True)
+
+        how, result = self._cgroup_verdict(record.pid)
+        if how is not None:
+            self.stats[how] += 1
+            return self._remember(record, result)
+
+        self.stats['environ'] += 1
+        result = environ_has_display(f"{self.proc_root}/{record.pid}/environ", self.chunk_size)
+        return self._remember(record, bool(result))
+
+    def discard(self, record):
+        self._known.pop((record.pid, record.create_time), None)
+        if record.pid in self._parents and self._parents[record.pid] == record.create_time:
+            del self._parents[record.pid]
+
+    def retain(self, records):
+        live = {(record.pid, record.create_time) for record in records}
+        for key in [key for key in self._known if key not in live]:
+            del self._known[key]
+        for pid in [pid for pid, created in self._parents.items() if (pid, created) not in live]:
+            del self._parents[pid]
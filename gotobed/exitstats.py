@@ -0,0 +1,144 @@
+import json
+import math
+import os
+import time
+
+# How long each executable took to exit after being asked, remembered across runs
+# and turned into a per-application grace period for teardown_applications().
+
+SAMPLES = 20        # exit times kept per executable, for the percentiles
+EWMA_WEIGHT = 0.3   # weight of the newest exit time in the moving average
+MIN_SAMPLES = 3     # below this the default grace is a floor, not a ceiling
+HEADROOM = 1.5      # grace = p95 * HEADROOM + MARGIN
+MARGIN = 0.5
+MIN_GRACE = 1
+MAX_GRACE = 15
+RETRY_AFTER = 5     # a known-hung app is given MAX_GRACE again after this many outright kills
+MAX_ENTRIES = 500
+
+
+def default_path():
+    if os.name == 'nt':
+        base = os.environ.get('LOCALAPPDATA') or os.path.expanduser('~')
+    else:
+        base = os.environ.get('XDG_STATE_HOME') or os.path.expanduser('~/.local/state')
+    return os.path.join(base, 'gotobed', 'exit-stats.json')
+
+
+def stats_key(record):
+    # The executable path where it is readable; the same binary under a different
+    # name (argv[0] tricks, symlinks) then shares its history
+    return record.exe or record.name
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+class ExitStats:
+    # One entry per executable:
+    #   samples  last SAMPLES clean exit times, in seconds
+    #   ewma     moving average of the clean exit times
+    #   kills    consecutive runs that ended in a kill (0 after any clean exit)
+    #   grace    the grace it was last killed at, to back off from
+    #   skipped  outright kills since it was last given a grace
+    #   seen     wall-clock time of the last run
+
+    def __init__(self, path=None, entries=None):
+        self.path = path
+        self.entries = entries if entries is not None else {}
+        self.dirty = False
+
+    @classmethod
+    def load(cls, path=None):
+        path = path or default_path()
+        try:
+            with open(path) as f:
+                entries = json.load(f)
+            if not isinstance(entries, dict):
+                entries = {}
+        except (OSError, ValueError):
+            entries = {}
+        return cls(path, entries)
+
+    def save(self):
+        if not self.dirty or self.path is None:
+            return
+        if len(self.entries) > MAX_ENTRIES:
+            newest = sorted(self.entries.items(), key=lambda item: item[1].get('seen', 0), reverse=True)
+            self.entries = dict(newest[:MAX_ENTRIES])
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp = f"{self.path}.{os.getpid()}.tmp"
+        with open(temp, 'w') as f:
+            json.dump(self.entries, f, indent=1, sort_keys=True)
+        os.replace(temp, self.path)
+        self.dirty = False
+
+    def record(self, key, seconds, outcome, grace):
+        # outcome as in TeardownResult; `grace` is what the app was given (0 = killed outright).
+        # 'expired' (the overall deadline, not the app, ran out) says nothing about the app.
+        if outcome not in ('closed', 'killed'):
+            return
+        entry = self.entries.setdefault(key, {'samples': [], 'ewma': None, 'kills': 0, 'grace': None, 'skipped': 0})
+        entry['seen'] = round(time.time())
+
+        if outcome == 'closed':
+            seconds = round(seconds, 3)
+            entry['samples'] = (entry['samples'] + [seconds])[-SAMPLES:]
+            if entry['ewma'] is None:
+                entry['ewma'] = seconds
+            else:
+                entry['ewma'] = round(EWMA_WEIGHT * seconds + (1 - EWMA_WEIGHT) * entry['ewma'], 3)
+            entry['kills'] = 0
+            entry['grace'] = None
+            entry['skipped'] = 0
+        else:
+            entry['kills'] += 1
+            if grace:
+                entry['grace'] = grace
+                entry['skipped'] = 0
+            else:
+                entry['skipped'] = entry.get('skipped', 0) + 1
+        self.dirty = True
+
+    def is_hung(self, key):
+        entry = self.entries.get(key)
+        return bool(entry and entry['kills'] and (entry['grace'] or 0) >= MAX_GRACE)
+
+    def grace_for(self, key, default):
+        # Seconds to wait before killing; 0 means kill without asking
+        entry = self.entries.get(key)
+        if entry is None:
+            return default
+
+        if entry['kills']:
+            if self.is_hung(key):
+                # Ignored even the longest grace; ask again now and then in case it was fixed
+                return MAX_GRACE if entry.get('skipped', 0) >= RETRY_AFTER else 0
+            # Killed while it may still have been saving: back off before giving up on it
+            return min(max((entry['grace'] or default) * 2, default), MAX_GRACE)
+
+        samples = entry['samples']
+        if not samples:
+            return default
+        grace = min(max(percentile(samples, 0.95) * HEADROOM + MARGIN, MIN_GRACE), MAX_GRACE)
+        if len(samples) < MIN_SAMPLES:
+            grace = max(grace, default)
+        return round(grace, 1)
+
+    def describe(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            return 'no history'
+        if self.is_hung(key):
+            return f"known hung, killed {entry['kills']} times in a row"
+        if entry['kills']:
+            return f"killed last {entry['kills']} times at {entry['grace']}s"
+        samples = entry['samples']
+        return (f"{len(samples)} exits, avg {entry['ewma']:.1f}s, "
+                f"p50 {percentile(samples, 0.5):.1f}s, p95 {percentile(samples, 0.95):.1f}s")
@@ -0,0 +1,709 @@
+import argparse
+import asyncio
+import hashlib
+import hmac
+import itertools
+import json
+import os
+import random
+import secrets
+import signal
+import socket
+import sys
+import time
+from collections import deque
+from datetime import datetime
+
+from gotobed.backends import BACKENDS
+from gotobed.control import CONTROL_SUPPORTED, ControlServer, default_socket_path, positive_seconds, rule_list
+from gotobed.timetable import Schedule, ShiftedSchedule
+
+# Fleet mode: one controller, many agents. An agent (`main.py --fleet HOST:PORT`)
+# dials the controller and keeps that one TCP connection for everything. The
+# controller pushes the schedule and policy over it and fans commands out to every
+# agent at once. The agents send back a report of each teardown and shutdown. Only
+# the controller needs a reachable port; agents reconnect with jittered backoff.
+#
+# One JSON object per line each way, as on the control socket (control.py):
+#
+#   agent -> controller   {"type": "hello", "host": ..., "nonce": ..., "time": ...}
+#   controller -> agent   {"type": "welcome", "nonce": ..., "proof": ...}
+#   agent -> controller   {"type": "auth", "proof": ...}
+#   controller -> agent   {"id": 7, "command": "status"}     -> {"id": 7, "ok": true, ...}
+#   controller -> agent   {"id": 8, "command": "push", "rules": [...], "policy": {...}, "offset": -1.25}
+#   agent -> controller   {"event": "report", "report": {"phase": "closed", ...}}
+#
+# Commands are the control socket's (status, postpone, cancel, run-now) plus 'time',
+# which the controller uses to measure each agent's clock, 'push', and 'clock'.
+# Rules are pushed in the controller's clock with the measured offset, so hosts
+# whose clocks drifted still fire together. The offset is measured again every
+# CLOCK_RECHECK seconds and shortly before each firing, and a changed one is sent
+# with 'clock', which retimes the schedule without dropping a postpone or cancel. With a shared token (GOTOBED_FLEET_TOKEN) each side
+# proves it knows the token with an HMAC over the other's nonce. Without one anyone
+# who can reach the port could join or command the fleet (run-now, or a policy push
+# emptying the protected lists), so neither side starts without it unless told to
+# with `insecure` (--insecure).
+
+DEFAULT_PORT = 7878
+PROTOCOL = 1
+MAX_MESSAGE = 4 * 1024 * 1024    # a pushed policy can be large
+HANDSHAKE_TIMEOUT = 10
+REQUEST_TIMEOUT = 10
+RECONNECT_MIN = 1
+RECONNECT_MAX = 60
+CLOCK_SAMPLES = 5
+CLOCK_TOLERANCE = 0.05   # clocks closer than this (NTP-synced hosts) are left alone
+CLOCK_RECHECK = 600
+CLOCK_LEAD = 60          # the last check before a firing
+REPORTS_KEPT = 20
+
+
+class FleetError(Exception):
+    pass
+
+
+def parse_address(text, default_host=None):
+    # 'host:port', 'host' or ':port'
+    host, separator, port = text.rpartition(':')
+    if not separator:
+        host, port = text, DEFAULT_PORT
+    try:
+        port = int(port)
+    except ValueError:
+        raise ValueError(f"Invalid port in '{text}'")
+    return host or default_host, port
+
+
+def fleet_token():
+    return os.environ.get('GOTOBED_FLEET_TOKEN') or None
+
+
+def require_token(token, insecure):
+    if token is None and not insecure:
+        raise FleetError('GOTOBED_FLEET_TOKEN is not set; set it to the fleet\'s shared token, '
+                         'or pass --insecure to run without one')
+
+
+def _proof(token, nonce):
+    return hmac.new(token.encode(), str(nonce).encode(), hashlib.sha256).hexdigest()
+
+
+def _proves(token, nonce, proof):
+    return isinstance(proof, str) and hmac.compare_digest(proof, _proof(token, nonce))
+
+
+class Channel:
+    # JSON lines over one stream; sends from several tasks go out whole
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self._lock = asyncio.Lock()
+
+    def peer(self):
+        peer = self.writer.get_extra_info('peername')
+        return f"{peer[0]}:{peer[1]}" if isinstance(peer, tuple) else str(peer)
+
+    async def send(self, message):
+        data = json.dumps(message).encode() + b'\n'
+        async with self._lock:
+            self.writer.write(data)
+            await self.writer.drain()
+
+    async def receive(self, timeout=None):
+        line = await asyncio.wait_for(self.reader.readline(), timeout)
+        if not line:
+            raise ConnectionError('connection closed')
+        message = json.loads(line)
+        if not isinstance(message, dict):
+            raise ValueError('message must be a JSON object')
+        return message
+
+    def close(self):
+        self.writer.close()
+
+
+# Agent
+
+class FleetAgent:
+    # Answers the controller with the local runtime's controls (ControlServer.handle)
+    # plus 'time' and 'push', and reports every close and shutdown back to it.
+    # `clock` is the agent's wall clock; benchmarks/fleet_harness.py skews it.
+
+    def __init__(self, address, policy=None, system=None, host=None, token=None, clock=time.time,
+                 insecure=False):
+        require_token(token, insecure)
+        self.address = parse_address(address, 'localhost')
+        self.policy = policy
+        self.system = system
+        self.name = host or socket.gethostname()
+        self.token = token
+        self.clock = clock
+        self.runtime = None
+        self.commands = None
+        self._schedule = None    # as pushed, on the controller's clock
+        self.connected = False
+        self.joined = False
+        self.quiet = False
+        self._events = deque(maxlen=REPORTS_KEPT)
+        self._loop = None
+        self._wake = None
+
+    def attach(self, runtime):
+        self.runtime = runtime
+        self.commands = ControlServer(runtime)
+
+    def _say(self, message):
+        if not self.quiet:
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] {message}")
+
+    # Reports
+
+    def reporting(self, close, shutdown):
+        # The runtime's close/shutdown, reporting to the controller as well
+        def fleet_close(inventory):
+            started, start = self.clock(), time.monotonic()
+            results = close(inventory) or []
+            self.report('closed', started=started, seconds=round(time.monotonic() - start, 3),
+                        results=[{'name': result.name, 'outcome': result.outcome,
+                                  'seconds': round(result.seconds, 3), 'processes': result.processes}
+                                 for result in results])
+            return results
+
+        def fleet_shutdown(target):
+            started, start = self.clock(), time.monotonic()
+            result = shutdown(target)
+            poweroff = None
+            if result is not None:
+                poweroff = {'method': result.method, 'ok': result.ok, 'seconds': round(result.seconds, 4),
+                            'status': result.status, 'detail': result.detail}
+            self.report('shutdown', started=started, seconds=round(time.monotonic() - start, 3),
+                        target=target.isoformat(timespec='seconds') if target else None, poweroff=poweroff)
+            return result
+
+        return fleet_close, fleet_shutdown
+
+    def report(self, phase, **report):
+        # From any thread; kept until a connection to the controller takes it
+        report.update(phase=phase, host=self.name)
+        self._events.append(report)
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    async def _send_reports(self, channel):
+        while True:
+            while self._events:
+                await channel.send({'event': 'report', 'report': self._events[0]})
+                self._events.popleft()
+            self._wake.clear()
+            await self._wake.wait()
+
+    # Commands
+
+    async def handle(self, request):
+        command = request.get('command')
+        if command == 'time':
+            return {'time': self.clock()}
+        if command == 'push':
+            return self.apply_push(request)
+        if command == 'clock':
+            return self.apply_clock(request)
+        return await self.commands.handle(request)
+
+    def _retimed(self, offset):
+        # The pushed schedule on the runtime's clock. The controller's clock reads
+        # `offset` ahead of self.clock, which may itself differ from the system clock
+        # the runtime sleeps on.
+        if not isinstance(offset, (int, float)):
+            raise ValueError("'offset' must be a number of seconds")
+        shift = offset + self.clock() - time.time()
+        if abs(shift) < CLOCK_TOLERANCE:
+            return self._schedule, ''
+        return (ShiftedSchedule(self._schedule, shift),
+                f" (our clock runs {abs(shift):.3f}s {'behind' if shift > 0 else 'ahead of'} the controller's)")
+
+    def _reply(self):
+        upcoming = self.runtime.upcoming()
+        return {'target': upcoming.isoformat(timespec='seconds') if upcoming else None}
+
+    def apply_push(self, request):
+        from gotobed.policy import PolicyError
+
+        rules = rule_list(request.get('rules'))
+        offset = request.get('offset', 0)
+        if not isinstance(offset, (int, float)):
+            raise ValueError("'offset' must be a number of seconds")
+        schedule = Schedule.parse(rules)
+
+        document = request.get('policy')
+        if document is not None and self.policy is not None:
+            # A policy for a mixed fleet has one section per OS
+            if isinstance(document, dict) and any(system in document for system in BACKENDS):
+                document = document.get(self.system) or {}
+            try:
+                self.policy.apply(document, 'the fleet controller')
+            except PolicyError as e:
+                raise ValueError(str(e))
+
+        self._schedule = schedule
+        schedule, note = self._retimed(offset)
+        self.runtime.reschedule(schedule)
+        self._say(f"Schedule from the fleet controller: {', '.join(rules)}{note}")
+        return dict(self._reply(), rules=rules)
+
+    def apply_clock(self, request):
+        # A new clock offset for the same schedule; postpone and cancel still hold
+        if self._schedule is None:
+            raise ValueError('no schedule has been pushed yet')
+        schedule, note = self._retimed(request.get('offset', 0))
+        self.runtime.reschedule(schedule, keep_controls=True)
+        self._say(f"Clock offset to the fleet controller updated{note or ' (in step now)'}")
+        return self._reply()
+
+    # Connection
+
+    async def _session(self, channel):
+        nonce = secrets.token_hex(16)
+        await channel.send({'type': 'hello', 'host': self.name, 'protocol': PROTOCOL, 'nonce': nonce,
+                            'time': self.clock()})
+        welcome = await channel.receive(HANDSHAKE_TIMEOUT)
+        if welcome.get('type') != 'welcome':
+            raise FleetError(welcome.get('error') or 'unexpected reply to hello')
+        if self.token is not None and not _proves(self.token, nonce, welcome.get('proof')):
+            raise FleetError('the controller does not know the fleet token')
+        proof = _proof(self.token, welcome.get('nonce')) if self.token is not None else None
+        await channel.send({'type': 'auth', 'proof': proof})
+
+        self.connected = self.joined = True
+        self._say(f"Joined the fleet controller at {channel.peer()}")
+        sender = asyncio.create_task(self._send_reports(channel))
+        try:
+            while True:
+                request = await channel.receive()
+                if request.get('type') == 'error':
+                    raise FleetError(request.get('error', 'rejected by the controller'))
+                try:
+                    reply = {'id': request.get('id'), 'ok': True}
+                    reply.update(await self.handle(request))
+                except (ValueError, OSError, OverflowError) as e:
+                    reply = {'id': request.get('id'), 'ok': False, 'error': str(e)}
+                await channel.send(reply)
+        finally:
+            self.connected = False
+            sender.cancel()
+            await asyncio.gather(sender, return_exceptions=True)
+
+    async def run(self):
+        # Stay joined, reconnecting with backoff; runs until cancelled
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        if self._events:
+            self._wake.set()
+        if self.token is None:
+            self._say("Warning: no GOTOBED_FLEET_TOKEN (--insecure): obeying any controller at that address")
+
+        host, port = self.address
+        delay = RECONNECT_MIN
+        complained = False
+        while True:
+            try:
+                reader, writer = await asyncio.wait_for(
+                    asyncio.open_connection(host, port, limit=MAX_MESSAGE), HANDSHAKE_TIMEOUT)
+            except (OSError, asyncio.TimeoutError) as e:
+                if not complained:
+                    self._say(f"Cannot reach the fleet controller at {host}:{port} ({e or 'timed out'}), retrying")
+                    complained = True
+            else:
+                channel = Channel(reader, writer)
+                self.joined = False
+                try:
+                    await self._session(channel)
+                except (ConnectionError, ValueError, FleetError, asyncio.TimeoutError) as e:
+                    if self.joined or not complained:
+                        self._say(f"Lost the fleet controller: {e or 'timed out'}, reconnecting")
+                        complained = True
+                finally:
+                    channel.close()
+                if self.joined:
+                    delay = RECONNECT_MIN
+            # Jittered, so a restarted controller is not hit by the whole fleet at once
+            await asyncio.sleep(delay * random.uniform(0.5, 1.0))
+            delay = min(delay * 2, RECONNECT_MAX)
+
+    async def serve(self, main):
+        # Stay joined for as long as `main` (the runtime or the control server) runs
+        task = asyncio.create_task(self.run())
+        try:
+            return await main
+        finally:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+
+# Controller
+
+class AgentLink:
+    # The controller's end of one agent's connection; requests are multiplexed on it by id
+
+    def __init__(self, host, channel):
+        self.host = host
+        self.channel = channel
+        self.address = channel.peer()
+        self.connected_at = datetime.now()
+        self.skew = None      # agent clock minus controller clock, seconds
+        self.rtt = None
+        self.offset = 0       # as last sent to the agent
+        self.reports = deque(maxlen=REPORTS_KEPT)
+        self._ids = itertools.count(1)
+        self._pending = {}
+        self.closed = False
+
+    async def request(self, command, timeout=REQUEST_TIMEOUT, **params):
+        if self.closed:
+            raise ConnectionError(f"{self.host} disconnected")
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        params.update(id=request_id, command=command)
+        try:
+            await self.channel.send(params)
+            reply = await asyncio.wait_for(future, timeout)
+        finally:
+            self._pending.pop(request_id, None)
+        if not reply.pop('ok', False):
+            raise FleetError(reply.get('error', 'request failed'))
+        reply.pop('id', None)
+        return reply
+
+    async def measure_clock(self, clock, samples=CLOCK_SAMPLES):
+        # NTP style: the sample with the shortest round trip bounds the error best
+        best = None
+        for _ in range(samples):
+            sent = clock()
+            reply = await self.request('time')
+            received = clock()
+            if best is None or received - sent < best[0]:
+                best = (received - sent, reply['time'] - (sent + received) / 2)
+        self.rtt, self.skew = best
+
+    async def pump(self, on_report):
+        try:
+            while True:
+                message = await self.channel.receive()
+                if 'id' in message:
+                    future = self._pending.get(message['id'])
+                    if future is not None and not future.done():
+                        future.set_result(message)
+                elif message.get('event') == 'report' and isinstance(message.get('report'), dict):
+                    self.reports.append(message['report'])
+                    on_report(self, message['report'])
+        finally:
+            self._fail_pending()
+
+    def _fail_pending(self):
+        self.closed = True
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(ConnectionError(f"{self.host} disconnected"))
+
+    def close(self):
+        self._fail_pending()
+        self.channel.close()
+
+    def summary(self):
+        last = self.reports[-1] if self.reports else None
+        return {
+            'host': self.host, 'address': self.address,
+            'connected': self.connected_at.isoformat(timespec='seconds'),
+            'skew': round(self.skew, 4) if self.skew is not None else None,
+            'rtt': round(self.rtt, 4) if self.rtt is not None else None,
+            'last_report': last.get('phase') if last else None,
+        }
+
+
+class FleetController:
+    # Accepts agents, keeps one link per host (a reconnect replaces the old link),
+    # pushes the schedule and policy to each on arrival, and fans commands out
+
+    def __init__(self, rules, listen=f":{DEFAULT_PORT}", policy=None, token=None, correct_clocks=True,
+                 clock=time.time, insecure=False):
+        require_token(token, insecure)
+        self.rules = list(rules)
+        self.policy = policy
+        self.listen = parse_address(listen)
+        self.token = token
+        self.correct_clocks = correct_clocks
+        self.clock = clock
+        self.clock_recheck = CLOCK_RECHECK
+        self.agents = {}
+        self.quiet = False
+        self.port = None
+        self.server = None
+        self._sessions = set()
+        self._stopped = None
+
+    def _say(self, message):
+        if not self.quiet:
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] {message}")
+
+    async def start(self):
+        self._stopped = asyncio.Event()
+        self.server = await asyncio.start_server(self._accept, self.listen[0], self.listen[1], limit=MAX_MESSAGE)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+            self.server = None
+        for link in list(self.agents.values()):
+            link.close()
+        # Each session ends on its own once its connection is closed
+        await asyncio.gather(*self._sessions, return_exceptions=True)
+
+    def stop(self):
+        if self._stopped is not None:
+            self._stopped.set()
+
+    async def run(self):
+        # Serve until SIGINT/SIGTERM or stop()
+        if self.server is None:
+            await self.start()
+        self._say(f"Fleet controller listening on port {self.port}, schedule: {', '.join(self.rules)}")
+        if self.token is None:
+            self._say("Warning: no GOTOBED_FLEET_TOKEN (--insecure): any host that can reach the port can join")
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(signum, self.stop)
+            except (NotImplementedError, RuntimeError, ValueError):
+                pass
+        try:
+            await self._stopped.wait()
+        finally:
+            await self.close()
+
+    async def _handshake(self, channel):
+        hello = await channel.receive(HANDSHAKE_TIMEOUT)
+        host = hello.get('host')
+        if hello.get('type') != 'hello' or not isinstance(host, str) or not host:
+            raise FleetError('expected a hello')
+        if hello.get('protocol') != PROTOCOL:
+            await channel.send({'type': 'error', 'error': f"protocol {hello.get('protocol')} is not {PROTOCOL}"})
+            raise FleetError(f"{host} speaks protocol {hello.get('protocol')}")
+
+        nonce = secrets.token_hex(16)
+        proof = _proof(self.token, hello.get('nonce')) if self.token is not None else None
+        await channel.send({'type': 'welcome', 'nonce': nonce, 'proof': proof, 'time': self.clock()})
+        auth = await channel.receive(HANDSHAKE_TIMEOUT)
+        if self.token is not None and not _proves(self.token, nonce, auth.get('proof')):
+            await channel.send({'type': 'error', 'error': 'wrong fleet token'})
+            raise FleetError(f"{host} at {channel.peer()} does not know the fleet token")
+        return host
+
+    async def _accept(self, reader, writer):
+        channel = Channel(reader, writer)
+        link = None
+        self._sessions.add(asyncio.current_task())
+        try:
+            link = AgentLink(await self._handshake(channel), channel)
+            pump = asyncio.create_task(link.pump(self._on_report))
+            try:
+                await link.measure_clock(self.clock)
+                pushed = await self._request(link, 'push', REQUEST_TIMEOUT, **self._push_params(link))
+                previous = self.agents.get(link.host)
+                self.agents[link.host] = link
+                if previous is not None:
+                    previous.close()
+                self._say(f"{link.host} joined from {link.address} (clock {link.skew:+.3f}s, "
+                          f"round trip {link.rtt * 1000:.1f} ms)")
+                if 'error' in pushed:
+                    # Still commandable; it keeps the schedule it had
+                    self._say(f"{link.host} refused the schedule: {pushed['error']}")
+                await self._watch_clock(link, pump)
+            finally:
+                pump.cancel()
+                await asyncio.gather(pump, return_exceptions=True)
+        except (ConnectionError, ValueError, FleetError, asyncio.TimeoutError) as e:
+            if link is None:
+                self._say(f"Rejected {channel.peer()}: {e}")
+        finally:
+            if link is not None:
+                if self.agents.get(link.host) is link:
+                    del self.agents[link.host]
+                    self._say(f"{link.host} left")
+                link.close()
+            else:
+                channel.close()
+            self._sessions.discard(asyncio.current_task())
+
+    def _on_report(self, link, report):
+        if report.get('phase') == 'closed':
+            results = report.get('results') or []
+            killed = sum(1 for result in results if result.get('outcome') in ('killed', 'expired'))
+            self._say(f"{link.host}: closed {len(results)} applications in {report.get('seconds', 0):.1f}s"
+                      + (f", {killed} force closed" if killed else ''))
+        elif report.get('phase') == 'shutdown':
+            poweroff = report.get('poweroff') or {}
+            outcome = f"requested via {poweroff.get('method')}" if poweroff.get('ok') else 'FAILED'
+            self._say(f"{link.host}: shutdown {outcome}")
+
+    def _push_params(self, link):
+        link.offset = -link.skew if self.correct_clocks and link.skew is not None else 0
+        return {'rules': self.rules, 'policy': self.policy, 'offset': link.offset}
+
+    def _clock_check_delay(self):
+        # Every clock_recheck seconds, and once more CLOCK_LEAD before the next firing
+        delay = self.clock_recheck
+        upcoming = Schedule.parse(self.rules).next_fire()
+        if upcoming is not None:
+            lead = (upcoming - datetime.now()).total_seconds() - CLOCK_LEAD
+            if 0 < lead < delay:
+                delay = lead
+        return delay
+
+    async def _watch_clock(self, link, pump):
+        # Clocks keep drifting, and NTP may step one, long after the agent joined;
+        # returns when the connection ends
+        while True:
+            done, _ = await asyncio.wait([pump], timeout=self._clock_check_delay())
+            if done:
+                return
+            try:
+                await link.measure_clock(self.clock)
+            except (FleetError, ConnectionError, asyncio.TimeoutError):
+                continue
+            if not self.correct_clocks or abs(-link.skew - link.offset) < CLOCK_TOLERANCE:
+                continue
+            moved = -link.skew - link.offset
+            link.offset = -link.skew
+            reply = await self._request(link, 'clock', REQUEST_TIMEOUT, offset=link.offset)
+            if 'error' in reply:
+                self._say(f"{link.host} refused a clock correction: {reply['error']}")
+            else:
+                self._say(f"{link.host}: clock moved {-moved:+.3f}s, schedule retimed")
+
+    async def _request(self, link, command, timeout, **params):
+        try:
+            return await link.request(command, timeout=timeout, **params)
+        except asyncio.TimeoutError:
+            return {'error': f"no reply within {timeout}s"}
+        except (FleetError, ConnectionError, OSError) as e:
+            return {'error': str(e) or type(e).__name__}
+
+    async def fan_out(self, command, hosts=None, timeout=REQUEST_TIMEOUT, **params):
+        # The same request to every agent at once, over the open links;
+        # host -> reply, or {'error': ...} for that host
+        links = [link for host, link in sorted(self.agents.items()) if hosts is None or host in hosts]
+        replies = await asyncio.gather(*(self._request(link, command, timeout, **params) for link in links))
+        return {link.host: reply for link, reply in zip(links, replies)}
+
+    async def push(self, rules=None, policy=None, hosts=None):
+        # New rules and/or policy for the whole fleet, each agent with its own clock offset
+        if rules is not None:
+            self.rules = list(rules)
+        if policy is not None:
+            self.policy = policy
+        links = [link for host, link in sorted(self.agents.items()) if hosts is None or host in hosts]
+        replies = await asyncio.gather(*(self._request(link, 'push', REQUEST_TIMEOUT, **self._push_params(link))
+                                         for link in links))
+        return {link.host: reply for link, reply in zip(links, replies)}
+
+
+class FleetControlServer(ControlServer):
+    # The controller's local control socket: the daemon's commands, fanned out to
+    # every agent (python -m gotobed.ctl --fleet ...), plus hosts and reports
+
+    async def handle(self, request):
+        controller = self.runtime
+        command = request.get('command')
+
+        if command == 'hosts':
+            return {'agents': [link.summary() for _, link in sorted(controller.agents.items())]}
+
+        if command == 'reports':
+            return {'reports': {host: list(link.reports) for host, link in sorted(controller.agents.items())}}
+
+        if command in ('status', 'cancel', 'run-now'):
+            return {'hosts': await controller.fan_out(command)}
+
+        if command == 'postpone':
+            return {'hosts': await controller.fan_out('postpone', seconds=positive_seconds(request))}
+
+        if command == 'reload':
+            rules = request.get('rules')
+            if rules is not None:
+                rules = rule_list(rules)
+            if self.reload is not None:
+                rules = self.reload(rules)
+            return {'rules': controller.rules, 'hosts': await controller.push(rules)}
+
+        raise ValueError(f"Unknown command '{command}'")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog='gotobed.fleet',
+                                     description='Fleet controller: pushes the shutdown schedule and policy to every '
+                                                 'agent (main.py --fleet HOST:PORT) and fans commands out to them')
+    parser.add_argument('--listen', default=f":{DEFAULT_PORT}", metavar='[HOST]:PORT',
+                        help=f"where agents connect (default: port {DEFAULT_PORT} on every interface)")
+    parser.add_argument('--rule', dest='rules', action='append', metavar='RULE',
+                        help='schedule rule for the fleet, as for main.py; repeat for several')
+    parser.add_argument('--rules-file', metavar='PATH', help='read the schedule rules from this file')
+    parser.add_argument('--policy', metavar='PATH',
+                        help='policy pushed to the agents, as for main.py --policy; may have one section per OS '
+                             '("Linux", "Darwin", "Windows")')
+    parser.add_argument('--socket', metavar='PATH',
+                        help='local control socket (python -m gotobed.ctl --fleet ...)')
+    parser.add_argument('--no-clock-correction', dest='correct_clocks', action='store_false',
+                        help="use each host's own clock as it is")
+    parser.add_argument('--insecure', action='store_true',
+                        help='run without GOTOBED_FLEET_TOKEN: any host that can reach the port can join and '
+                             'take the schedule and policy (only on a network you trust)')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    from gotobed.cli import SCHEDULE_RULES
+    from gotobed.policy import PolicyError, read_policy
+    from gotobed.timetable import read_rules
+
+    args = parse_args(argv)
+    if not CONTROL_SUPPORTED:
+        # Agents run anywhere; the controller is driven through a UNIX control socket
+        print("Error: the fleet controller is not supported on Windows (no UNIX domain sockets)", file=sys.stderr)
+        return 1
+
+    def configured_rules():
+        rules = read_rules(args.rules_file) if args.rules_file else args.rules or SCHEDULE_RULES
+        Schedule.parse(rules)
+        return rules
+
+    def configured_policy():
+        return read_policy(args.policy) if args.policy else None
+
+    try:
+        controller = FleetController(configured_rules(), listen=args.listen, policy=configured_policy(),
+                                     token=fleet_token(), correct_clocks=args.correct_clocks,
+                                     insecure=args.insecure)
+    except (OSError, ValueError, PolicyError, FleetError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+    def reload(rules=None):
+        # Explicit rules from gotobed.ctl, else the rules file; the policy file is re-read too
+        Schedule.parse(rules or [])
+        controller.rules = rules or configured_rules()
+        try:
+            controller.policy = configured_policy()
+        except PolicyError as e:
+            raise ValueError(str(e))
+        return controller.rules
+
+    path = args.socket or default_socket_path('gotobed-fleet')
+    asyncio.run(FleetControlServer(controller, path, reload=reload).run())
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,100 @@
+from gotobed.snapshot import list_pids, snapshot_pid, still_running
+
+MIN_REFRESH_INTERVAL = 1
+MAX_REFRESH_INTERVAL = 300
+
+
+def refresh_interval(remaining):
+    # Refresh rarely while the deadline is hours away and every second or so near the end
+    return max(MIN_REFRESH_INTERVAL, min(MAX_REFRESH_INTERVAL, remaining / 4))
+
+
+class ProcessInventory:
+    # Keeps classified records for the live process table. Each refresh only
+    # snapshots and classifies PIDs that appeared since the previous one.
+
+    def __init__(self, cache, events=None, forget=None):
+        # forget(record): told about every record dropped, for the backend's own
+        # per-process state (backends/linux.py: the display detector)
+        self.cache = cache
+        self.events = events
+        self.forget = forget
+        self.records = {}
+        self.verdicts = {}
+        self._generation = cache.generation
+
+    def add(self, pid):
+        record = snapshot_pid(pid)
+        if record is None:
+            return None
+        self.records[record.pid] = record
+        self.verdicts[record.pid] = self.cache.lookup(record)
+        return record
+
+    def remove(self, pid):
+        record = self.records.pop(pid, None)
+        self.verdicts.pop(pid, None)
+        if record is not None:
+            self.cache.discard(record)
+            if self.forget is not None:
+                self.forget(record)
+        return record
+
+    def refresh(self):
+        pids = set(list_pids())
+        removed = [pid for pid in self.records if pid not in pids]
+        for pid in removed:
+            self.remove(pid)
+
+        # A PID seen before may have been recycled by an unrelated process
+        for pid, record in list(self.records.items()):
+            if not still_running(record):
+                self.remove(pid)
+                removed.append(pid)
+
+        added = []
+        for pid in pids:
+            if pid in self.records:
+                continue
+            if self.add(pid) is not None:
+                added.append(pid)
+
+        return added, removed
+
+    def apply_events(self, events):
+        for event in events:
+            if event.kind == 'exit':
+                self.remove(event.pid)
+                continue
+
+            # exec keeps the PID but changes what the process is, so classify it again
+            self.remove(event.pid)
+            self.add(event.pid)
+
+    def reclassify(self):
+        # After a policy swap every record is judged again under the new rules
+        self.cache.sync()
+        if self.cache.generation == self._generation:
+            return
+        self._generation = self.cache.generation
+        self.verdicts = {pid: self.cache.lookup(record) for pid, record in self.records.items()}
+
+    def update(self):
+        self.reclassify()
+        if self.events is None:
+            return self.refresh()
+
+        self.apply_events(self.events.read_events(0))
+        self._resync_if_overrun()
+        self.events.track(pid for pid, verdict in self.verdicts.items() if verdict.allowed)
+
+    def _resync_if_overrun(self):
+        if self.events.overrun:
+            self.events.overrun = False
+            self.refresh()
+
+    def targets(self):
+        return [self.records[pid] for pid in sorted(self.records) if self.verdicts[pid].allowed]
+
+    def __len__(self):
+        return len(self.records)
@@ -0,0 +1,57 @@
+import heapq
+from collections import Counter
+
+from gotobed.teardown import DEFAULT_DEADLINE, DEFAULT_GRACE
+
+# teardown_applications() waits up to 1 s for killed stragglers before moving on
+KILL_SETTLE = 1
+
+
+def predict_teardown(graces, deadline=DEFAULT_DEADLINE, concurrency=None):
+    # (best, worst) seconds for teardown_applications() given each app's grace.
+    # Best: every app exits as soon as it is asked. Worst: every app ignores the
+    # request, so each slot of `concurrency` is held for that app's grace period
+    # (plus the settle wait after the kill), until the overall deadline cuts in.
+    # Apps with no grace are killed outright and never take a slot.
+    waiting = [grace for grace in graces if grace > 0]
+    if not waiting:
+        return 0.0, (KILL_SETTLE if graces else 0.0)
+    slots = [0.0] * min(concurrency or len(waiting), len(waiting))
+    for grace in waiting:
+        heapq.heapreplace(slots, slots[0] + grace + KILL_SETTLE)
+    return 0.0, min(max(slots), deadline + KILL_SETTLE)
+
+
+def print_plan(apps, spared, target_reason, grace=DEFAULT_GRACE, deadline=DEFAULT_DEADLINE, concurrency=None,
+               graces=None, history=None):
+    # `graces`: root PID -> grace from the exit history, `history`: root PID -> how it was derived
+    graces = graces or {}
+    history = history or {}
+    processes = sum(len(app.members) for app in apps)
+    print(f"Would close {len(apps)} applications ({processes} processes):")
+    for app in apps:
+        root = app.root
+        app_grace = graces.get(root.pid, grace)
+        timing = f"killed at once ({history.get(root.pid, 'known hung')})" if app_grace <= 0 else f"{app_grace}s grace"
+        if app_grace > 0 and root.pid in history:
+            timing += f" ({history[root.pid]})"
+        print(f"  {root.name} (PID: {root.pid}, user: {root.username}) - {target_reason}, {timing}")
+        for member in app.members[1:]:
+            print(f"      + {member.name} (PID: {member.pid})")
+
+    print(f"\nWould spare {len(spared)} processes:")
+    print(f"  {'PID':>7}  {'NAME':<28} {'USER':<16} REASON")
+    for record, reason in sorted(spared, key=lambda item: item[0].pid):
+        print(f"  {record.pid:>7}  {record.name[:28]:<28} {str(record.username)[:16]:<16} {reason}")
+
+    by_rule = Counter(reason for _, reason in spared)
+    print("\nSpared by rule:")
+    for reason, count in by_rule.most_common():
+        print(f"  {count:>7}  {reason}")
+
+    best, worst = predict_teardown([graces.get(app.root.pid, grace) for app in apps], deadline, concurrency)
+    print(f"\nPredicted teardown: {best:.1f}s if every application exits when asked, "
+          f"up to {worst:.1f}s if none do")
+    grace_text = f"{grace}s grace each" if not graces else f"{grace}s default grace, adjusted from exit history"
+    print(f"  ({len(apps)} applications, {concurrency or 'all'} at a time, "
+          f"{grace_text}, {deadline}s overall deadline)")
@@ -0,0 +1,200 @@
+import json
+import os
+import struct
+from collections import namedtuple
+from datetime import datetime
+
+from gotobed.matcher import NameMatcher
+
+# The protection lists (critical processes, protected patterns, system users, GUI
+# names...) live in policy files: each backend's defaults in backends/<os>.json, and
+# optionally a user policy layered on top of them. A policy is compiled once into an
+# immutable RuleSet of NameMatchers. A reload compiles a new one and swaps the
+# reference, so a classification already running finishes on the rules it started
+# with and nothing waits for the reload.
+#
+#   {"critical_processes": ["systemd", "init"]}                     replaces a list
+#   {"system_users": {"add": ["postgres"], "remove": ["games"]}}    edits it
+#
+# Names compare lowercase. gui_apps only matters where GUI applications are guessed
+# by name: macOS, Wayland sessions and Linux without an X connection. With an X
+# server (backends/linux.py) every process owning a listed client window is a GUI
+# application whatever its name, as on Windows.
+
+POLL_INTERVAL = 2
+
+# sys/inotify.h
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+INOTIFY_EVENT = struct.Struct('iIII')
+
+
+class PolicyError(Exception):
+    pass
+
+
+def default_policy_path():
+    if os.name == 'nt':
+        base = os.environ.get('APPDATA') or os.path.expanduser('~')
+    else:
+        base = os.environ.get('XDG_CONFIG_HOME') or os.path.expanduser('~/.config')
+    return os.path.join(base, 'gotobed', 'policy.json')
+
+
+def read_policy(path):
+    try:
+        with open(path) as f:
+            document = json.load(f)
+    except OSError as e:
+        raise PolicyError(f"Cannot read policy {path}: {e.strerror or e}")
+    except ValueError as e:
+        raise PolicyError(f"Invalid JSON in policy {path}: {e}")
+    if not isinstance(document, dict):
+        raise PolicyError(f"Policy {path} must be a JSON object of lists")
+    return document
+
+
+def _names(value, where):
+    if not isinstance(value, list) or not all(isinstance(entry, str) for entry in value):
+        raise PolicyError(f"{where} must be a list of names")
+    return value
+
+
+def merge_policy(base, document, source):
+    # `document` layered over `base` (list name -> names)
+    lists = dict(base)
+    for name, value in document.items():
+        if name not in base:
+            raise PolicyError(f"{source}: unknown list '{name}' (known: {', '.join(sorted(base))})")
+        if isinstance(value, dict):
+            unknown = set(value) - {'add', 'remove'}
+            if unknown:
+                raise PolicyError(f"{source}: '{name}' takes 'add' and 'remove', not {', '.join(sorted(unknown))}")
+            removed = {entry.lower() for entry in _names(value.get('remove', []), f"{source}: {name}.remove")}
+            added = _names(value.get('add', []), f"{source}: {name}.add")
+            lists[name] = [entry for entry in base[name] if entry.lower() not in removed] + added
+        else:
+            lists[name] = _names(value, f"{source}: {name}")
+    return lists
+
+
+class Policy:
+    # A backend's rules: `schema` maps each RuleSet field to the policy lists that
+    # feed it, as (exact-name lists, substring lists). `current` is the compiled
+    # RuleSet in force; read it once per decision.
+
+    def __init__(self, defaults_path, schema):
+        self.schema = schema
+        self.RuleSet = namedtuple('RuleSet', list(schema) + ['source', 'entries'])
+        document = read_policy(defaults_path)
+        self.defaults = {name: _names(value, f"{defaults_path}: {name}") for name, value in document.items()}
+        self.path = None
+        self.current = self.compile(self.defaults, 'built-in')
+
+    def compile(self, lists, source):
+        lowered = {name: [entry.lower() for entry in entries] for name, entries in lists.items()}
+        matchers = {}
+        for field, (exact, substrings) in self.schema.items():
+            matchers[field] = NameMatcher([entry for name in exact for entry in lowered[name]],
+                                          [entry for name in substrings for entry in lowered[name]])
+        return self.RuleSet(source=source, entries=sum(len(entries) for entries in lists.values()), **matchers)
+
+    def load(self, path):
+        # Compile `path` over the defaults and swap it in. Raises PolicyError and
+        # keeps the rules in force when the file is unreadable or invalid.
+        rules = self.apply(read_policy(path), path)
+        self.path = path
+        return rules
+
+    def apply(self, document, source):
+        # Same for a policy that did not come from a file (fleet.py)
+        if not isinstance(document, dict):
+            raise PolicyError(f"Policy from {source} must be a JSON object of lists")
+        rules = self.compile(merge_policy(self.defaults, document, source), source)
+        self.current = rules
+        return rules
+
+
+class PolicyWatcher:
+    # Reloads a Policy when its file changes. inotify on the directory, so editors
+    # that save by renaming a temporary file over the policy are seen too; mtime
+    # polling every `interval` seconds where inotify is missing.
+
+    def __init__(self, policy, path):
+        self.policy = policy
+        self.path = os.path.abspath(path)
+        self.interval = POLL_INTERVAL
+        self._fd = None
+        self._stamp = self._stat()
+        try:
+            self._fd = self._open_inotify()
+        except OSError:
+            self._fd = None
+
+    def _open_inotify(self):
+        if not hasattr(os, 'uname') or os.uname().sysname != 'Linux':
+            return None
+        import ctypes
+        import ctypes.util
+
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        directory = os.path.dirname(self.path).encode()
+        if libc.inotify_add_watch(fd, directory, IN_CLOSE_WRITE | IN_MOVED_TO) < 0:
+            errno = ctypes.get_errno()
+            os.close(fd)
+            raise OSError(errno, 'inotify_add_watch failed')
+        return fd
+
+    def _stat(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+    def fileno(self):
+        return self._fd
+
+    def _changed(self):
+        if self._fd is None:
+            stamp = self._stat()
+            changed = stamp is not None and stamp != self._stamp
+            self._stamp = stamp
+            return changed
+
+        name = os.path.basename(self.path).encode()
+        changed = False
+        while True:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                return changed
+            offset = 0
+            while offset < len(data):
+                _, _, _, length = INOTIFY_EVENT.unpack_from(data, offset)
+                offset += INOTIFY_EVENT.size
+                if data[offset:offset + length].rstrip(b'\0') == name:
+                    changed = True
+                offset += length
+
+    def check(self):
+        # Reload if the file changed; returns the new RuleSet, else None
+        if not self._changed():
+            return None
+        try:
+            rules = self.policy.load(self.path)
+        except PolicyError as e:
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] {e}; keeping the previous policy")
+            return None
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] Policy reloaded from {self.path} ({rules.entries} entries)")
+        return rules
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
@@ -0,0 +1,97 @@
+import math
+import subprocess
+import time
+from collections import namedtuple
+from datetime import datetime
+
+from gotobed import tracing
+
+# How the machine actually gets shut down. Each backend lists its methods in order of
+# preference (logind over D-Bus, then the shutdown commands); the first to succeed
+# wins. Commands run from argument lists, never through a shell, so the message
+# cannot break out of its quotes.
+
+COMMAND_TIMEOUT = 30
+
+# status: 0 on success, a command's exit status, or the D-Bus error name
+PowerOffResult = namedtuple('PowerOffResult', ['method', 'ok', 'seconds', 'status', 'detail'])
+
+
+class PowerOffError(Exception):
+    def __init__(self, status, detail):
+        super().__init__(detail)
+        self.status = status
+        self.detail = detail
+
+
+def run_command(argv, timeout=COMMAND_TIMEOUT):
+    try:
+        completed = subprocess.run(argv, stdin=subprocess.DEVNULL, capture_output=True, text=True,
+                                   timeout=timeout)
+    except FileNotFoundError:
+        raise PowerOffError(127, f"{argv[0]} not found")
+    except subprocess.TimeoutExpired:
+        raise PowerOffError('timeout', f"{argv[0]} did not return within {timeout}s")
+    output = (completed.stderr or completed.stdout).strip()
+    if completed.returncode != 0:
+        raise PowerOffError(completed.returncode, output or f"exited with status {completed.returncode}")
+    return output
+
+
+def command_method(argv, name=None):
+    # A (name, request) pair running argv; name is what the report shows
+    def request():
+        return run_command(argv)
+
+    return name or ' '.join(argv[:2]), request
+
+
+def shutdown_minutes(delay):
+    # `shutdown -h +N` counts in whole minutes
+    return max(1, math.ceil(delay / 60))
+
+
+def describe_delay(delay):
+    if delay <= 0:
+        return "now"
+    if delay % 60 == 0:
+        minutes = int(delay // 60)
+        return f"in {minutes} minute{'s' if minutes != 1 else ''}"
+    return f"in {delay:g} seconds"
+
+
+def request_poweroff(methods, delay):
+    # methods: (name, request) pairs; request() returns a detail string or raises
+    # PowerOffError / OSError. Anything else it raises (a malformed D-Bus reply
+    # tripping the decoder, say) fails that method too: the next one must still run.
+    # Returns the PowerOffResult of the last one tried.
+    print(f"\n[{datetime.now().strftime('%H:%M:%S')}] Initiating system shutdown....")
+    result = None
+    for name, request in methods:
+        start = time.perf_counter()
+        with tracing.span('poweroff', method=name, delay=delay) as attrs:
+            try:
+                detail = request()
+                status = 0
+            except PowerOffError as e:
+                detail, status = e.detail, e.status
+            except OSError as e:
+                detail, status = str(e), getattr(e, 'errno', None) or 'error'
+            except Exception as e:
+                kind = type(e).__name__ if type(e).__module__ == 'builtins' else f"{type(e).__module__}.{type(e).__name__}"
+                detail, status = f"{kind}: {e}", 'error'
+            attrs.update(status=status)
+        result = PowerOffResult(name, status == 0, time.perf_counter() - start, status, detail)
+        report_poweroff(result)
+        if result.ok:
+            print(f"System will shut down {describe_delay(delay)}")
+            break
+    return result
+
+
+def report_poweroff(result):
+    took = f"{result.seconds * 1000:.1f} ms"
+    if result.ok:
+        print(f"Shutdown requested via {result.method} ({took})")
+    else:
+        print(f"{result.method} failed after {took} (status {result.status}): {result.detail}")
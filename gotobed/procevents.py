@@ -0,0 +1,200 @@
+import errno
+import os
+import platform
+import select
+import socket
+import struct
+import time
+from collections import namedtuple
+
+CURRENT_OS = platform.system()
+
+ProcEvent = namedtuple('ProcEvent', ['kind', 'pid', 'ppid'])
+
+# linux/netlink.h, linux/connector.h, linux/cn_proc.h
+NETLINK_CONNECTOR = 11
+CN_IDX_PROC = 1
+CN_VAL_PROC = 1
+NLMSG_DONE = 3
+PROC_CN_MCAST_LISTEN = 1
+PROC_CN_MCAST_IGNORE = 2
+
+PROC_EVENT_FORK = 0x00000001
+PROC_EVENT_EXEC = 0x00000002
+PROC_EVENT_EXIT = 0x80000000
+
+NLMSGHDR = struct.Struct('=IHHII')
+CN_MSG = struct.Struct('=IIIIHH')
+PROC_EVENT_HEADER = struct.Struct('=IIQ')
+FORK_EVENT = struct.Struct('=IIII')
+EXEC_EVENT = struct.Struct('=II')
+EXIT_EVENT = struct.Struct('=IIII')
+
+POLL_INTERVAL = 1.0
+
+
+class NetlinkProcEvents:
+    # Kernel proc connector: fork/exec/exit pushed to us as they happen. Needs CAP_NET_ADMIN.
+    kind = 'netlink'
+
+    def __init__(self):
+        self.overrun = False
+        self._sock = socket.socket(socket.AF_NETLINK, socket.SOCK_DGRAM, NETLINK_CONNECTOR)
+        try:
+            self._sock.bind((os.getpid(), CN_IDX_PROC))
+            self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 * 1024 * 1024)
+            self._control(PROC_CN_MCAST_LISTEN)
+        except OSError:
+            self._sock.close()
+            raise
+        self._sock.setblocking(False)
+
+    def _control(self, op):
+        payload = struct.pack('=I', op)
+        message = CN_MSG.pack(CN_IDX_PROC, CN_VAL_PROC, 0, 0, len(payload), 0) + payload
+        header = NLMSGHDR.pack(NLMSGHDR.size + len(message), NLMSG_DONE, 0, 0, os.getpid())
+        self._sock.send(header + message)
+
+    def fileno(self):
+        return self._sock.fileno()
+
+    def _parse(self, data, events):
+        offset = 0
+        while offset + NLMSGHDR.size <= len(data):
+            length = NLMSGHDR.unpack_from(data, offset)[0]
+            if length < NLMSGHDR.size:
+                break
+
+            body = offset + NLMSGHDR.size + CN_MSG.size
+            what = PROC_EVENT_HEADER.unpack_from(data, body)[0]
+            event = body + PROC_EVENT_HEADER.size
+
+            # Thread creation and exit show up with pid != tgid; only whole processes matter
+            if what == PROC_EVENT_FORK:
+                parent_pid, parent_tgid, child_pid, child_tgid = FORK_EVENT.unpack_from(data, event)
+                if child_pid == child_tgid:
+                    events.append(ProcEvent('fork', child_tgid, parent_tgid))
+            elif what == PROC_EVENT_EXEC:
+                pid, tgid = EXEC_EVENT.unpack_from(data, event)
+                events.append(ProcEvent('exec', tgid, None))
+            elif what == PROC_EVENT_EXIT:
+                pid, tgid, _, _ = EXIT_EVENT.unpack_from(data, event)
+                if pid == tgid:
+                    events.append(ProcEvent('exit', tgid, None))
+
+            offset += (length + 3) & ~3
+
+    def track(self, pids):
+        # exec is reported for every process anyway
+        pass
+
+    def read_events(self, timeout=0):
+        events = []
+        if timeout and not select.select([self._sock], [], [], timeout)[0]:
+            return events
+
+        while True:
+            try:
+                data = self._sock.recv(65536)
+            except BlockingIOError:
+                break
+            except OSError as e:
+                if e.errno == errno.ENOBUFS:
+                    # The kernel dropped events; the consumer has to resync from /proc
+                    self.overrun = True
+                    continue
+                raise
+            self._parse(data, events)
+
+        return events
+
+    def close(self):
+        try:
+            self._control(PROC_CN_MCAST_IGNORE)
+        except OSError:
+            pass
+        self._sock.close()
+
+
+class ProcDirPoller:
+    # Unprivileged fallback: diff the numeric entries of /proc for fork and exit. exec
+    # keeps the PID, so it shows as a change of name and start time in /proc/<pid>/stat
+    # (a recycled PID shows up the same way). Reading stat for every PID on every poll
+    # costs more than the diff itself, so only the PIDs passed to track() (the close
+    # targets) and those new since the previous poll, when a launcher execs its
+    # application, are compared.
+    kind = 'poll'
+
+    def __init__(self, interval=POLL_INTERVAL, proc_root='/proc'):
+        self.interval = interval
+        self.proc_root = proc_root
+        self.overrun = False
+        self._pids = self._list_pids()
+        self._tracked = set()
+        self._fresh = set()
+        self._stats = {}
+        self._next_poll = time.monotonic() + interval
+
+    def _list_pids(self):
+        return {int(entry) for entry in os.listdir(self.proc_root) if entry.isdigit()}
+
+    def _identity(self, pid):
+        # (comm, starttime), or None once the process is gone
+        try:
+            with open(f"{self.proc_root}/{pid}/stat", 'rb') as f:
+                data = f.read()
+        except OSError:
+            return None
+        end = data.rfind(b')')
+        fields = data[end + 2:].split()
+        return data[data.find(b'(') + 1:end], fields[19] if len(fields) > 19 else None
+
+    def fileno(self):
+        return None
+
+    def track(self, pids):
+        self._tracked = set(pids)
+        for pid in self._tracked - self._stats.keys():
+            self._stats[pid] = self._identity(pid)
+
+    def read_events(self, timeout=0):
+        wait = self._next_poll - time.monotonic()
+        if wait > 0:
+            if wait > timeout:
+                time.sleep(timeout)
+                return []
+            time.sleep(wait)
+
+        self._next_poll = time.monotonic() + self.interval
+        pids = self._list_pids()
+        events = [ProcEvent('fork', pid, None) for pid in sorted(pids - self._pids)]
+        events.extend(ProcEvent('exit', pid, None) for pid in sorted(self._pids - pids))
+
+        stats = {}
+        for pid in (self._tracked | self._fresh) & self._pids & pids:
+            stats[pid] = self._identity(pid)
+            before = self._stats.get(pid)
+            if before is not None and stats[pid] is not None and stats[pid] != before:
+                events.append(ProcEvent('exec', pid, None))
+        self._fresh = pids - self._pids
+        for pid in self._fresh:
+            stats[pid] = self._identity(pid)
+        self._pids = pids
+        self._stats = stats
+        return events
+
+    def close(self):
+        pass
+
+
+def open_process_events(interval=POLL_INTERVAL):
+    if CURRENT_OS != 'Linux':
+        return None
+
+    if os.geteuid() == 0:
+        try:
+            return NetlinkProcEvents()
+        except OSError as e:
+            print(f"Process connector unavailable ({e}), falling back to polling /proc")
+
+    return ProcDirPoller(interval)
@@ -0,0 +1,130 @@
+import os
+import pwd
+
+from gotobed.displaydetect import environ_has_display
+from gotobed.snapshot import ProcessRecord
+
+PROC_ROOT = '/proc'
+CLOCK_TICKS = os.sysconf('SC_CLK_TCK') if hasattr(os, 'sysconf') else 100
+READ_SIZE = 4096
+TRUNCATED_NAME_LENGTH = 15
+
+_usernames = {}
+_boot_times = {}
+
+
+def _read(path):
+    # open/read/close and nothing else: no fstat, no buffering, no decoding
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        return os.read(fd, READ_SIZE)
+    finally:
+        os.close(fd)
+
+
+def boot_time(proc_root=PROC_ROOT, cached=False):
+    # btime is derived from the wall clock, so it is re-read on every full scan
+    if cached and proc_root in _boot_times:
+        return _boot_times[proc_root]
+    with open(f"{proc_root}/stat", 'rb') as f:
+        for line in f:
+            if line.startswith(b'btime'):
+                _boot_times[proc_root] = float(line.split()[1])
+                return _boot_times[proc_root]
+    raise RuntimeError(f"line 'btime' not found in {proc_root}/stat")
+
+
+def username_for(uid):
+    name = _usernames.get(uid)
+    if name is None:
+        try:
+            name = pwd.getpwuid(uid).pw_name
+        except KeyError:
+            name = str(uid)
+        _usernames[uid] = name
+    return name
+
+
+def parse_stat(data):
+    # The name is in parentheses and may itself contain spaces or ')'
+    start = data.find(b'(')
+    end = data.rfind(b')')
+    name = os.fsdecode(data[start + 1:end])
+    fields = data[end + 2:].split()
+    # fields[0] is state (field 3 in proc(5)); ppid is field 4, num_threads 20, starttime 22
+    return name, int(fields[1]), int(fields[17]), int(fields[19])
+
+
+def parse_real_uid(data):
+    start = data.find(b'\nUid:')
+    if start < 0:
+        return None
+    return int(data[start + 5:data.find(b'\n', start + 5)].split()[0])
+
+
+def full_name(base, name):
+    # Same rule psutil uses: comm is cut at 15 bytes, so prefer argv[0] when it extends it
+    try:
+        cmdline = _read(f"{base}/cmdline")
+    except OSError:
+        return name
+    if not cmdline:
+        return name
+    extended = os.path.basename(os.fsdecode(cmdline.split(b'\0', 1)[0]))
+    return extended if extended.startswith(name) else name
+
+
+def read_process(pid, proc_root=PROC_ROOT, btime=None, with_display=False):
+    base = f"{proc_root}/{pid}"
+    try:
+        name, ppid, num_threads, starttime = parse_stat(_read(f"{base}/stat"))
+    except (OSError, ValueError, IndexError):
+        return None
+
+    if len(name) >= TRUNCATED_NAME_LENGTH:
+        name = full_name(base, name)
+
+    try:
+        uid = parse_real_uid(_read(f"{base}/status"))
+        username = username_for(uid) if uid is not None else None
+    except OSError:
+        username = None
+
+    if btime is None:
+        btime = boot_time(proc_root, cached=True)
+
+    return ProcessRecord(
+        pid=pid,
+        name=name,
+        ppid=ppid,
+        username=username,
+        create_time=starttime / CLOCK_TICKS + btime,
+        exe=None,
+        num_threads=num_threads,
+        has_display=environ_has_display(f"{base}/environ") if with_display else None,
+        proc=None,
+    )
+
+
+def list_pids(proc_root=PROC_ROOT):
+    return [int(entry.name) for entry in os.scandir(proc_root) if entry.name.isdigit()]
+
+
+def scan_processes(proc_root=PROC_ROOT, with_display=False):
+    btime = boot_time(proc_root)
+    records = []
+    for pid in list_pids(proc_root):
+        record = read_process(pid, proc_root, btime, with_display)
+        if record is not None:
+            records.append(record)
+    return records
+
+
+def is_running(record, proc_root=PROC_ROOT):
+    # Same PID and same start time, i.e. not a recycled PID
+    try:
+        starttime = parse_stat(_read(f"{proc_root}/{record.pid}/stat"))[3]
+    except (OSError, ValueError, IndexError):
+        return False
+    create_time = starttime / CLOCK_TICKS + boot_time(proc_root, cached=True)
+    return record.create_time is None or abs(create_time - record.create_time) < 1e-6
@@ -0,0 +1,44 @@
+from collections import namedtuple
+
+AppTree = namedtuple('AppTree', ['root', 'members'])
+
+
+def find_roots(targets, parents):
+    # Map each target PID to its topmost ancestor that is also a target.
+    # `parents` is pid -> ppid for the whole process table, so a chain like
+    # chrome -> (sh wrapper) -> chrome helper still lands on the browser.
+    target_pids = {record.pid for record in targets}
+    roots = {}
+
+    for record in targets:
+        root = record.pid
+        seen = {record.pid}
+        pid = record.ppid
+        while pid is not None and pid not in seen:
+            seen.add(pid)
+            if pid in target_pids:
+                root = pid
+            pid = parents.get(pid)
+        roots[record.pid] = root
+
+    return roots
+
+
+def group_applications(targets, records=None):
+    # Group matching records into application trees: one entry per root, with every
+    # matching descendant as a member (root first).
+    records = records if records is not None else targets
+    parents = {record.pid: record.ppid for record in records}
+    by_pid = {record.pid: record for record in targets}
+    roots = find_roots(targets, parents)
+
+    members = {}
+    for pid in sorted(roots):
+        members.setdefault(roots[pid], []).append(by_pid[pid])
+
+    apps = []
+    for root_pid in sorted(members):
+        group = members[root_pid]
+        group.sort(key=lambda record: record.pid != root_pid)
+        apps.append(AppTree(by_pid[root_pid], tuple(group)))
+    return apps
@@ -0,0 +1,278 @@
+import asyncio
+import signal
+from datetime import datetime, timedelta
+
+from gotobed.deadline import DeadlineTimer
+from gotobed.inventory import refresh_interval
+
+STATUS_INTERVAL = 300
+# A skipped firing retimed by a clock correction is still the one skipped; rules
+# have minute resolution, so no other firing is this close
+SKIP_SLACK = timedelta(seconds=30)
+
+
+class ShutdownRuntime:
+    # Scheduler, process watcher, teardown and shutdown as tasks on one event loop.
+    # Blocking psutil work (inventory updates, teardown, the shutdown command) runs
+    # in the default executor; the inventory is only touched under one lock.
+
+    def __init__(self, schedule, close, shutdown, inventory=None, announce=None, once=True, policy=None):
+        self.schedule = schedule
+        self.close = close
+        self.shutdown = shutdown
+        self.inventory = inventory
+        self.announce = announce
+        self.once = once
+        self.policy = policy
+
+        self.state = 'idle'
+        self.target = None
+        self.last_run = None
+        self._override = None
+        self._postponed = None
+        self._skip = None
+        self._stopping = False
+        self._loop = None
+        self._changed = None
+        self._lock = None
+
+    # Control, safe to call from the loop thread at any time
+
+    def _notify(self):
+        if self._changed is not None:
+            self._changed.set()
+
+    def postpone(self, seconds):
+        base = self._override or self.target or datetime.now()
+        if self._override is None:
+            # Remember the scheduled firing being moved, so a later cancel skips it too
+            self._postponed = self.target
+        self._override = base + timedelta(seconds=seconds)
+        self._notify()
+        return self._override
+
+    def cancel(self):
+        # Skip the upcoming firing; the schedule carries on after it. Returns the
+        # skipped firing (None when only an override was dropped).
+        skip = self._postponed if self._override is not None else self.target
+        if skip is not None:
+            self._skip = skip
+        self._override = None
+        self._postponed = None
+        self._notify()
+        return skip
+
+    def run_now(self):
+        self._override = datetime.now()
+        self._notify()
+
+    def reschedule(self, schedule, keep_controls=False):
+        # keep_controls: the same firings, only retimed (a fleet clock correction,
+        # fleet.py), so a postpone or cancel still applies
+        self.schedule = schedule
+        if not keep_controls:
+            self._override = None
+            self._postponed = None
+        self._notify()
+
+    def stop(self):
+        self._stopping = True
+        self._notify()
+
+    def upcoming(self):
+        # The next firing, including control calls the scheduler has not picked up yet
+        if self.state == 'waiting' or self.state == 'idle':
+            if self._changed is not None and self._changed.is_set():
+                return self._next_target(datetime.now())
+        return self.target
+
+    def status(self, counts=True):
+        target = self.upcoming()
+        remaining = None
+        if target is not None:
+            remaining = max(0, int((target - datetime.now()).total_seconds()))
+        status = {
+            'state': self.state,
+            'target': target.isoformat(timespec='seconds') if target else None,
+            'remaining': remaining,
+            'last_run': self.last_run.isoformat(timespec='seconds') if self.last_run else None,
+        }
+        if counts and self.inventory is not None:
+            status['processes'] = len(self.inventory)
+            status['targets'] = len(self.inventory.targets())
+        return status
+
+    async def query_status(self):
+        # status() for callers on the loop (control.py). The inventory counts are taken
+        # under the lock so they never race a refresh; the close sequence holds it for
+        # minutes, so while closing they are left out rather than waited for.
+        if self._lock is None or self.state in ('closing', 'shutting down'):
+            return self.status(counts=False)
+        async with self._lock:
+            return self.status()
+
+    # Tasks
+
+    async def run(self):
+        self._loop = asyncio.get_running_loop()
+        self._changed = asyncio.Event()
+        self._lock = asyncio.Lock()
+
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            try:
+                self._loop.add_signal_handler(signum, self._on_signal)
+            except (NotImplementedError, RuntimeError, ValueError):
+                pass
+
+        helpers = [asyncio.create_task(self._report())]
+        if self.inventory is not None:
+            helpers.append(asyncio.create_task(self._watch()))
+        if self.policy is not None:
+            helpers.append(asyncio.create_task(self._watch_policy()))
+
+        try:
+            await self._scheduler()
+        finally:
+            for task in helpers:
+                task.cancel()
+            await asyncio.gather(*helpers, return_exceptions=True)
+            for signum in (signal.SIGINT, signal.SIGTERM):
+                try:
+                    self._loop.remove_signal_handler(signum)
+                except (NotImplementedError, RuntimeError, ValueError):
+                    pass
+
+    def _on_signal(self):
+        print(f"\n\n[{datetime.now().strftime('%H:%M:%S')}] Shutdown cancelled by user")
+        self.state = 'cancelled'
+        self.stop()
+
+    def _next_target(self, now):
+        if self._override is not None:
+            return self._override
+
+        target = self.schedule.next_fire(now)
+        while target is not None and self._skip is not None and abs(target - self._skip) < SKIP_SLACK:
+            target = self.schedule.next_fire(target)
+        return target
+
+    async def _scheduler(self):
+        while not self._stopping:
+            self._changed.clear()
+            target = self._next_target(datetime.now())
+            if target is None:
+                print("Nothing left in the shutdown schedule")
+                self.state = 'idle'
+                self.target = None
+                if self.once:
+                    return
+                # Resident (control.py): wait for a reload, postpone or run-now
+                await self._changed.wait()
+                continue
+
+            if target != self.target:
+                self.target = target
+                if self.announce:
+                    self.announce(target)
+
+            self.state = 'waiting'
+            if not await self._sleep_until(target):
+                continue
+
+            self._override = None
+            self._postponed = None
+            self._skip = None
+            await self._run_sequence(target)
+            if self.once:
+                return
+
+    async def _sleep_until(self, target):
+        # True once the deadline passes, False as soon as a control call changes the plan
+        with DeadlineTimer(target) as timer:
+            while not timer.expired():
+                if self._changed.is_set() or self._stopping:
+                    return False
+
+                fired = self._loop.create_future()
+                fd = timer.fileno()
+                timeout = None
+                if fd is not None:
+                    self._loop.add_reader(fd, lambda: fired.done() or fired.set_result(None))
+                else:
+                    timeout = min(max(timer.remaining(), 0), timer.max_step)
+
+                changed = asyncio.ensure_future(self._changed.wait())
+                try:
+                    await asyncio.wait([fired, changed], timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                finally:
+                    if fd is not None:
+                        self._loop.remove_reader(fd)
+                    fired.cancel()
+                    changed.cancel()
+
+        return not self._stopping
+
+    async def _run_sequence(self, target):
+        self.state = 'closing'
+        async with self._lock:
+            await self._loop.run_in_executor(None, self.close, self.inventory)
+        if self._stopping:
+            # Cancelled (Ctrl+C, SIGTERM) while closing: stop short of the shutdown
+            return
+
+        self.state = 'shutting down'
+        result = await self._loop.run_in_executor(None, self.shutdown, target)
+        # shutdown may return a poweroff.PowerOffResult
+        self.state = 'failed' if result is not None and not result.ok else 'done'
+        self.last_run = datetime.now()
+
+    async def _watch(self):
+        events = self.inventory.events
+        fd = events.fileno() if events is not None else None
+
+        while True:
+            if fd is not None:
+                readable = self._loop.create_future()
+                self._loop.add_reader(fd, lambda: readable.done() or readable.set_result(None))
+                try:
+                    await readable
+                finally:
+                    self._loop.remove_reader(fd)
+            else:
+                # Without pushed events (no event source, or the /proc poller) poll as
+                # often as the time left calls for
+                remaining = STATUS_INTERVAL
+                if self.target is not None:
+                    remaining = (self.target - datetime.now()).total_seconds()
+                await asyncio.sleep(refresh_interval(remaining))
+
+            async with self._lock:
+                await self._loop.run_in_executor(None, self.inventory.update)
+
+    async def _watch_policy(self):
+        # Compiling runs in the executor and the swap is one assignment, so neither
+        # the loop nor a teardown in progress waits for it; the inventory picks the
+        # new rules up on its next update (ProcessInventory.reclassify)
+        fd = self.policy.fileno()
+        while True:
+            if fd is not None:
+                readable = self._loop.create_future()
+                self._loop.add_reader(fd, lambda: readable.done() or readable.set_result(None))
+                try:
+                    await readable
+                finally:
+                    self._loop.remove_reader(fd)
+            else:
+                await asyncio.sleep(self.policy.interval)
+            await self._loop.run_in_executor(None, self.policy.check)
+
+    async def _report(self):
+        while True:
+            await asyncio.sleep(STATUS_INTERVAL)
+            if self.state != 'waiting' or self.target is None:
+                continue
+            remaining = (self.target - datetime.now()).total_seconds()
+            if remaining > 60:
+                hours = int(remaining // 3600)
+                minutes = int((remaining % 3600) // 60)
+                print(f"[{datetime.now().strftime('%H:%M:%S')}] Still waiting... {hours}h {minutes}m remaining")
@@ -0,0 +1,121 @@
+import os
+import platform
+from collections import namedtuple
+
+CURRENT_OS = platform.system()
+
+# Everything the classifiers look at, gathered in one oneshot() pass per process.
+# Fields that could not be read (access denied, not collected on this OS) are None.
+ProcessRecord = namedtuple('ProcessRecord', [
+    'pid', 'name', 'ppid', 'username', 'create_time', 'exe', 'num_threads', 'has_display', 'proc'
+])
+
+SNAPSHOT_ATTRS = {
+    'Linux': ['name', 'ppid', 'username', 'create_time', 'environ'],
+    'Darwin': ['name', 'ppid', 'username', 'create_time', 'exe'],
+    'Windows': ['name', 'ppid', 'username', 'create_time', 'num_threads'],
+}
+
+DISPLAY_VARIABLES = ('DISPLAY', 'WAYLAND_DISPLAY')
+
+# On Linux, read /proc directly instead of going through psutil (see procfs.py).
+# psutil itself is then only imported when processes are about to be signalled.
+USE_PROCFS = CURRENT_OS == 'Linux' and os.path.isdir('/proc/self')
+
+
+def _has_display(env):
+    if env is None:
+        return None
+    return any(name in env for name in DISPLAY_VARIABLES)
+
+
+def make_record(proc, info):
+    return ProcessRecord(
+        pid=proc.pid,
+        name=info.get('name') or '',
+        ppid=info.get('ppid'),
+        username=info.get('username'),
+        create_time=info.get('create_time'),
+        exe=info.get('exe'),
+        num_threads=info.get('num_threads'),
+        has_display=_has_display(info.get('environ')),
+        proc=proc,
+    )
+
+
+def snapshot_process(proc, attrs=None):
+    import psutil
+    attrs = attrs or SNAPSHOT_ATTRS.get(CURRENT_OS, ['name', 'ppid', 'username', 'create_time'])
+    try:
+        info = proc.as_dict(attrs=attrs, ad_value=None)
+    except psutil.NoSuchProcess:
+        return None
+    return make_record(proc, info)
+
+
+def take_snapshot(attrs=None):
+    if attrs is None and USE_PROCFS:
+        from gotobed import procfs
+        return procfs.scan_processes()
+
+    import psutil
+    attrs = attrs or SNAPSHOT_ATTRS.get(CURRENT_OS, ['name', 'ppid', 'username', 'create_time'])
+    records = []
+
+    # process_iter() fills proc.info inside a single oneshot() context per process
+    for proc in psutil.process_iter(attrs, ad_value=None):
+        records.append(make_record(proc, proc.info))
+
+    return records
+
+
+def snapshot_pid(pid):
+    if USE_PROCFS:
+        from gotobed import procfs
+        return procfs.read_process(pid)
+
+    import psutil
+    try:
+        return snapshot_process(psutil.Process(pid))
+    except (psutil.NoSuchProcess, psutil.AccessDenied):
+        return None
+
+
+def list_pids():
+    if USE_PROCFS:
+        from gotobed import procfs
+        return procfs.list_pids()
+
+    import psutil
+    return psutil.pids()
+
+
+def still_running(record):
+    if record.proc is not None:
+        return record.proc.is_running()
+
+    from gotobed import procfs
+    return procfs.is_running(record)
+
+
+def process_for(record):
+    # Records from the /proc scanner carry no psutil handle; make one, refusing recycled PIDs
+    if record.proc is not None:
+        return record.proc
+
+    import psutil
+    proc = psutil.Process(record.pid)
+    if record.create_time is not None and abs(proc.create_time() - record.create_time) > 0.01:
+        raise psutil.NoSuchProcess(record.pid, record.name)
+    return proc
+
+
+def processes_for(records):
+    import psutil
+    procs = []
+    for record in records:
+        try:
+            procs.append(process_for(record))
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            pass
+    return procs
@@ -0,0 +1,190 @@
+import time
+from collections import namedtuple
+
+import psutil
+
+from gotobed import tracing
+
+TeardownResult = namedtuple('TeardownResult', ['name', 'pid', 'outcome', 'seconds', 'processes'], defaults=(1,))
+
+DEFAULT_GRACE = 3
+DEFAULT_DEADLINE = 30
+POLL_INTERVAL = 0.1
+
+
+def process_label(proc):
+    try:
+        return proc.name()
+    except (psutil.NoSuchProcess, psutil.AccessDenied):
+        return f"PID {proc.pid}"
+
+
+def _terminate(proc):
+    proc.terminate()
+
+
+def _kill(proc):
+    try:
+        proc.kill()
+        return True
+    except psutil.NoSuchProcess:
+        return True
+    except (psutil.AccessDenied, PermissionError):
+        return False
+
+
+def _is_zombie(proc):
+    try:
+        return proc.status() == psutil.STATUS_ZOMBIE
+    except (psutil.NoSuchProcess, psutil.AccessDenied):
+        return False
+
+
+def _terminate_quietly(proc):
+    try:
+        proc.terminate()
+    except (psutil.NoSuchProcess, psutil.AccessDenied, PermissionError):
+        pass
+
+
+def teardown_applications(apps, close=None, grace=DEFAULT_GRACE, deadline=DEFAULT_DEADLINE,
+                          concurrency=None, on_result=None, wait=None, grace_for=None, admit=None):
+    # Each app is a list of processes with the root first. Only the root is asked to
+    # close; the whole group is waited on at once and reported as one application.
+    # Every group is signalled up front (at most `concurrency` outstanding at a time)
+    # so the total time tracks the slowest app rather than the sum of all of them.
+    # `wait` has the signature of psutil.wait_procs and can be swapped for an
+    # event-driven one (see x11windows.WindowCloser). `grace_for(group)` overrides the
+    # grace per app (see exitstats.ExitStats); 0 kills the app without asking it first.
+    # `admit(outstanding)` narrows `concurrency` from moment to moment (see waves.WaveGate),
+    # for as long as the apps still pending can be released that way before the deadline.
+    # Apps killed because the overall deadline ran out, before their own grace did or
+    # before they were even asked, come back as 'expired' rather than 'killed': they
+    # never got the chance to ignore anything.
+    close = close or _terminate
+    wait = wait or psutil.wait_procs
+    start = time.monotonic()
+    end = start + deadline
+    limit = concurrency or max(len(apps), 1)
+
+    pending = [list(members) for members in apps if members]
+    pending.reverse()
+    alive = {}
+    remaining = {}
+    owner = {}
+    orphaned = set()
+    names = {}
+    signalled_at = {}
+    cut_short = set()
+    results = []
+
+    def finish(group, outcome):
+        root = group[0]
+        began = signalled_at.get(id(group), start)
+        result = TeardownResult(names[id(group)], root.pid, outcome, time.monotonic() - began, len(group))
+        results.append(result)
+        tracing.record('wait', began, app=result.name, pid=root.pid, outcome=outcome, processes=len(group))
+        if on_result:
+            on_result(result)
+
+    def start_group(group):
+        key = id(group)
+        names[key] = process_label(group[0])
+        signalled_at[key] = time.monotonic()
+        remaining[key] = set(group)
+        for proc in group:
+            owner[proc] = group
+
+    def kill_group(group, outcome='killed'):
+        with tracing.span('kill', app=names[id(group)], pid=group[0].pid) as attrs:
+            members = remaining.pop(id(group), group)
+            killed = all([_kill(proc) for proc in members])
+            attrs['processes'] = len(members)
+        finish(group, outcome if killed else 'failed')
+
+    def on_gone(proc):
+        group = owner.pop(proc)
+        left = remaining[id(group)]
+        left.discard(proc)
+        if left and proc is group[0]:
+            # The root is gone; helpers that outlived it are orphans now, ask them directly
+            orphaned.add(id(group))
+            for member in left:
+                _terminate_quietly(member)
+        if not left:
+            del remaining[id(group)]
+            del alive[id(group)]
+            finish(group, 'closed')
+
+    while pending or alive:
+        now = time.monotonic()
+        leftovers = []
+
+        wave = limit
+        if admit is not None:
+            wave = min(limit, max(admit(len(alive)), 1))
+            # Waves of `wave` apps, a grace each, no longer fit before the deadline:
+            # stop throttling so every app left is at least asked before the kill
+            if -(-len(pending) // wave) * grace >= end - now:
+                wave = limit
+        while pending and len(alive) < wave and now < end:
+            group = pending.pop()
+            group_grace = grace if grace_for is None else grace_for(group)
+            start_group(group)
+            if group_grace <= 0:
+                # Known to ignore the request: don't hold a slot waiting for it
+                leftovers.extend(remaining.get(id(group), ()))
+                kill_group(group)
+                continue
+            try:
+                close(group[0])
+            except psutil.NoSuchProcess:
+                for member in group[1:]:
+                    _terminate_quietly(member)
+            except (psutil.AccessDenied, PermissionError):
+                remaining.pop(id(group))
+                finish(group, 'failed')
+                continue
+            finally:
+                tracing.record('signal', signalled_at[id(group)], app=names[id(group)], pid=group[0].pid)
+            if now + group_grace > end:
+                cut_short.add(id(group))
+            alive[id(group)] = (group, min(now + group_grace, end))
+
+        if leftovers:
+            psutil.wait_procs(leftovers, timeout=1)
+            leftovers = []
+
+        if not alive:
+            if pending and now >= end:
+                # Out of time before these could even be asked nicely
+                while pending:
+                    group = pending.pop()
+                    start_group(group)
+                    kill_group(group, 'expired')
+            continue
+
+        timeout = max(0.0, min(kill_at for _, kill_at in alive.values()) - now)
+        if pending or orphaned.intersection(alive):
+            timeout = min(timeout, POLL_INTERVAL)
+
+        procs = [proc for key in alive for proc in remaining[key]]
+        _, still_alive = wait(procs, timeout=timeout, callback=on_gone)
+
+        # Orphaned helpers sit as zombies until init reaps them; they have exited all the same
+        for proc in still_alive:
+            if _is_zombie(proc):
+                on_gone(proc)
+
+        now = time.monotonic()
+        stragglers = [group for group, kill_at in alive.values() if kill_at <= now]
+        for group in stragglers:
+            del alive[id(group)]
+            leftovers.extend(remaining.get(id(group), ()))
+            kill_group(group, 'expired' if id(group) in cut_short else 'killed')
+
+        if leftovers:
+            psutil.wait_procs(leftovers, timeout=1)
+
+    return results
+
@@ -0,0 +1,200 @@
+import heapq
+import itertools
+import re
+from datetime import date, datetime, time as dtime, timedelta
+
+WEEKDAY_NAMES = ['mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun']
+WEEKDAY_GROUPS = {
+    'daily': frozenset(range(7)),
+    'everyday': frozenset(range(7)),
+    'weekdays': frozenset(range(5)),
+    'weekends': frozenset([5, 6]),
+}
+
+TIME_RE = re.compile(r'^(\d{1,2}):(\d{2})$')
+DATE_RE = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+
+
+class DailyRule:
+    def __init__(self, at, weekdays=WEEKDAY_GROUPS['daily']):
+        self.at = at
+        self.weekdays = frozenset(weekdays)
+
+    def next_after(self, moment):
+        if not self.weekdays:
+            return None
+        day = moment.date()
+        for offset in range(8):
+            candidate = datetime.combine(day + timedelta(days=offset), self.at)
+            if candidate > moment and candidate.weekday() in self.weekdays:
+                return candidate
+        return None
+
+    def __repr__(self):
+        days = ','.join(WEEKDAY_NAMES[day] for day in sorted(self.weekdays))
+        return f"DailyRule({days} {self.at.strftime('%H:%M')})"
+
+
+class OneOffRule:
+    # Fires once; on its date it replaces every recurring firing
+    def __init__(self, at):
+        self.at = at
+
+    def next_after(self, moment):
+        return self.at if self.at > moment else None
+
+    def __repr__(self):
+        return f"OneOffRule({self.at.strftime('%Y-%m-%d %H:%M')})"
+
+
+def _parse_time(text):
+    match = TIME_RE.match(text)
+    if not match:
+        raise ValueError(f"Invalid time '{text}', expected HH:MM")
+    try:
+        return dtime(int(match.group(1)), int(match.group(2)))
+    except ValueError as e:
+        raise ValueError(f"Invalid time '{text}': {e}")
+
+
+def _parse_date(text):
+    try:
+        return date.fromisoformat(text)
+    except ValueError as e:
+        raise ValueError(f"Invalid date '{text}': {e}")
+
+
+def _parse_weekdays(text):
+    if text in WEEKDAY_GROUPS:
+        return WEEKDAY_GROUPS[text]
+
+    days = set()
+    for part in text.split(','):
+        if '-' in part:
+            first, last = part.split('-', 1)
+            start, end = WEEKDAY_NAMES.index(first[:3]), WEEKDAY_NAMES.index(last[:3])
+            days.update(range(start, end + 1) if start <= end else list(range(start, 7)) + list(range(end + 1)))
+        elif part[:3] in WEEKDAY_NAMES:
+            days.add(WEEKDAY_NAMES.index(part[:3]))
+        else:
+            raise ValueError(f"Invalid weekday '{part}'")
+    return frozenset(days)
+
+
+def parse_rule(text):
+    # "22:00", "weekends 23:30", "mon-fri 22:00", "sat,sun 23:30",
+    # "skip 2026-12-24", "2026-12-31 01:30"
+    words = text.strip().lower().split()
+
+    if len(words) == 1:
+        return DailyRule(_parse_time(words[0]))
+
+    if len(words) == 2 and words[0] == 'skip' and DATE_RE.match(words[1]):
+        return _parse_date(words[1])
+
+    if len(words) == 2 and DATE_RE.match(words[0]):
+        return OneOffRule(datetime.combine(_parse_date(words[0]), _parse_time(words[1])))
+
+    if len(words) == 2:
+        return DailyRule(_parse_time(words[1]), _parse_weekdays(words[0]))
+
+    raise ValueError(f"Invalid schedule rule '{text}'")
+
+
+class Schedule:
+    # Upcoming firings live in a heap of (when, seq, rule). Asking for the next
+    # deadline pops stale or suppressed entries and pushes each rule's following
+    # firing, so it costs O(log n) per firing rather than a scan over every rule.
+
+    def __init__(self, rules=(), skip_dates=()):
+        self.rules = []
+        self.skip_dates = set(skip_dates)
+        self.override_dates = set()
+        self._heap = []
+        self._seq = itertools.count()
+        self._now = None
+        for rule in rules:
+            self.add(rule)
+
+    @classmethod
+    def parse(cls, lines):
+        schedule = cls()
+        for line in lines:
+            schedule.add(parse_rule(line))
+        return schedule
+
+    def add(self, rule):
+        if isinstance(rule, date) and not isinstance(rule, datetime):
+            self.skip_dates.add(rule)
+            return
+
+        self.rules.append(rule)
+        if isinstance(rule, OneOffRule):
+            self.override_dates.add(rule.at.date())
+        if self._now is not None:
+            self._push(rule, self._now)
+
+    def _push(self, rule, after):
+        when = rule.next_after(after)
+        if when is not None:
+            heapq.heappush(self._heap, (when, next(self._seq), rule))
+
+    def _rebuild(self, now):
+        self._heap = []
+        for rule in self.rules:
+            self._push(rule, now)
+
+    def _suppressed(self, when, rule):
+        if isinstance(rule, OneOffRule):
+            return False
+        day = when.date()
+        return day in self.skip_dates or day in self.override_dates
+
+    def next_firing(self, now=None):
+        now = now or datetime.now()
+        if self._now is None or now < self._now:
+            # First call, or the clock went backwards: start over from `now`
+            self._rebuild(now)
+        self._now = now
+
+        while self._heap:
+            when, _, rule = self._heap[0]
+            if when > now and not self._suppressed(when, rule):
+                return when, rule
+            heapq.heappop(self._heap)
+            self._push(rule, max(when, now))
+
+        return None, None
+
+    def next_fire(self, now=None):
+        return self.next_firing(now)[0]
+
+    def __len__(self):
+        return len(self.rules)
+
+
+class ShiftedSchedule:
+    # A schedule kept by another clock (a fleet controller's, fleet.py): that clock
+    # reads `shift` seconds ahead of this one
+    def __init__(self, schedule, shift):
+        self.schedule = schedule
+        self.shift = timedelta(seconds=shift)
+
+    def next_fire(self, now=None):
+        now = now or datetime.now()
+        when = self.schedule.next_fire(now + self.shift)
+        return when - self.shift if when is not None else None
+
+    def __len__(self):
+        return len(self.schedule)
+
+
+def read_rules(path):
+    # A schedule file: one rule per line as for parse_rule(), '#' starts a comment
+    rules = []
+    with open(path) as f:
+        for line in f:
+            line = line.split('#', 1)[0].strip()
+            if line:
+                rules.append(line)
+    return rules
@@ -0,0 +1,185 @@
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+PROFILE_INTERVAL = 0.001
+PROFILE_TOP = 15
+
+_writer = None
+_profiling = False
+
+
+class TraceWriter:
+    # One JSON object per line. Times are time.monotonic() seconds, so spans from
+    # different threads (the runtime's executor, the teardown loop) line up.
+
+    def __init__(self, stream, close_stream=False):
+        self.stream = stream
+        self.close_stream = close_stream
+        self.lock = threading.Lock()
+        self.origin = time.monotonic()
+
+    def write(self, entry):
+        line = json.dumps(entry, default=str)
+        with self.lock:
+            self.stream.write(line + '\n')
+            self.stream.flush()
+
+    def close(self):
+        if self.close_stream:
+            self.stream.close()
+
+
+def enable_trace(path):
+    # '-' traces to stderr, keeping stdout for the usual progress messages
+    global _writer
+    if path == '-':
+        _writer = TraceWriter(sys.stderr)
+    else:
+        _writer = TraceWriter(open(path, 'a', buffering=1), close_stream=True)
+    event('trace', pid=os.getpid(), argv=sys.argv)
+    return _writer
+
+
+def enable_profile(enabled=True):
+    global _profiling
+    _profiling = enabled
+
+
+def disable():
+    global _writer, _profiling
+    if _writer is not None:
+        _writer.close()
+    _writer = None
+    _profiling = False
+
+
+def record(name, start, end=None, **attrs):
+    if _writer is None:
+        return
+    end = time.monotonic() if end is None else end
+    entry = {'span': name, 'start': round(start - _writer.origin, 6), 'duration': round(end - start, 6)}
+    entry.update(attrs)
+    _writer.write(entry)
+
+
+def event(name, **attrs):
+    if _writer is None:
+        return
+    entry = {'event': name, 'at': round(time.monotonic() - _writer.origin, 6), 'wall': time.time()}
+    entry.update(attrs)
+    _writer.write(entry)
+
+
+@contextmanager
+def span(name, **attrs):
+    # attrs may be filled in by the body (e.g. counts), they are written on exit
+    start = time.monotonic()
+    try:
+        yield attrs
+    finally:
+        record(name, start, **attrs)
+
+
+class SamplingProfiler:
+    # Samples one thread's stack from a background thread via sys._current_frames().
+    # Cheap enough to leave on for a whole phase; resolution is `interval`.
+
+    def __init__(self, interval=PROFILE_INTERVAL, thread_id=None):
+        self.interval = interval
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.own = Counter()
+        self.cumulative = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+        self._switch_interval = None
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            self.samples += 1
+            self.own[_location(frame)] += 1
+            seen = set()
+            while frame is not None:
+                location = _location(frame)
+                if location not in seen:
+                    seen.add(location)
+                    self.cumulative[location] += 1
+                frame = frame.f_back
+
+    def start(self):
+        # The sampler only runs when it gets the GIL; with the default 5 ms switch
+        # interval a busy main thread would starve it
+        self._switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(min(self._switch_interval, self.interval / 2))
+        self._thread = threading.Thread(target=self._sample, name='sampling-profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        if self._switch_interval is not None:
+            sys.setswitchinterval(self._switch_interval)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def top(self, count=PROFILE_TOP, cumulative=False):
+        counter = self.cumulative if cumulative else self.own
+        return counter.most_common(count)
+
+    def report(self, label, count=PROFILE_TOP, file=None):
+        file = file or sys.stdout
+        print(f"\nProfile: {label} ({self.samples} samples, every {self.interval * 1000:g} ms)", file=file)
+        if not self.samples:
+            return
+        print(f"  {'self %':>7} {'total %':>7}  location", file=file)
+        for location, hits in self.top(count):
+            total = self.cumulative[location]
+            print(f"  {100 * hits / self.samples:7.1f} {100 * total / self.samples:7.1f}  {location}", file=file)
+
+
+def _location(frame):
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{frame.f_lineno} {code.co_name}"
+
+
+@contextmanager
+def profiled(label):
+    # Profile the body when --profile is on; also traced as a span either way
+    with span(label):
+        if not _profiling:
+            yield
+            return
+        profiler = SamplingProfiler()
+        with profiler:
+            yield
+        profiler.report(label)
+        event('profile', phase=label, samples=profiler.samples,
+              top=[[location, hits] for location, hits in profiler.top()])
+
+
+def add_arguments(parser):
+    parser.add_argument('--trace', metavar='PATH',
+                        help="write JSON-lines timing spans to PATH ('-' for stderr)")
+    parser.add_argument('--profile', action='store_true',
+                        help='sample scan and classification and print the hot spots')
+
+
+def configure(args):
+    if args.trace:
+        enable_trace(args.trace)
+    if args.profile:
+        enable_profile()
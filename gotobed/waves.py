@@ -0,0 +1,140 @@
+import os
+import time
+
+import psutil
+
+from gotobed import tracing
+
+# Teardown in waves: teardown_applications() asks the WaveGate how many apps may be
+# closing at once, and the gate widens or narrows that window from live pressure
+# stall information (/proc/pressure, Linux 4.20+). Closing apps flush caches, session
+# files and databases; releasing them all together makes them fight over the disk.
+
+PRESSURE_ROOT = '/proc/pressure'
+PRESSURE_RESOURCES = ('io', 'memory')
+
+INITIAL_WAVE = 4
+MIN_WAVE = 1
+SAMPLE_INTERVAL = 0.5    # seconds between window adjustments, about how long a signalled app takes to start writing
+LOW_PRESSURE = 0.05      # share of time some task stalled: below this, widen
+HIGH_PRESSURE = 0.40     # above this, halve
+
+# A closing app flushes roughly what it wrote recently plus part of its memory
+RSS_WEIGHT = 0.1
+WRITE_HORIZON = 10       # seconds of its average write rate
+LEADING_HEAVY = 2        # heaviest apps released first, see order_by_footprint()
+
+
+class PressureMonitor:
+    # Share of wall time in which some task was stalled on each resource, measured
+    # between consecutive reads from the cumulative `total=` microsecond counters
+    # (the avg10 figures lag by seconds, far too slow for a teardown)
+
+    def __init__(self, root=PRESSURE_ROOT, resources=PRESSURE_RESOURCES, clock=time.monotonic):
+        self.root = root
+        self.resources = resources
+        self.clock = clock
+        self._last = None
+
+    @staticmethod
+    def available(root=PRESSURE_ROOT):
+        return os.path.exists(os.path.join(root, 'io'))
+
+    def _totals(self):
+        totals = {}
+        for resource in self.resources:
+            try:
+                with open(os.path.join(self.root, resource)) as f:
+                    for line in f:
+                        if line.startswith('some '):
+                            totals[resource] = int(line.rsplit('total=', 1)[1])
+            except (OSError, ValueError, IndexError):
+                pass
+        return totals
+
+    def read(self):
+        now = self.clock()
+        totals = self._totals()
+        last = self._last
+        self._last = (now, totals)
+        if last is None or now <= last[0]:
+            return {}
+        elapsed_us = (now - last[0]) * 1e6
+        return {resource: min(1.0, (total - last[1].get(resource, total)) / elapsed_us)
+                for resource, total in totals.items()}
+
+
+class WaveGate:
+    # Congestion control for teardown: start with a small wave, double it while the
+    # system shows no stall, add one at a time once it has, halve it under pressure.
+    # Only a window that is actually full is widened.
+
+    def __init__(self, monitor, initial=INITIAL_WAVE, maximum=None, interval=SAMPLE_INTERVAL, clock=time.monotonic):
+        self.monitor = monitor
+        self.window = initial
+        self.maximum = maximum
+        self.interval = interval
+        self.clock = clock
+        self.congested = False
+        self.pressure = 0.0
+        self._last = None
+
+    def adjust(self, outstanding):
+        pressure = max(self.monitor.read().values(), default=0.0)
+        self.pressure = pressure
+        if pressure >= HIGH_PRESSURE:
+            self.congested = True
+            self.window = max(MIN_WAVE, self.window // 2)
+        elif pressure <= LOW_PRESSURE and outstanding >= self.window:
+            self.window = self.window + 1 if self.congested else self.window * 2
+        if self.maximum:
+            self.window = min(self.window, self.maximum)
+        tracing.event('wave', window=self.window, pressure=round(pressure, 3), closing=outstanding)
+
+    def limit(self, outstanding):
+        # How many apps may be closing at once right now
+        now = self.clock()
+        if self._last is None:
+            self._last = now
+            self.monitor.read()
+        elif now - self._last >= self.interval:
+            self._last = now
+            self.adjust(outstanding)
+        return self.window
+
+
+def open_wave_gate(maximum=None):
+    if not PressureMonitor.available():
+        return None
+    return WaveGate(PressureMonitor(), maximum=maximum)
+
+
+def footprint(procs, now=None):
+    # Rough bytes an app will flush on exit: its average write rate over a short
+    # horizon plus a share of its resident memory
+    now = now or time.time()
+    total = 0
+    for proc in procs:
+        try:
+            with proc.oneshot():
+                rss = proc.memory_info().rss
+                written = proc.io_counters().write_bytes if hasattr(proc, 'io_counters') else 0
+                age = max(1.0, now - proc.create_time())
+        except (psutil.NoSuchProcess, psutil.AccessDenied, PermissionError, AttributeError):
+            continue
+        total += RSS_WEIGHT * rss + min(written, written / age * WRITE_HORIZON)
+    return total
+
+
+def order_by_footprint(apps, weight=None):
+    # The few heaviest apps first, so their long flushes start right away instead of
+    # trailing at the end (or meeting the deadline); the rest lightest first, which
+    # gets the most apps out soonest. benchmarks/sim_waves.py compares the orders.
+    if weight is None:
+        now = time.time()
+
+        def weight(procs):
+            return footprint(procs, now)
+
+    heaviest = sorted(apps, key=weight, reverse=True)
+    return heaviest[:LEADING_HEAVY] + heaviest[LEADING_HEAVY:][::-1]
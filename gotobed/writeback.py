@@ -0,0 +1,85 @@
+import os
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+
+from gotobed import tracing
+
+# Before the shutdown command: start a sync and wait until the dirty page cache has
+# drained, instead of sleeping a fixed time. sync(2) itself blocks until everything
+# is written, so it runs on a thread while /proc/meminfo shows the progress; the
+# stage ends when the sync returns, when Dirty + Writeback drops under the
+# threshold, or at the timeout.
+
+MEMINFO = '/proc/meminfo'
+DRAIN_THRESHOLD = 8 * 1024 * 1024
+DRAIN_TIMEOUT = 60
+POLL_INTERVAL = 0.05
+REPORT_INTERVAL = 5
+
+DrainResult = namedtuple('DrainResult', ['outcome', 'seconds', 'before', 'after'])
+
+
+def read_dirty(path=MEMINFO):
+    # Dirty + Writeback in bytes, None where /proc/meminfo does not exist
+    try:
+        with open(path) as f:
+            total = 0
+            for line in f:
+                if line.startswith('Dirty:') or line.startswith('Writeback:'):
+                    total += int(line.split()[1]) * 1024
+            return total
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _megabytes(size):
+    return f"{size / (1024 * 1024):.1f} MB" if size is not None else 'unknown'
+
+
+def drain_writeback(threshold=DRAIN_THRESHOLD, timeout=DRAIN_TIMEOUT, meminfo=MEMINFO, sync=None):
+    # Returns a DrainResult: outcome is 'synced' (sync returned), 'drained' (under the
+    # threshold first), 'timeout', or 'unsupported' (no sync on this platform)
+    sync = sync or getattr(os, 'sync', None)
+    start = time.monotonic()
+    before = read_dirty(meminfo)
+    if sync is None:
+        return DrainResult('unsupported', 0.0, before, before)
+
+    print(f"[{datetime.now().strftime('%H:%M:%S')}] Flushing {_megabytes(before)} of dirty data to disk...")
+    synced = threading.Event()
+
+    def run_sync():
+        sync()
+        synced.set()
+
+    with tracing.span('drain', before=before) as attrs:
+        threading.Thread(target=run_sync, name='gotobed-sync', daemon=True).start()
+        end = start + timeout
+        last_report = start
+        while True:
+            if synced.wait(POLL_INTERVAL):
+                outcome = 'synced'
+                break
+            dirty = read_dirty(meminfo)
+            now = time.monotonic()
+            if dirty is not None and dirty <= threshold:
+                outcome = 'drained'
+                break
+            if now >= end:
+                outcome = 'timeout'
+                break
+            if now - last_report >= REPORT_INTERVAL:
+                print(f"  still {_megabytes(dirty)} to write")
+                last_report = now
+
+        after = read_dirty(meminfo)
+        attrs.update(outcome=outcome, after=after)
+
+    result = DrainResult(outcome, time.monotonic() - start, before, after)
+    if outcome == 'timeout':
+        print(f"Gave up waiting after {result.seconds:.1f}s with {_megabytes(after)} still to write")
+    else:
+        print(f"Disk caches flushed in {result.seconds:.2f}s ({_megabytes(after)} left)")
+    return result
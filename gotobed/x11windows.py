@@ -0,0 +1,357 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import socket
+import time
+from collections import namedtuple
+
+import psutil
+
+X11Window = namedtuple('X11Window', ['window', 'pid', 'title'])
+
+XCB_ATOM_NONE = 0
+XCB_ATOM_ANY = 0
+XCB_ATOM_CARDINAL = 6
+XCB_ATOM_WINDOW = 33
+XCB_ATOM_ATOM = 4
+MAX_PROPERTY_LENGTH = 1 << 16
+
+XCB_CW_EVENT_MASK = 1 << 11
+XCB_EVENT_MASK_STRUCTURE_NOTIFY = 1 << 17
+XCB_EVENT_MASK_SUBSTRUCTURE_NOTIFY = 1 << 19
+XCB_EVENT_MASK_SUBSTRUCTURE_REDIRECT = 1 << 20
+XCB_DESTROY_NOTIFY = 17
+XCB_CLIENT_MESSAGE = 33
+XCB_WINDOW_ERROR = 3
+SOURCE_PAGER = 2
+POLL_INTERVAL = 0.1
+
+
+class _Cookie(ctypes.Structure):
+    _fields_ = [('sequence', ctypes.c_uint)]
+
+
+class _InternAtomReply(ctypes.Structure):
+    _fields_ = [('response_type', ctypes.c_uint8), ('pad0', ctypes.c_uint8), ('sequence', ctypes.c_uint16),
+                ('length', ctypes.c_uint32), ('atom', ctypes.c_uint32)]
+
+
+class _GetPropertyReply(ctypes.Structure):
+    _fields_ = [('response_type', ctypes.c_uint8), ('format', ctypes.c_uint8), ('sequence', ctypes.c_uint16),
+                ('length', ctypes.c_uint32), ('type', ctypes.c_uint32), ('bytes_after', ctypes.c_uint32),
+                ('value_len', ctypes.c_uint32), ('pad0', ctypes.c_uint8 * 12)]
+
+
+class _GenericEvent(ctypes.Structure):
+    # Covers DestroyNotify (event, window) and errors (resource id) alike
+    _fields_ = [('response_type', ctypes.c_uint8), ('detail', ctypes.c_uint8), ('sequence', ctypes.c_uint16),
+                ('first', ctypes.c_uint32), ('second', ctypes.c_uint32), ('pad', ctypes.c_uint8 * 20)]
+
+
+class _ClientMessage(ctypes.Structure):
+    _fields_ = [('response_type', ctypes.c_uint8), ('format', ctypes.c_uint8), ('sequence', ctypes.c_uint16),
+                ('window', ctypes.c_uint32), ('type', ctypes.c_uint32), ('data', ctypes.c_uint32 * 5)]
+
+
+class _ScreenIterator(ctypes.Structure):
+    # xcb_screen_t starts with the root window id
+    _fields_ = [('data', ctypes.POINTER(ctypes.c_uint32)), ('rem', ctypes.c_int), ('index', ctypes.c_int)]
+
+
+def _load_xcb():
+    path = ctypes.util.find_library('xcb')
+    if not path:
+        return None, None
+    try:
+        xcb = ctypes.CDLL(path)
+        libc = ctypes.CDLL(ctypes.util.find_library('c'))
+    except OSError:
+        return None, None
+
+    xcb.xcb_connect.argtypes = [ctypes.c_char_p, ctypes.POINTER(ctypes.c_int)]
+    xcb.xcb_connect.restype = ctypes.c_void_p
+    xcb.xcb_connection_has_error.argtypes = [ctypes.c_void_p]
+    xcb.xcb_disconnect.argtypes = [ctypes.c_void_p]
+    xcb.xcb_flush.argtypes = [ctypes.c_void_p]
+    xcb.xcb_get_setup.argtypes = [ctypes.c_void_p]
+    xcb.xcb_get_setup.restype = ctypes.c_void_p
+    xcb.xcb_setup_roots_iterator.argtypes = [ctypes.c_void_p]
+    xcb.xcb_setup_roots_iterator.restype = _ScreenIterator
+    xcb.xcb_screen_next.argtypes = [ctypes.POINTER(_ScreenIterator)]
+    xcb.xcb_intern_atom.argtypes = [ctypes.c_void_p, ctypes.c_uint8, ctypes.c_uint16, ctypes.c_char_p]
+    xcb.xcb_intern_atom.restype = _Cookie
+    xcb.xcb_intern_atom_reply.argtypes = [ctypes.c_void_p, _Cookie, ctypes.c_void_p]
+    xcb.xcb_intern_atom_reply.restype = ctypes.POINTER(_InternAtomReply)
+    xcb.xcb_get_property.argtypes = [ctypes.c_void_p, ctypes.c_uint8, ctypes.c_uint32, ctypes.c_uint32,
+                                     ctypes.c_uint32, ctypes.c_uint32, ctypes.c_uint32]
+    xcb.xcb_get_property.restype = _Cookie
+    xcb.xcb_get_property_reply.argtypes = [ctypes.c_void_p, _Cookie, ctypes.c_void_p]
+    xcb.xcb_get_property_reply.restype = ctypes.POINTER(_GetPropertyReply)
+    xcb.xcb_get_property_value.argtypes = [ctypes.POINTER(_GetPropertyReply)]
+    xcb.xcb_get_property_value.restype = ctypes.c_void_p
+    xcb.xcb_get_property_value_length.argtypes = [ctypes.POINTER(_GetPropertyReply)]
+    xcb.xcb_change_window_attributes.argtypes = [ctypes.c_void_p, ctypes.c_uint32, ctypes.c_uint32,
+                                                 ctypes.POINTER(ctypes.c_uint32)]
+    xcb.xcb_change_window_attributes.restype = _Cookie
+    xcb.xcb_send_event.argtypes = [ctypes.c_void_p, ctypes.c_uint8, ctypes.c_uint32, ctypes.c_uint32,
+                                   ctypes.c_void_p]
+    xcb.xcb_send_event.restype = _Cookie
+    xcb.xcb_poll_for_event.argtypes = [ctypes.c_void_p]
+    xcb.xcb_poll_for_event.restype = ctypes.POINTER(_GenericEvent)
+    xcb.xcb_get_file_descriptor.argtypes = [ctypes.c_void_p]
+    libc.free.argtypes = [ctypes.c_void_p]
+    return xcb, libc
+
+
+_xcb, _libc = _load_xcb()
+XCB_AVAILABLE = _xcb is not None
+
+
+class XConnection:
+    # A single xcb connection. Requests are pipelined: send a whole batch, flush once,
+    # then collect the replies, so a batch costs one round trip however large it is.
+
+    def __init__(self, display=None):
+        if not XCB_AVAILABLE:
+            raise OSError("libxcb not available")
+
+        display = display or os.environ.get('DISPLAY')
+        if not display:
+            raise OSError("DISPLAY is not set")
+
+        screen = ctypes.c_int(0)
+        self.conn = _xcb.xcb_connect(display.encode(), ctypes.byref(screen))
+        if not self.conn or _xcb.xcb_connection_has_error(self.conn):
+            if self.conn:
+                _xcb.xcb_disconnect(self.conn)
+            raise OSError(f"Cannot connect to X display {display}")
+
+        iterator = _xcb.xcb_setup_roots_iterator(_xcb.xcb_get_setup(self.conn))
+        for _ in range(screen.value):
+            _xcb.xcb_screen_next(ctypes.byref(iterator))
+        self.root = iterator.data[0]
+        self._atoms = {}
+
+    def close(self):
+        if self.conn:
+            _xcb.xcb_disconnect(self.conn)
+            self.conn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def flush(self):
+        _xcb.xcb_flush(self.conn)
+
+    def fileno(self):
+        return _xcb.xcb_get_file_descriptor(self.conn)
+
+    def watch_structure(self, window):
+        mask = (ctypes.c_uint32 * 1)(XCB_EVENT_MASK_STRUCTURE_NOTIFY)
+        _xcb.xcb_change_window_attributes(self.conn, window, XCB_CW_EVENT_MASK, mask)
+
+    def send_client_message(self, destination, window, message_type, data, event_mask=0):
+        event = _ClientMessage(XCB_CLIENT_MESSAGE, 32, 0, window, message_type)
+        event.data[:len(data)] = data
+        _xcb.xcb_send_event(self.conn, 0, destination, event_mask, ctypes.byref(event))
+
+    def poll_events(self):
+        # Already-queued events and errors as (response_type, first, second); never blocks
+        events = []
+        while True:
+            event = _xcb.xcb_poll_for_event(self.conn)
+            if not event:
+                return events
+            contents = event.contents
+            if contents.response_type == 0:
+                events.append((0, contents.detail, contents.first))
+            else:
+                events.append((contents.response_type & 0x7f, contents.first, contents.second))
+            _libc.free(event)
+
+    def atoms(self, *names):
+        missing = [name for name in names if name not in self._atoms]
+        cookies = [_xcb.xcb_intern_atom(self.conn, 0, len(name), name.encode()) for name in missing]
+        for name, cookie in zip(missing, cookies):
+            reply = _xcb.xcb_intern_atom_reply(self.conn, cookie, None)
+            if reply:
+                self._atoms[name] = reply.contents.atom
+                _libc.free(reply)
+            else:
+                self._atoms[name] = XCB_ATOM_NONE
+        return [self._atoms[name] for name in names]
+
+    def get_properties(self, requests):
+        # requests: [(window, property, type)]; returns [(format, bytes) or None] in order
+        cookies = [_xcb.xcb_get_property(self.conn, 0, window, prop, prop_type, 0, MAX_PROPERTY_LENGTH)
+                   for window, prop, prop_type in requests]
+        results = []
+        for cookie in cookies:
+            reply = _xcb.xcb_get_property_reply(self.conn, cookie, None)
+            if not reply:
+                results.append(None)
+                continue
+            try:
+                length = _xcb.xcb_get_property_value_length(reply)
+                if reply.contents.type == XCB_ATOM_NONE or length <= 0:
+                    results.append(None)
+                else:
+                    value = ctypes.string_at(_xcb.xcb_get_property_value(reply), length)
+                    results.append((reply.contents.format, value))
+            finally:
+                _libc.free(reply)
+        return results
+
+
+def _cardinals(value):
+    if value is None or value[0] != 32:
+        return []
+    data = value[1]
+    return list(memoryview(data).cast('I')[:len(data) // 4])
+
+
+def _host_label(name):
+    return name.split('.')[0].lower()
+
+
+def list_client_windows(conn):
+    # _NET_CLIENT_LIST from the root, then the properties of every client window in
+    # one pipelined batch. _NET_WM_PID only means something on this host, so windows
+    # of clients forwarded from elsewhere (ssh -X) are dropped by WM_CLIENT_MACHINE;
+    # panels, desktops and other skip-taskbar windows are not applications to close.
+    (client_list, wm_pid, wm_name, utf8_string, client_machine, window_type, type_dock, type_desktop,
+     wm_state, skip_taskbar) = conn.atoms(
+        '_NET_CLIENT_LIST', '_NET_WM_PID', '_NET_WM_NAME', 'UTF8_STRING', 'WM_CLIENT_MACHINE',
+        '_NET_WM_WINDOW_TYPE', '_NET_WM_WINDOW_TYPE_DOCK', '_NET_WM_WINDOW_TYPE_DESKTOP',
+        '_NET_WM_STATE', '_NET_WM_STATE_SKIP_TASKBAR')
+    if client_list == XCB_ATOM_NONE:
+        return []
+
+    windows = _cardinals(conn.get_properties([(conn.root, client_list, XCB_ATOM_WINDOW)])[0])
+    requests = []
+    for window in windows:
+        requests.append((window, wm_pid, XCB_ATOM_CARDINAL))
+        requests.append((window, wm_name, utf8_string))
+        requests.append((window, client_machine, XCB_ATOM_ANY))
+        requests.append((window, window_type, XCB_ATOM_ATOM))
+        requests.append((window, wm_state, XCB_ATOM_ATOM))
+    values = conn.get_properties(requests)
+
+    local = _host_label(socket.gethostname())
+    clients = []
+    for index, window in enumerate(windows):
+        pids, title, machine, types, states = values[5 * index:5 * index + 5]
+        if machine is not None:
+            host = machine[1].split(b'\0')[0].decode('utf-8', 'replace')
+            if host and _host_label(host) != local:
+                continue
+        if {type_dock, type_desktop} & set(_cardinals(types)) or skip_taskbar in _cardinals(states):
+            continue
+        pids = _cardinals(pids)
+        clients.append(X11Window(window, pids[0] if pids else None,
+                                 title[1].decode('utf-8', 'replace') if title else ''))
+    return clients
+
+
+class WindowCloser:
+    # Close applications the way a user would: one batch of close requests over a
+    # single X connection, then DestroyNotify events say when their windows are gone.
+    # Only processes without (remaining) windows are polled; the rest are left alone
+    # until the X server reports something. Plugs into teardown_applications() as
+    # close=request_close, wait=wait.
+
+    def __init__(self, display=None, fallback=None, poll_interval=POLL_INTERVAL):
+        self.conn = XConnection(display)
+        self.fallback = fallback or psutil.Process.terminate
+        self.poll_interval = poll_interval
+        self.windows = {}
+        self.owners = {}
+        try:
+            for client in list_client_windows(self.conn):
+                if client.pid is not None:
+                    self.windows.setdefault(client.pid, set()).add(client.window)
+                    self.owners[client.window] = client.pid
+
+            net_supported, self._net_close, self._wm_protocols, self._wm_delete = self.conn.atoms(
+                '_NET_SUPPORTED', '_NET_CLOSE_WINDOW', 'WM_PROTOCOLS', 'WM_DELETE_WINDOW')
+            supported = self.conn.get_properties([(self.conn.root, net_supported, XCB_ATOM_ATOM)])[0]
+            self.use_net_close = self._net_close in _cardinals(supported)
+        except Exception:
+            self.conn.close()
+            raise
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def request_close(self, proc):
+        # Queued only; the whole batch goes out with the flush in wait()
+        windows = self.windows.get(proc.pid)
+        if not windows:
+            self.fallback(proc)
+            return
+
+        for window in windows:
+            self.conn.watch_structure(window)
+            if self.use_net_close:
+                # Through the window manager, as a pager would (EWMH _NET_CLOSE_WINDOW)
+                self.conn.send_client_message(
+                    self.conn.root, window, self._net_close, [0, SOURCE_PAGER],
+                    XCB_EVENT_MASK_SUBSTRUCTURE_NOTIFY | XCB_EVENT_MASK_SUBSTRUCTURE_REDIRECT)
+            else:
+                # No EWMH window manager: speak ICCCM WM_DELETE_WINDOW to the client directly
+                self.conn.send_client_message(window, window, self._wm_protocols, [self._wm_delete, 0])
+
+    def _forget(self, window):
+        pid = self.owners.pop(window, None)
+        if pid is not None:
+            self.windows[pid].discard(window)
+
+    def _handle_events(self):
+        for kind, first, second in self.conn.poll_events():
+            if kind == XCB_DESTROY_NOTIFY:
+                self._forget(second)
+            elif kind == 0 and first == XCB_WINDOW_ERROR:
+                # BadWindow: it was destroyed before we got to it
+                self._forget(second)
+
+    def wait(self, procs, timeout=None, callback=None):
+        # Same contract as psutil.wait_procs()
+        self.conn.flush()
+        end = time.monotonic() + (timeout or 0)
+        gone = []
+        alive = list(procs)
+
+        while True:
+            self._handle_events()
+            unwatched = [proc for proc in alive if not self.windows.get(proc.pid)]
+            if unwatched:
+                exited, _ = psutil.wait_procs(unwatched, timeout=0, callback=callback)
+                gone.extend(exited)
+                alive = [proc for proc in alive if proc not in exited]
+
+            remaining = end - time.monotonic()
+            if not alive or remaining <= 0:
+                return gone, alive
+
+            if any(not self.windows.get(proc.pid) for proc in alive):
+                remaining = min(remaining, self.poll_interval)
+            select.select([self.conn.fileno()], [], [], remaining)
+
+
+def open_window_closer(display=None, fallback=None):
+    if not XCB_AVAILABLE:
+        return None
+    try:
+        return WindowCloser(display, fallback)
+    except OSError:
+        return None